@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+#
+# Build results cache classes
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Basic class support
+# @TODO    :
+#
+#
+
+import os
+import json
+import hashlib
+import logging
+import threading
+import subprocess
+
+from klibs.build_kernel import parse_config_line, atomic_write
+from klibs.check_wrapper import checker_version
+
+CACHE_DEFAULT_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'klibs')
+
+# Bump it if the format of cached data changes.
+CACHE_VERSION = 1
+
+def hash_data(data):
+    """
+    Get a stable sha256 hash of JSON serializable data.
+    :param data: Dict, list or string.
+    :return: Hex digest string.
+    """
+    return hashlib.sha256(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+def config_hash(cfg):
+    """
+    Get the hash of normalized kernel config. Comments, blank lines and option order are ignored.
+    :param cfg: Path of .config file.
+    :return: Hex digest string, None if config does not exist.
+    """
+    if not os.path.exists(cfg):
+        return None
+
+    options = []
+    with open(cfg) as fobj:
+        for line in fobj:
+            option, value = parse_config_line(line)
+            if option is not None:
+                options.append("%s=%s" % (option, value))
+
+    return hash_data(sorted(options))
+
+_toolchain_ids = {}
+_toolchain_lock = threading.Lock()
+
+def toolchain_id(cc=None, compiler='gcc'):
+    """
+    Get the identity (version string) of $(CROSS_COMPILE)gcc, value is cached per process.
+    :param cc: CROSS_COMPILE prefix.
+    :param compiler: Compiler name.
+    :return: Compiler version string, None if the compiler can't be executed.
+    """
+    name = (cc if cc else '') + compiler
+
+    with _toolchain_lock:
+        if name not in _toolchain_ids:
+            try:
+                proc = subprocess.Popen([name, '--version'], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                        universal_newlines=True)
+                out = proc.communicate()[0]
+                _toolchain_ids[name] = name + ':' + out.splitlines()[0].strip() if proc.returncode == 0 and \
+                                                                                  len(out) > 0 else None
+            except OSError:
+                _toolchain_ids[name] = None
+
+        return _toolchain_ids[name]
+
+def git_tree_id(git):
+    """
+    Get the git tree id of the source HEAD.
+    :param git: GitShell object of kernel source.
+    :return: Tree SHA, None if it's not a git repo or if the tree has local changes.
+    """
+    ret, out, err = git.cmd('rev-parse', 'HEAD^{tree}')
+    if ret != 0:
+        return None
+
+    # Local modifications are not part of tree id, so don't trust it.
+    ret, status, err = git.cmd('status', '--porcelain', '--untracked-files=no')
+    if ret != 0 or len(status.strip()) > 0:
+        return None
+
+    return out.strip()
+
+class ResultCache(object):
+    """
+    Simple on disk cache which stores JSON data under a hash key.
+    Each entry is one file, written with atomic rename, so parallel jobs and
+    multiple processes can share the cache directory.
+    """
+    def __init__(self, name, cache_dir=None, logger=None):
+        """
+        ResultCache init()
+        :param name: Name of the cache, used as sub directory.
+        :param cache_dir: Top cache directory. Default is ~/.cache/klibs.
+        :param logger: Logger object.
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.dir = os.path.join(cache_dir if cache_dir else CACHE_DEFAULT_DIR, name)
+        self.hits = 0
+        self.misses = 0
+
+        if not os.path.exists(self.dir):
+            os.makedirs(self.dir)
+
+    def key(self, **fields):
+        """
+        Create cache key from given fields.
+        :return: Key string, None if any field value is None.
+        """
+        if any([value is None for value in fields.values()]):
+            return None
+
+        fields["cache-version"] = CACHE_VERSION
+
+        return hash_data(fields)
+
+    def _path(self, key):
+        return os.path.join(self.dir, key[:2], key + '.json')
+
+    def get(self, key):
+        """
+        Get the cached data of given key.
+        :param key: Key returned by key().
+        :return: Cached data, None on miss.
+        """
+        if key is None:
+            return None
+
+        path = self._path(key)
+
+        try:
+            with open(path) as fobj:
+                data = json.load(fobj)
+        except (IOError, OSError, ValueError):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+
+        return data
+
+    def put(self, key, data):
+        """
+        Store the data under given key.
+        :param key: Key returned by key().
+        :param data: JSON serializable data.
+        :return: True | False
+        """
+        if key is None:
+            return False
+
+        try:
+            atomic_write(self._path(key), [json.dumps(data)])
+        except (IOError, OSError, TypeError, ValueError) as e:
+            self.logger.warning("ResultCache: Failed to store %s: %s", key, e)
+            return False
+
+        return True
+
+class BuildCache(ResultCache):
+    """
+    Cache of kernel build results keyed by source tree, config, arch, toolchain and cflags.
+    """
+    def __init__(self, cache_dir=None, logger=None):
+        super(BuildCache, self).__init__('builds', cache_dir, logger)
+
+    def build_key(self, git, cfg, arch, cc, cflags):
+        """
+        Create build key.
+        :param git: GitShell object of kernel source.
+        :param cfg: Path of .config used for the build.
+        :param arch: Kernel ARCH.
+        :param cc: CROSS_COMPILE prefix.
+        :param cflags: Make flags used for the build.
+        :return: Key string, None if the build can't be cached.
+        """
+        return self.key(tree=git_tree_id(git), config=config_hash(cfg), arch=arch, toolchain=toolchain_id(cc),
+                        cflags=list(cflags))
+
+class BaselineCache(ResultCache):
+    """
+    Cache of base commit results of static analyzer tests, keyed by base commit SHA,
+    arch, config, toolchain and flags. Branches tested against same base share the entries.
+    """
+    def __init__(self, cache_dir=None, logger=None):
+        super(BaselineCache, self).__init__('baselines', cache_dir, logger)
+
+    def baseline_key(self, git, base, arch, config, cfg, cc, cflags, checks=None):
+        """
+        Create baseline key.
+        :param git: GitShell object of kernel source.
+        :param base: Base commit SHA, tag or branch.
+        :param arch: Kernel ARCH.
+        :param config: Config name.
+        :param cfg: Custom config file, None for standard configs.
+        :param cc: CROSS_COMPILE prefix.
+        :param cflags: Make flags, including checker flags.
+        :param checks: Checkers run through CHECK wrapper, with their versions.
+        :return: Key string, None if the base can't be resolved or config is randconfig.
+        """
+        # Randconfig generates a different .config on every build.
+        if config == 'randconfig':
+            return None
+
+        ret, out, err = git.cmd('rev-parse', '--verify', '%s^{commit}' % base)
+        if ret != 0:
+            return None
+
+        # Checker run directly by CHECK= make flag, its version is in the key too.
+        if not checks:
+            checks = [{"cmd": flag[len('CHECK='):].split(), "version": checker_version(flag[len('CHECK='):].split())}
+                      for flag in cflags if flag.startswith('CHECK=')]
+
+        return self.key(base=out.strip(), arch=arch, config=config,
+                        config_src=config_hash(cfg) if cfg else '', toolchain=toolchain_id(cc),
+                        cflags=list(cflags), checks=checks if checks else [])
+
+class CheckpatchCache(ResultCache):
+    """
+    Cache of checkpatch results of a commit, keyed by git patch-id, commit message and
+    checkpatch script. Rebased commits have the same patch-id, so they are not checked again.
+    """
+    def __init__(self, cache_dir=None, logger=None):
+        super(CheckpatchCache, self).__init__('checkpatch', cache_dir, logger)
+
+    def patch_key(self, patch_id, message, script_id):
+        """
+        Create checkpatch key.
+        :param patch_id: Stable git patch-id of the commit.
+        :param message: Commit message, checkpatch checks it too.
+        :param script_id: Hash of checkpatch script.
+        :return: Key string, None if patch-id is not known.
+        """
+        return self.key(patch_id=patch_id, message=hash_data(message) if message is not None else None,
+                        script=script_id)
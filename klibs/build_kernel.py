@@ -21,12 +21,18 @@ import os
 import re
 import logging
 import multiprocessing
-from shutil import copy
+import collections
+from contextlib import contextmanager
+from shutil import copy, copymode
 import sys
+import shlex
 import tempfile
 import subprocess
 import errno
+import threading
 from pyshell import PyShell
+from klibs.jobserver import JobServer, get_jobserver
+from klibs.diagnostics import DIAGNOSTICS_FLAGS
 
 MAKE_CMD = '/usr/bin/make'
 
@@ -49,14 +55,154 @@ def copy2(src, dest):
 
 set_val = lambda k, v: v if k is None else k
 
+def split_args(args):
+    """
+    Get make args in list format. A string is split like a shell command line, as it was when make
+    commands were run through the shell. List args are passed to make as is, without any unquoting.
+    :param args: Make args, string or list.
+    :return: List of args.
+    """
+    if args is None:
+        return []
+
+    if isinstance(args, (str, type(u''))):
+        return shlex.split(args)
+
+    return [str(arg) for arg in args]
+
+def decode_output(data):
+    """
+    Convert command output to native string. Invalid UTF-8 bytes, e.g. from old source comments
+    or locale messages, are replaced instead of raising UnicodeDecodeError.
+    :param data: Output bytes.
+    :return: String.
+    """
+    if isinstance(data, str):
+        return data
+
+    return data.decode('utf-8', 'replace')
+
+def exec_make(cmd, wd=None, jobserver=None, env=None, parser=None, log=False, dryrun=False, logger=None):
+    """
+    Execute make command, optionally as a member of given jobserver.
+    :param cmd: Make command, list of args or command line string (see split_args()).
+    :param wd: Working directory.
+    :param jobserver: JobServer object, if None make will run on its own.
+    :param env: Environment dict, os.environ if None.
+    :param parser: MakeOutputParser object. If given, output is streamed to the parser line by line
+                   and not returned.
+    :param log: Log the command output.
+    :param dryrun: Only log the command, don't execute it.
+    :param logger: Logger object.
+    :return: (ret, out, err) tuple. out and err are empty strings if parser is used.
+    """
+    logger = logger or logging.getLogger(__name__)
+
+    cmd = split_args(cmd)
+
+    logger.debug("Executing %s", ' '.join(cmd))
+
+    if dryrun:
+        return 0, '', ''
+
+    if jobserver is not None:
+        env = jobserver.env(env)
+
+    # Pipes are read as bytes, a decode error would stop draining the pipe and block make.
+    def read_lines(pipe, stream):
+        for line in iter(pipe.readline, b''):
+            line = decode_output(line)
+            parser.feed(line, stream)
+            if log:
+                logger.info(line.rstrip('\n'))
+        pipe.close()
+
+    def run():
+        proc = subprocess.Popen(cmd, cwd=wd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env,
+                                close_fds=False)
+        if parser is None:
+            out, err = proc.communicate()
+            return proc.returncode, decode_output(out), decode_output(err)
+
+        err_thread = threading.Thread(target=read_lines, args=(proc.stderr, 'err'))
+        err_thread.daemon = True
+        err_thread.start()
+        read_lines(proc.stdout, 'out')
+        err_thread.join()
+
+        return proc.wait(), '', ''
+
+    if jobserver is not None:
+        with jobserver.slot():
+            ret, out, err = run()
+    else:
+        ret, out, err = run()
+
+    if log and parser is None:
+        logger.info(out)
+        logger.info(err)
+
+    return ret, out, err
+
+CONFIG_SET_REGEX = re.compile(r'^(CONFIG_[A-Za-z0-9_]+)=(.*)$')
+CONFIG_NOT_SET_REGEX = re.compile(r'^# (CONFIG_[A-Za-z0-9_]+) is not set$')
+
+def parse_config_line(line):
+    """
+    Parse a single kernel config line.
+    :param line: Line from .config file or config fragment.
+    :return: (option, value) tuple, or (None, None) if the line does not assign a config option.
+             String values keep their quotes, so CONFIG_X="1" and CONFIG_X=1 stay different.
+    """
+    line = line.strip()
+
+    match = CONFIG_SET_REGEX.match(line)
+    if match:
+        return match.group(1), match.group(2).strip()
+
+    match = CONFIG_NOT_SET_REGEX.match(line)
+    if match:
+        return match.group(1), 'n'
+
+    return None, None
+
+def atomic_write(path, lines):
+    """
+    Write given lines to a temp file in the same directory and rename it over path.
+    :param path: Destination file path.
+    :param lines: Iterable of lines (with line endings).
+    :return: None
+    """
+    dirname = os.path.dirname(os.path.abspath(path))
+    if not os.path.exists(dirname):
+        os.makedirs(dirname)
+
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', dir=dirname)
+    try:
+        with os.fdopen(fd, 'w') as fobj:
+            fobj.writelines(lines)
+            fobj.flush()
+            os.fsync(fobj.fileno())
+        if os.path.exists(path):
+            copymode(path, tmp_path)
+        os.rename(tmp_path, path)
+    except:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
 class KernelConfig(object):
     """
     This class is used for mangling the kernel config file.
+    Config file is parsed once into an ordered symbol index and all edits are
+    applied to the index. Changes are written back to out in one atomic write.
     Supported operations are,
         * enable_config: Enables given config option,
         * module_config: Makes given config option as module,
         * disable_config: Disable given config option,
-        * merge_config: Merge given config list.
+        * merge_config: Merge given config list,
+        * get_config: Get the current value of given config option.
+    Use transaction() to batch multiple edits into a single write.
     """
     def __init__(self, src, out=None, bkup=True, logger=None):
         """
@@ -72,49 +218,162 @@ class KernelConfig(object):
         self.out = set_val(out, src)
         self.bkup = self.src + '.bkup' if bkup is True else self.src
         self.choices = ['y', 'm', 'n']
-        self.sh = PyShell(logger=self.logger)
-        self.sh.cmd("cp %s %s" % (self.src, self.out))
-        self.sh.cmd("cp %s %s" % (self.src, self.bkup))
+        self._lines = []
+        self._index = collections.OrderedDict()
+        self._batch_depth = 0
+        # Config state at each begin(), restored by the matching rollback().
+        self._snapshots = []
+        self._dirty = False
+
+        if os.path.abspath(self.bkup) != os.path.abspath(self.src):
+            copy2(self.src, self.bkup)
+
+        self._load()
+
+        if os.path.abspath(self.out) != os.path.abspath(self.src):
+            self.save(force=True)
+
+    def _load(self):
+        self._lines = []
+        self._index.clear()
+
+        with open(self.src) as cfgobj:
+            for line in cfgobj:
+                if not line.endswith('\n'):
+                    line += '\n'
+                option = parse_config_line(line)[0]
+                # If a option is defined more than once, last one wins (same as Kconfig).
+                if option is not None:
+                    self._index[option] = len(self._lines)
+                self._lines.append(line)
 
     def _check_num(self, s):
         try:
-            int(s)
+            int(s, 0)
             return True
         except:
             return False
 
+    def _is_quoted(self, s):
+        return len(s) > 1 and s.startswith('"') and s.endswith('"')
+
     def _format_config(self, option, value):
         if value == "n":
             return "# " + option + " is not set\n"
-        elif value in self.choices or self._check_num(value):
+        elif value in self.choices or self._check_num(value) or self._is_quoted(value):
             return option + "=%s\n" % value
         else:
             return  option + '="%s"\n' % value
 
     def _mod_config(self, option, value):
+        line = self._format_config(option, value)
+        index = self._index.get(option, None)
+
+        if index is None:
+            self.logger.info("Adding %s=%s" % (option, value))
+            self._index[option] = len(self._lines)
+            self._lines.append(line)
+            self._dirty = True
+        elif self._lines[index] != line:
+            self.logger.info("Setting %s=%s" % (option, value))
+            self._lines[index] = line
+            self._dirty = True
+
+        if self._batch_depth == 0:
+            self.save()
 
-        tmp_file = tempfile.NamedTemporaryFile(mode='w+t')
+        return True
 
-        with open(self.out) as cfgobj:
-            for line in cfgobj:
-                if option in line:
-                    self.logger.info("Setting %s=%s" % (option, value))
-                    tmp_file.write(self._format_config(option, value))
-                else:
-                    tmp_file.write(line)
+    def begin(self):
+        """
+        Start a batch of edits. Changes are not written until the matching commit().
+        Calls can be nested, only the outermost commit() writes the file.
+        :return: None
+        """
+        self._snapshots.append((list(self._lines), collections.OrderedDict(self._index), self._dirty))
+        self._batch_depth += 1
+
+    def commit(self):
+        """
+        End a batch of edits and write the config if this is the outermost batch.
+        :return: True | False
+        """
+        if self._batch_depth == 0:
+            self.logger.error("KernelConfig: commit() called without begin()")
+            return False
 
-        tmp_file.seek(0)
-        with open(self.out, "w+") as cfgobj:
-            cfgobj.truncate()
+        self._snapshots.pop()
+        self._batch_depth -= 1
 
-        with open(self.out, "w+") as cfgobj:
-            for line in tmp_file:
-                cfgobj.write(line)
+        if self._batch_depth == 0:
+            self.save()
 
-        tmp_file.close()
+        return True
+
+    def rollback(self):
+        """
+        End a batch of edits without writing them. Edits made since the matching begin() are
+        dropped, edits of outer batches are kept until their own commit() or rollback().
+        :return: True | False
+        """
+        if self._batch_depth == 0:
+            self.logger.error("KernelConfig: rollback() called without begin()")
+            return False
+
+        self._lines, self._index, self._dirty = self._snapshots.pop()
+        self._batch_depth -= 1
 
         return True
 
+    @contextmanager
+    def transaction(self):
+        """
+        Context manager for batching edits. Usage is,
+        with kobj.transaction():
+            kobj.enable_config("CONFIG_EFI")
+            kobj.disable_config("CONFIG_USB")
+        Config is written once on exit, and edits are dropped if an exception is raised.
+        """
+        self.begin()
+        try:
+            yield self
+        except:
+            self.rollback()
+            raise
+        else:
+            self.commit()
+
+    def save(self, force=False):
+        """
+        Write the config index to out file using atomic write and rename.
+        :param force: Write even if there are no pending edits.
+        :return: True
+        """
+        if not self._dirty and not force:
+            return True
+
+        atomic_write(self.out, self._lines)
+
+        # Once written, out becomes the source of truth for reload.
+        self.src = self.out
+        self._dirty = False
+
+        return True
+
+    def get_config(self, option):
+        """
+        Get the value of given config option. Usage is,
+        get_config("CONFIG_EFI")
+        :param option: CONFIG_* option.
+        :return: Value string as written in config, with quotes for string options ('n' for not set
+                 options) or None if option is not found.
+        """
+        index = self._index.get(option, None)
+        if index is None:
+            return None
+
+        return parse_config_line(self._lines[index])[1]
+
     def enable_config(self, option):
         """
         Enables the given config option. Usage is,
@@ -144,7 +403,8 @@ class KernelConfig(object):
 
     def merge_config(self, diff_cfg):
         """
-        Merge given config list to src config.
+        Merge given config list to src config. All options are applied as one batch and
+        written in a single pass.
         :param diff_cfg: Config list in list format or a new file.
         :return: True | False
         """
@@ -157,22 +417,68 @@ class KernelConfig(object):
             assert_exists(diff_cfg, logger=self.logger)
             with open(diff_cfg) as diffobj:
                 diff_list = diffobj.read().splitlines()
-            diffobj.close()
 
         for line in diff_list:
-            option = line.split('=')[0].strip()
-            value = line.split('=')[1].strip()
-            if not option.startswith("CONFIG_"):
-                self.logger.error("Invalid config : %s or value : %s" % (option, value))
+            if len(line.strip()) == 0:
+                continue
+            option, value = parse_config_line(line)
+            if option is None:
+                # Skip comment lines, report everything else.
+                if line.strip().startswith('#'):
+                    continue
+                self.logger.error("Invalid config line : %s" % line)
                 return False
             else:
                 update_list.append((option, value))
 
-        for item in update_list:
-            self._mod_config(item[0], item[1])
+        with self.transaction():
+            for item in update_list:
+                self._mod_config(item[0], item[1])
 
         return True
 
+MAKEFILE_VERSION_FIELDS = ["VERSION", "PATCHLEVEL", "SUBLEVEL", "EXTRAVERSION", "NAME"]
+MAKEFILE_VERSION_REGEX = re.compile(r'^(%s)\s*=(.*)$' % '|'.join(MAKEFILE_VERSION_FIELDS))
+
+_makefile_cache = {}
+_makefile_lock = threading.Lock()
+
+def read_makefile_version(src):
+    """
+    Parse the version fields of top level kernel Makefile. Result is cached per
+    Makefile path, mtime and size, so repeated calls don't touch the file.
+    :param src: Kernel source path.
+    :return: Dict of VERSION, PATCHLEVEL, SUBLEVEL, EXTRAVERSION and NAME values (None if field
+             is missing), None if there is no Makefile.
+    """
+    path = os.path.join(os.path.abspath(src), 'Makefile')
+
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+
+    with _makefile_lock:
+        entry = _makefile_cache.get(path, None)
+        if entry is not None and entry[0] == (stat.st_mtime, stat.st_size):
+            return entry[1]
+
+    fields = dict.fromkeys(MAKEFILE_VERSION_FIELDS)
+
+    with open(path, 'r') as makefile:
+        for line in makefile:
+            match = MAKEFILE_VERSION_REGEX.match(line)
+            if match is not None and fields[match.group(1)] is None:
+                fields[match.group(1)] = match.group(2).strip()
+                # Version fields are at the top of the Makefile, no need to read the rest.
+                if None not in fields.values():
+                    break
+
+    with _makefile_lock:
+        _makefile_cache[path] = ((stat.st_mtime, stat.st_size), fields)
+
+    return fields
+
 def is_valid_kernel(src, logger=None):
     """
     Check if the given source is a valid kernel and return True|False status.
@@ -182,31 +488,23 @@ def is_valid_kernel(src, logger=None):
     """
     logger = logger or logging.getLogger(__name__)
 
-    def parse_makefile(data, field):
-        regex = r"%s = (.*)" % field
-        match = re.search(regex, data)
-        if match:
-            return match.group(1)
-        else:
-            None
+    fields = read_makefile_version(src)
 
-    if os.path.exists(os.path.join(src, 'Makefile')):
-        with open(os.path.join(src, 'Makefile'), 'r') as makefile:
-            _makefile = makefile.read()
-            if parse_makefile(_makefile, "VERSION") is None:
-                logger.error("Missing VERSION field in Makefile")
-                return False
-            if parse_makefile(_makefile, "PATCHLEVEL") is None:
-                logger.error("Missing PATCHLEVEL field in Makefile")
-                return False
-            if parse_makefile(_makefile, "SUBLEVEL") is None:
-                logger.error("Missing SUBLEVEL field in Makefile")
-                return False
-            if parse_makefile(_makefile, "EXTRAVERSION") is None:
-                logger.warn("Missing EXTRAVERSION field in Makefile")
-            if parse_makefile(_makefile, "NAME") is None:
-                logger.error("Missing NAME field in Makefile")
-                return False
+    if fields is not None:
+        if fields["VERSION"] is None:
+            logger.error("Missing VERSION field in Makefile")
+            return False
+        if fields["PATCHLEVEL"] is None:
+            logger.error("Missing PATCHLEVEL field in Makefile")
+            return False
+        if fields["SUBLEVEL"] is None:
+            logger.error("Missing SUBLEVEL field in Makefile")
+            return False
+        if fields["EXTRAVERSION"] is None:
+            logger.warn("Missing EXTRAVERSION field in Makefile")
+        if fields["NAME"] is None:
+            logger.error("Missing NAME field in Makefile")
+            return False
 
         return True
 
@@ -214,9 +512,23 @@ def is_valid_kernel(src, logger=None):
 
     return False
 
+def format_kernel_version(fields):
+    """
+    Format the Makefile version fields same as "make kernelversion".
+    :param fields: Dict returned by read_makefile_version().
+    :return: Version string, e.g. 4.19.0-rc1.
+    """
+    version = fields["VERSION"] or ''
+    if fields["PATCHLEVEL"]:
+        version += '.' + fields["PATCHLEVEL"]
+        if fields["SUBLEVEL"]:
+            version += '.' + fields["SUBLEVEL"]
+
+    return version + (fields["EXTRAVERSION"] or '')
+
 def get_kernel_version(src, logger=None):
     """
-    Get the kernel version of given source.
+    Get the kernel version of given source. Makefile is parsed in process, make is not executed.
     :param src: Kernel source path.
     :param logger: Logger object.
     :return: None on error. Otherwise, kernel source in Linux-xx.yy-rcx format.
@@ -226,7 +538,18 @@ def get_kernel_version(src, logger=None):
     if not is_valid_kernel(src, logger):
         return None
 
-    return PyShell(wd=src, logger=logger).cmd("make", "kernelversion")[1].strip()
+    return format_kernel_version(read_makefile_version(src))
+
+CONFIG_TARGETS = ["config", "nconfig", "menuconfig", "xconfig", "gconfig", "oldconfig",
+                  "localmodconfig", "localyesconfig", "defconfig", "savedefconfig",
+                  "allnoconfig", "allyesconfig", "allmodconfig", "alldefconfig" ,
+                  "randconfig", "listnewconfig", "olddefconfig", "kvmconfig", "xenconfig",
+                  "tinyconfig"]
+
+CLEAN_TARGETS = ["clean", "mrproper", "distclean"]
+
+BUILD_TARGETS = ["all", "vmlinux", "modules", "modules_install", "kernelrelease", "kernelversion",
+                 "headers_install"]
 
 class BuildKernel(object):
     """
@@ -268,55 +591,82 @@ class BuildKernel(object):
         make_mrproper(),
         make_distclean().
 
+    By default all make commands share the klibs jobserver (see get_jobserver()), so
+    parallel builds don't oversubscribe the CPUs. Set jobserver=False to use -j<threads>.
+    With the jobserver, threads is ignored (a -j option would make make leave the
+    jobserver), a build uses as many jobs as the jobserver has free tokens. Same goes
+    for the per-job threads of BuildScheduler, which are only used for CPU budgeting.
+
+    cflags and make flags are lists of make args, which are passed to make as is. A
+    string is split like a shell command line, e.g. 'KCFLAGS="-Wall -Werror" C=1'.
+
+    If ccache (CCache object) is given, compiler is wrapped with ccache and cache
+    statistics of the last make_kernel() call are stored in ccache_stats. They are
+    read from a stats log in out dir, so they only count the objects of this build
+    even if other builds use the same cache. ccache_stats is None with ccache < 4,
+    which has no stats log.
+
+    If diagnostics_format is given (json | sarif), make_kernel() asks the compiler
+    for machine readable diagnostics through KCFLAGS.
     """
 
-    def __init__(self, src_dir=None, arch=None, cc=None, cflags=None, out_dir=None, threads=None, logger=None):
+    config_targets = CONFIG_TARGETS
+    clean_targets = CLEAN_TARGETS
+    build_targets = BUILD_TARGETS
+
+    def __init__(self, src_dir=None, arch=None, cc=None, cflags=None, out_dir=None, threads=None, jobserver=True,
+                 ccache=None, diagnostics_format=None, logger=None):
         self.logger = logger or logging.getLogger(__name__)
 
         self.src = os.path.abspath(set_val(src_dir, os.getcwd()))
         self.out = os.path.abspath(set_val(out_dir, os.path.join(self.src, 'out')))
         self.cfg = os.path.abspath(os.path.join(self.out, '.config'))
-        self._makefile = None
         self.threads = set_val(threads, multiprocessing.cpu_count())
-        self.clags = set_val(cflags, [])
+        self.clags = split_args(cflags)
         self.arch =  set_val(arch, "x86_64")
         self.cc = cc
 
-        try:
-            with open(os.path.join(self.src, 'Makefile'), 'r') as makefile:
-                self._makefile = makefile.read()
-        except:
-            self.logger.error("%s Invalid kernel source directory", self.src)
-            raise IOError
+        if jobserver is True:
+            self.jobserver = get_jobserver(logger=self.logger)
+        elif isinstance(jobserver, JobServer):
+            self.jobserver = jobserver
+        else:
+            self.jobserver = None
+
+        if threads is not None and self.jobserver is not None:
+            self.logger.info("BuildKernel: threads=%d is overridden by jobserver with %d slots", threads,
+                             self.jobserver.slots)
 
-        self.uname = PyShell(wd=src_dir, logger=logger).cmd("make", "kernelversion")[1].strip()
+        self.ccache = ccache
+        self.ccache_stats = None
+        self.ccache_log = None
 
-        self.config_targets = ["config", "nconfig", "menuconfig", "xconfig", "gconfig", "oldconfig",
-                               "localmodconfig", "localyesconfig", "defconfig", "savedefconfig",
-                               "allnoconfig", "allyesconfig", "allmodconfig", "alldefconfig" ,
-                               "randconfig", "listnewconfig", "olddefconfig", "kvmconfig", "xenconfig",
-                               "tinyconfig"]
+        if diagnostics_format is not None and diagnostics_format not in DIAGNOSTICS_FLAGS:
+            self.logger.error("Invalid diagnostics format %s", diagnostics_format)
+            raise ValueError("Invalid diagnostics format %s" % diagnostics_format)
 
-        self.clean_targets = ["clean", "mrproper", "distclean"]
+        self.diagnostics_format = diagnostics_format
 
-        self.build_targets =["all", "vmlinux", "modules", "modules_install", "kernelrelease", "kernelversion",
-                             "headers_install"]
+        fields = read_makefile_version(self.src)
+        if fields is None:
+            self.logger.error("%s Invalid kernel source directory", self.src)
+            raise IOError
 
-        for target in self.config_targets +  self.clean_targets + self.build_targets:
-            def make_variant(self, target=target, flags=[], log=False, dryrun=False):
-                return self._make_target(target=target, flags=flags, log=log, dryrun=dryrun)
-            setattr(self.__class__, 'make_' + target , make_variant)
+        self.uname = format_kernel_version(fields)
 
-    def _exec_cmd(self, cmd, log=False, dryrun=False):
+    def _exec_cmd(self, cmd, log=False, dryrun=False, parser=None):
         self.logger.debug("BuildKernel: Executing %s", ' '.join(map(lambda x: str(x), cmd)))
 
-        shell = PyShell(logger=self.logger)
+        return exec_make(cmd, jobserver=self.jobserver,
+                         env=self.ccache.env(stats_log=self.ccache_log) if self.ccache is not None else None,
+                         parser=parser, log=log, dryrun=dryrun, logger=self.logger)
 
-        return shell.cmd(*cmd, out_log=log, dry_run=dryrun)
+    def _make_target(self, target=None, flags=[], log=False, dryrun=False, parser=None):
 
-    def _make_target(self, target=None, flags=[], log=False, dryrun=False):
+        # With jobserver, parallelism comes from MAKEFLAGS. -j here would make make ignore the jobserver.
+        jobs = [] if self.jobserver is not None else ['-j%d' % self.threads]
 
-        mkcmd = [MAKE_CMD] + self.clags + ['-j%d' % self.threads, "ARCH=%s" % self.arch, "O=%s" % self.out, "-C", self.src]
+        mkcmd = [MAKE_CMD] + self.clags + jobs + ["ARCH=%s" % self.arch, "O=%s" % self.out, "-C", self.src]
 
         # Make sure out dir exists
         if not os.path.exists(self.out):
@@ -325,17 +675,26 @@ class BuildKernel(object):
         if self.cc is not None and len(self.cc) > 0 :
             mkcmd.append("CROSS_COMPILE=%s" % self.cc)
 
+        flags = split_args(flags)
         mkcmd += flags
 
-        if target is not None:
+        if self.ccache is not None:
+            # Wrap user given CC (e.g. CC=clang) if any, last CC= on command line wins.
+            cc_list = [x[len("CC="):] for x in self.clags + flags if x.startswith("CC=")]
+            mkcmd += self.ccache.make_flags(cc_list[-1] if len(cc_list) > 0 else None)
+
+        if isinstance(target, list):
+            mkcmd += target
+        elif target is not None:
             mkcmd.append(target)
 
-        ret, out, err = self._exec_cmd(mkcmd, log=log, dryrun=dryrun)
+        ret, out, err = self._exec_cmd(mkcmd, log=log, dryrun=dryrun, parser=parser)
         if ret != 0:
             self.logger.error(' '.join(mkcmd) + " Command failed")
 
-        self.logger.debug(out)
-        self.logger.debug(err)
+        if parser is None:
+            self.logger.debug(out)
+            self.logger.debug(err)
 
         return ret, out, err
 
@@ -349,9 +708,43 @@ class BuildKernel(object):
         shell = PyShell(logger=self.logger)
         shell.cmd("cp %s %s" % (cfg, self.cfg), shell=True)
 
-    def make_kernel(self, flags=[], log=False, dryrun=False):
+    def make_kernel(self, flags=[], log=False, dryrun=False, parser=None, targets=None):
+        """
+        Build the kernel using existing config.
+        :param flags: Extra make flags.
+        :param log: Log the make output.
+        :param dryrun: Only log the make command.
+        :param parser: MakeOutputParser object, if given make output is streamed to it.
+        :param targets: List of make targets (e.g. single objects), default target if None.
+        :return: (ret, out, err) tuple, out and err are empty strings if parser is used.
+        """
         assert_exists(self.cfg, "No config file found in %s" % self.cfg, logger=self.logger)
-        return self._make_target(flags=flags, log=log, dryrun=dryrun)
+
+        if self.diagnostics_format is not None:
+            # Last KCFLAGS= on command line wins, so merge the user given ones.
+            flags = split_args(flags)
+            kcflags = [x[len("KCFLAGS="):] for x in self.clags + flags if x.startswith("KCFLAGS=")]
+            flags = [x for x in flags if not x.startswith("KCFLAGS=")] + \
+                    ["KCFLAGS=%s" % ' '.join(kcflags + [DIAGNOSTICS_FLAGS[self.diagnostics_format]])]
+
+        if self.ccache is None or dryrun:
+            return self._make_target(targets, flags=flags, log=log, dryrun=dryrun, parser=parser)
+
+        self.ccache_log = os.path.join(self.out, '.ccache-stats.log')
+        if os.path.exists(self.ccache_log):
+            os.remove(self.ccache_log)
+        try:
+            ret, out, err = self._make_target(targets, flags=flags, log=log, dryrun=dryrun, parser=parser)
+        finally:
+            self.ccache_log = None
+        self.ccache_stats = self.ccache.build_stats(os.path.join(self.out, '.ccache-stats.log'))
+
+        if self.ccache_stats is not None:
+            self.logger.info("ccache %s: hits:%d misses:%d hit rate:%.2f%% size:%dKiB", self.ccache.dir,
+                             self.ccache_stats['hits'], self.ccache_stats['misses'],
+                             self.ccache_stats['hit_rate'], self.ccache_stats['size'])
+
+        return ret, out, err
 
     def merge_config(self, diff_cfg, dryrun=False):
         kobj = KernelConfig(self.cfg, logger=self.logger)
@@ -359,3 +752,16 @@ class BuildKernel(object):
 
     def __str__(self):
         return self.uname
+
+def _make_variant(target):
+    def make_variant(self, target=target, flags=[], log=False, dryrun=False):
+        return self._make_target(target=target, flags=flags, log=log, dryrun=dryrun)
+
+    make_variant.__name__ = 'make_' + target
+    make_variant.__doc__ = "Run make %s target." % target
+
+    return make_variant
+
+# Define make_<target>() methods once, at class level.
+for _target in CONFIG_TARGETS + CLEAN_TARGETS + BUILD_TARGETS:
+    setattr(BuildKernel, 'make_' + _target, _make_variant(_target))
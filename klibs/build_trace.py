@@ -0,0 +1,200 @@
+#!/usr/bin/env python
+#
+# Kernel build timing trace class
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Basic class support
+# @TODO    :
+#
+#
+
+import os
+import time
+import json
+import logging
+import threading
+
+from klibs.build_kernel import atomic_write
+
+class BuildTrace(object):
+    """
+    Collect timing of kbuild steps (CC, LD, AR, MODPOST, etc) from the streamed
+    make output and export it in Chrome trace event format, which can be opened
+    in chrome://tracing or ui.perfetto.dev.
+
+    Kbuild prints the step line when the command starts and the command writes
+    its target, so when the build is stopped with its out dir, the duration of a
+    step is the time from its line to the mtime of its target. Steps without a
+    new target file (e.g. CHK, DESCEND) stay instant events. Time of a directory
+    is the sum of its step durations, which doesn't depend on how make
+    interleaves the jobs. Directories are also shown as spans from their first
+    to their last step, and overlapping spans/steps are put on separate rows.
+
+    Usage is,
+        trace = BuildTrace("x86_64/defconfig")
+        parser = MakeOutputParser(progress=trace.record)
+        ...
+        trace.stop(out_dir)
+        trace.dump("trace.json")
+    """
+    def __init__(self, name='build', logger=None):
+        """
+        BuildTrace init()
+        :param name: Name of the build, used as process name in trace.
+        :param logger: Logger object.
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.name = name
+        self.start = time.time()
+        self.end = None
+        self.steps = []
+        self.dirs = {}
+        self._lock = threading.Lock()
+
+    def record(self, event):
+        """
+        Record one kbuild step, can be used as MakeOutputParser progress callback.
+        :param event: Progress event dict with step, target and dir keys.
+        :return: None
+        """
+        now = time.time()
+
+        with self._lock:
+            # Duration is set by stop().
+            self.steps.append([now, event['step'], event['target'], event['dir'], None])
+            first, last, count = self.dirs.get(event['dir'], (now, now, 0))
+            self.dirs[event['dir']] = (first, now, count + 1)
+
+    def stop(self, out_dir=None):
+        """
+        Stop the trace.
+        :param out_dir: Build out dir, step targets are relative to it. If given, step durations are
+                        taken from target mtimes.
+        :return: None
+        """
+        self.end = time.time()
+
+        if out_dir is None:
+            return
+
+        with self._lock:
+            for step in self.steps:
+                try:
+                    mtime = os.path.getmtime(os.path.join(out_dir, step[2]))
+                except OSError:
+                    continue
+                # Target not written in this build, e.g. CHK of an unchanged file. Step line is read a bit
+                # after it's printed, so a quick step may write its target before that.
+                if self.start <= mtime <= self.end:
+                    step[4] = max(mtime - step[0], 0.0)
+
+    def _us(self, timestamp):
+        return int((timestamp - self.start) * 1000000)
+
+    def summary(self, top=10):
+        """
+        Get the slowest directories, by the sum of their step durations (see stop()).
+        :param top: Number of directories to return.
+        :return: List of dicts with dir, duration (sum of step durations in seconds), timed (number of steps
+                 with duration), steps and span (seconds from first to last step).
+        """
+        with self._lock:
+            dirs = dict([(key, {'dir': key, 'duration': 0.0, 'timed': 0, 'steps': value[2],
+                                'span': round(value[1] - value[0], 3)}) for key, value in self.dirs.items()])
+            for timestamp, step, target, dirname, duration in self.steps:
+                if duration is not None:
+                    dirs[dirname]['duration'] += duration
+                    dirs[dirname]['timed'] += 1
+
+        for entry in dirs.values():
+            entry['duration'] = round(entry['duration'], 3)
+
+        return sorted(dirs.values(), key=lambda x: (x['duration'], x['steps']), reverse=True)[:top]
+
+    @staticmethod
+    def _assign_rows(spans, rows):
+        # Assign each (start, end) span to the first row which is free at its start time.
+        indexes = []
+        for start, end in spans:
+            for index, row_end in enumerate(rows):
+                if row_end <= start:
+                    break
+            else:
+                index = len(rows)
+                rows.append(None)
+            rows[index] = end
+            indexes.append(index)
+
+        return indexes
+
+    def trace_events(self):
+        """
+        Get the trace events in Chrome trace event format.
+        :return: List of event dicts.
+        """
+        end = self.end if self.end is not None else time.time()
+        events = [
+            {'name': 'process_name', 'ph': 'M', 'pid': 1, 'tid': 0, 'args': {'name': self.name}},
+            {'name': self.name, 'cat': 'build', 'ph': 'X', 'pid': 1, 'tid': 0, 'ts': 0,
+             'dur': self._us(end)},
+        ]
+
+        with self._lock:
+            steps = sorted([list(step) for step in self.steps])
+            dirs = sorted(self.dirs.items(), key=lambda x: x[1][0])
+
+        # Directory spans on rows 1..N, timed steps on the rows after them.
+        rows = []
+        for (dirname, (first, last, count)), index in zip(dirs, self._assign_rows([(value[0], value[1]) for key, value
+                                                                                   in dirs], rows)):
+            events.append({'name': dirname, 'cat': 'dir', 'ph': 'X', 'pid': 1, 'tid': index + 1,
+                           'ts': self._us(first), 'dur': max(self._us(last) - self._us(first), 1),
+                           'args': {'steps': count}})
+
+        timed = [step for step in steps if step[4] is not None]
+        offset = len(rows) + 1
+        for (timestamp, step, target, dirname, duration), index in \
+                zip(timed, self._assign_rows([(step[0], step[0] + step[4]) for step in timed], [])):
+            events.append({'name': '%s %s' % (step, target), 'cat': step, 'ph': 'X', 'pid': 1,
+                           'tid': offset + index, 'ts': self._us(timestamp), 'dur': max(int(duration * 1000000), 1)})
+
+        for timestamp, step, target, dirname, duration in steps:
+            if duration is None:
+                events.append({'name': '%s %s' % (step, target), 'cat': step, 'ph': 'i', 's': 'p', 'pid': 1,
+                               'tid': 0, 'ts': self._us(timestamp)})
+
+        return events
+
+    def dump(self, outfile, top=10):
+        """
+        Write the trace JSON file.
+        :param outfile: Output file path.
+        :param top: Number of slowest directories stored in summary.
+        :return: Summary list, see summary().
+        """
+        summary = self.summary(top)
+        data = {
+            'traceEvents': self.trace_events(),
+            'displayTimeUnit': 'ms',
+            'otherData': {'name': self.name, 'slowest-dirs': summary},
+        }
+
+        atomic_write(outfile, [json.dumps(data)])
+
+        return summary
+
+    def summary_text(self, top=10):
+        out = 'Slowest directories of %s (sum of step times):\n' % self.name
+        for entry in self.summary(top):
+            out += '\t%8.2fs %6d/%d steps timed %s\n' % (entry['duration'], entry['timed'], entry['steps'],
+                                                          entry['dir'])
+
+        return out
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+#
+# Compiler cache (ccache) support class
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Basic class support
+# @TODO    :
+#
+#
+
+import os
+import re
+import logging
+import subprocess
+
+CCACHE_BIN = 'ccache'
+CCACHE_DEFAULT_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'klibs', 'ccache')
+
+# ccache >= 4 --print-stats keys
+CCACHE_HIT_KEYS = ['direct_cache_hit', 'preprocessed_cache_hit']
+CCACHE_MISS_KEYS = ['cache_miss']
+CCACHE_SIZE_KEY = 'cache_size_kibibyte'
+
+# ccache 3.x -s output lines
+CCACHE_LEGACY_REGEX = {
+    'hits': re.compile(r'^cache hit \((direct|preprocessed)\)\s+(\d+)', re.M),
+    'misses': re.compile(r'^cache miss\s+(\d+)', re.M),
+    'size': re.compile(r'^cache size\s+([\d.]+) (\w+)', re.M),
+}
+
+SIZE_UNITS = {'bytes': 1.0 / 1024, 'kB': 1, 'KB': 1, 'MB': 1024, 'GB': 1024 * 1024, 'KiB': 1, 'MiB': 1024,
+              'GiB': 1024 * 1024}
+
+def toolchain_name(cc=None, compiler='gcc'):
+    """
+    Get the toolchain name used in cache directory name.
+    :param cc: CROSS_COMPILE prefix.
+    :param compiler: Compiler name.
+    :return: Toolchain name string, e.g. aarch64-linux-gnu-gcc.
+    """
+    prefix = os.path.basename(cc) if cc else ''
+
+    return re.sub(r'[^A-Za-z0-9_.+-]', '_', prefix + compiler)
+
+class CCache(object):
+    """
+    Wrapper class for using ccache in kernel builds.
+
+    Each arch/toolchain pair uses its own cache directory and size limit, so one
+    config matrix entry can't evict the objects of another.
+
+    Configs of same arch/toolchain are built in parallel and share the cache
+    counters, so per-build hits/misses come from a per-build stats log
+    (CCACHE_STATSLOG, ccache >= 4), see env() and build_stats().
+    """
+    def __init__(self, arch, cc=None, cache_dir=None, max_size='5G', compiler='gcc', ccache_bin=CCACHE_BIN,
+                 logger=None):
+        """
+        CCache init()
+        :param arch: Kernel ARCH.
+        :param cc: CROSS_COMPILE prefix.
+        :param cache_dir: Top cache directory, arch/toolchain dir will be created under it.
+        :param max_size: Max cache size in ccache format (e.g. 5G, 500M).
+        :param compiler: Compiler name which needs to be wrapped.
+        :param ccache_bin: ccache binary path.
+        :param logger: Logger object.
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.arch = arch
+        self.cc = cc if cc else ''
+        self.compiler = compiler
+        self.max_size = max_size
+        self.ccache_bin = ccache_bin
+        self._stats_log = None
+        self.dir = os.path.join(cache_dir if cache_dir else CCACHE_DEFAULT_DIR,
+                                '%s-%s' % (arch, toolchain_name(self.cc, compiler)))
+
+        if not os.path.exists(self.dir):
+            os.makedirs(self.dir)
+
+    def env(self, env=None, stats_log=None):
+        """
+        Get the environment used for ccache enabled builds.
+        :param env: Base environment, os.environ if None.
+        :param stats_log: Per-build stats log file, see build_stats().
+        :return: New environment dict.
+        """
+        env = dict(os.environ if env is None else env)
+        env["CCACHE_DIR"] = self.dir
+        if stats_log is not None:
+            env["CCACHE_STATSLOG"] = stats_log
+        if self.max_size:
+            env["CCACHE_MAXSIZE"] = str(self.max_size)
+        # Kernel embeds build time in some objects, don't let it cause misses.
+        env.setdefault("CCACHE_SLOPPINESS", "time_macros")
+
+        return env
+
+    def make_flags(self, cc=None):
+        """
+        Get make variables which wraps the compiler with ccache.
+        :param cc: Compiler command to wrap, default is $(CROSS_COMPILE)gcc.
+        :return: List of make args.
+        """
+        cc = cc if cc else self.cc + self.compiler
+
+        return ["CC=%s %s" % (self.ccache_bin, cc)]
+
+    def _exec(self, *args):
+        try:
+            proc = subprocess.Popen([self.ccache_bin] + list(args), env=self.env(), stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE, universal_newlines=True)
+            out, err = proc.communicate()
+            return proc.returncode, out, err
+        except OSError as e:
+            return -1, '', str(e)
+
+    def supports_stats_log(self):
+        """
+        Check if ccache writes CCACHE_STATSLOG, i.e. it's ccache >= 4 (which also added --print-stats).
+        """
+        if self._stats_log is None:
+            self._stats_log = self._exec('--print-stats')[0] == 0
+
+        return self._stats_log
+
+    def stats(self):
+        """
+        Get current cache statistics.
+        :return: Dict with hits, misses and size (KiB), None if ccache is not available.
+        """
+        ret, out, err = self._exec('--print-stats')
+        if ret == 0:
+            values = {}
+            for line in out.splitlines():
+                fields = line.split('\t')
+                if len(fields) == 2 and fields[1].strip().isdigit():
+                    values[fields[0].strip()] = int(fields[1])
+            return {
+                'hits': sum([values.get(key, 0) for key in CCACHE_HIT_KEYS]),
+                'misses': sum([values.get(key, 0) for key in CCACHE_MISS_KEYS]),
+                'size': values.get(CCACHE_SIZE_KEY, 0),
+            }
+
+        # Older ccache versions doesn't support --print-stats.
+        ret, out, err = self._exec('-s')
+        if ret != 0:
+            self.logger.warning("CCache: Failed to get stats from %s: %s", self.ccache_bin, err.strip())
+            return None
+
+        size = CCACHE_LEGACY_REGEX['size'].search(out)
+        misses = CCACHE_LEGACY_REGEX['misses'].search(out)
+
+        return {
+            'hits': sum([int(match[1]) for match in CCACHE_LEGACY_REGEX['hits'].findall(out)]),
+            'misses': int(misses.group(1)) if misses else 0,
+            'size': int(float(size.group(1)) * SIZE_UNITS.get(size.group(2), 1)) if size else 0,
+        }
+
+    def build_stats(self, stats_log):
+        """
+        Get statistics of one build from its stats log.
+        :param stats_log: CCACHE_STATSLOG file of the build, see env().
+        :return: Dict with hits, misses, hit_rate (%) and size (cache size in KiB), None if ccache doesn't
+                 support stats log.
+        """
+        if not self.supports_stats_log():
+            return None
+
+        hits = 0
+        misses = 0
+
+        # One "# <source>" line per compilation, followed by the counter IDs it incremented.
+        if os.path.exists(stats_log):
+            with open(stats_log) as fobj:
+                for line in fobj:
+                    line = line.strip()
+                    if line in CCACHE_HIT_KEYS:
+                        hits += 1
+                    elif line in CCACHE_MISS_KEYS:
+                        misses += 1
+
+        stats = self.stats()
+
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits * 100.0 / (hits + misses), 2) if (hits + misses) > 0 else 0.0,
+            'size': stats['size'] if stats is not None else 0,
+        }
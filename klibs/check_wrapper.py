@@ -0,0 +1,344 @@
+#!/usr/bin/env python
+#
+# Kbuild CHECK wrapper which runs multiple source checkers
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Basic class support
+# @TODO    :
+#
+#
+
+# This file is executed by make for every checked source file, so it only uses standard modules.
+
+import os
+import sys
+import json
+import hashlib
+import tempfile
+import subprocess
+
+# Bump it if the format of cached data changes.
+CHECK_CACHE_VERSION = 1
+
+# Checker args which affect the preprocessor output.
+CPP_ARG_PREFIXES = ('-D', '-U', '-I', '-m', '-f', '-std=', '-nostdinc')
+CPP_ARGS_WITH_VALUE = ['-include', '-imacros', '-isystem', '-iquote', '-idirafter']
+# Kbuild runs $(CHECK) $(CHECKFLAGS) $(c_flags) <source>, and c_flags start with the depfile option.
+C_FLAGS_PREFIX = '-Wp,-M'
+# Sparse only flags of CHECKFLAGS, gcc rejects them on some archs.
+CHECK_ONLY_ARGS = ['-mlittle-endian', '-mbig-endian']
+
+def preprocess_args(args):
+    """
+    Get the preprocessor args from checker args. Only compiler's c_flags are used, since
+    CHECKFLAGS are meant for the checker and the compiler may not support them.
+    :param args: Checker arguments, last one is the source file.
+    :return: List of preprocessor args, without the source file.
+    """
+    start = 0
+    for index, arg in enumerate(args[:-1]):
+        if arg.startswith(C_FLAGS_PREFIX):
+            start = index + 1
+            break
+
+    cpp_args = []
+    index = start
+    while index < len(args) - 1:
+        arg = args[index]
+        if arg in CPP_ARGS_WITH_VALUE and index + 1 < len(args) - 1:
+            cpp_args += [arg, args[index + 1]]
+            index += 1
+        elif arg.startswith(CPP_ARG_PREFIXES) and arg not in CHECK_ONLY_ARGS:
+            cpp_args.append(arg)
+        index += 1
+
+    return cpp_args
+
+def check_command(config_file):
+    """
+    Get the CHECK command which runs the wrapper with given config.
+    :param config_file: Config file written by write_check_config().
+    :return: Command string.
+    """
+    script = os.path.abspath(__file__)
+    if script.endswith('.pyc') and os.path.exists(script[:-1]):
+        script = script[:-1]
+
+    return '%s %s %s' % (sys.executable, script, config_file)
+
+def hash_text(data):
+    if not isinstance(data, bytes):
+        data = data.encode('utf-8')
+
+    return hashlib.sha256(data).hexdigest()
+
+_checker_versions = {}
+
+def checker_version(cmd):
+    """
+    Get the checker version used in cache key, value is cached per process.
+    :param cmd: Checker command args.
+    :return: Output of --version, or binary size and mtime if it's not supported.
+    """
+    if cmd[0] not in _checker_versions:
+        version = None
+        try:
+            proc = subprocess.Popen([cmd[0], '--version'], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                    universal_newlines=True)
+            out = proc.communicate()[0]
+            if proc.returncode == 0 and len(out.strip()) > 0:
+                version = out.strip()
+        except OSError:
+            pass
+
+        if version is None and os.path.exists(cmd[0]):
+            stat = os.stat(cmd[0])
+            version = "size:%d mtime:%d" % (stat.st_size, int(stat.st_mtime))
+
+        _checker_versions[cmd[0]] = version
+
+    return _checker_versions[cmd[0]]
+
+def tool_log(log_dir, name):
+    return os.path.join(log_dir, name + '.log')
+
+def tool_stats(log_dir, name):
+    return os.path.join(log_dir, name + '.stats')
+
+def write_check_config(config_file, tools, log_dir, cache=None):
+    """
+    Write the wrapper config and reset the checker logs.
+    :param config_file: Config file path.
+    :param tools: List of dicts with name (e.g. sparse), cmd (list of command args) and
+                  optional version (checker version string, used in cache key).
+    :param log_dir: Directory where <name>.log of each checker is written.
+    :param cache: Checker cache params dict, None to disable the cache.
+                  dir: Cache directory.
+                  cpp: Preprocessor command, e.g. ["gcc", "-E"].
+                  roots: Source/build dirs, replaced by placeholders in cache, so trees can share entries.
+    :return: None
+    """
+    if not os.path.exists(log_dir):
+        os.makedirs(log_dir)
+
+    for tool in tools:
+        open(tool_log(log_dir, tool["name"]), 'w').close()
+        open(tool_stats(log_dir, tool["name"]), 'w').close()
+
+    with open(config_file, 'w') as fobj:
+        json.dump({"tools": tools, "log-dir": log_dir, "cache": cache}, fobj)
+
+def read_check_stats(log_dir, name):
+    """
+    Get the cache hits and misses of one checker in the last build.
+    :return: (hits, misses) tuple.
+    """
+    try:
+        with open(tool_stats(log_dir, name)) as fobj:
+            data = fobj.read()
+    except (IOError, OSError):
+        return 0, 0
+
+    return data.count('h'), data.count('m')
+
+def check_cache_size(cache_dir, max_size=None):
+    """
+    Get the checker cache size, and remove least recently used entries if it's above max_size.
+    :param cache_dir: Cache directory.
+    :param max_size: Maximum size in KiB, None for no limit.
+    :return: Cache size in KiB.
+    """
+    entries = []
+    size = 0
+    for root, dirs, files in os.walk(cache_dir):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            size += stat.st_size
+
+    if max_size is not None and size > max_size * 1024:
+        for mtime, fsize, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            size -= fsize
+            if size <= max_size * 1024:
+                break
+
+    return size // 1024
+
+class CheckWrapper(object):
+    """
+    Run every configured checker on one translation unit with the arguments
+    kbuild passes to $(CHECK), and append each checker's output to its own log.
+
+    Nothing is printed on stdout/stderr, so make output only has compiler
+    diagnostics and the checker diagnostics are demultiplexed per tool. Output
+    of one file is appended with a single write, so parallel make jobs don't
+    mix lines of different files.
+
+    If the cache is enabled, checker output is stored under a key made of the
+    preprocessed source, checker command and version, and checker args. When
+    the same key is seen again the stored output is replayed instead of running
+    the checker.
+    """
+    def __init__(self, tools, log_dir, cache=None):
+        """
+        CheckWrapper init()
+        :param tools: List of dicts with name and cmd keys.
+        :param log_dir: Checker log directory.
+        :param cache: Cache params, see write_check_config().
+        """
+        self.tools = tools
+        self.log_dir = log_dir
+        self.cache = cache
+        self.roots = []
+
+        if cache is not None:
+            # Longest first, build dir can be inside the source dir.
+            self.roots = sorted([os.path.abspath(root) for root in cache.get("roots", [])], key=len,
+                                reverse=True)
+
+    def _append(self, path, data):
+        if len(data) == 0:
+            return
+        if not data.endswith('\n') and path.endswith('.log'):
+            data += '\n'
+        # Single write, so output of parallel jobs isn't interleaved.
+        if not isinstance(data, bytes):
+            data = data.encode('utf-8')
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    def _normalize(self, data):
+        for index, root in enumerate(self.roots):
+            data = data.replace(root, '@ROOT%d@' % index)
+        return data
+
+    def _restore(self, data):
+        for index, root in enumerate(self.roots):
+            data = data.replace('@ROOT%d@' % index, root)
+        return data
+
+    def preprocess(self, args):
+        """
+        Get the hash of preprocessed source.
+        :param args: Checker arguments.
+        :return: Hex digest, None if the source can't be preprocessed.
+        """
+        try:
+            proc = subprocess.Popen(self.cache["cpp"] + preprocess_args(args) + [args[-1]], stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE, universal_newlines=True)
+            out = proc.communicate()[0]
+        except OSError:
+            return None
+
+        if proc.returncode != 0:
+            return None
+
+        return hash_text(self._normalize(out))
+
+    def _cache_path(self, tool, args, source_hash):
+        key = json.dumps({"tool": tool["name"], "cmd": tool["cmd"], "version": tool.get("version", None),
+                          "args": [self._normalize(arg) for arg in args], "source": source_hash,
+                          "cache-version": CHECK_CACHE_VERSION}, sort_keys=True)
+        key = hash_text(key)
+
+        return os.path.join(self.cache["dir"], key[:2], key)
+
+    def cache_get(self, path):
+        try:
+            with open(path) as fobj:
+                data = fobj.read()
+            # Entries are pruned by mtime, so mark it used.
+            os.utime(path, None)
+        except (IOError, OSError):
+            return None
+
+        return self._restore(data)
+
+    def cache_put(self, path, data):
+        try:
+            if not os.path.exists(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+            with os.fdopen(fd, 'w') as fobj:
+                fobj.write(self._normalize(data))
+            os.rename(tmp, path)
+        except (IOError, OSError):
+            pass
+
+    def run_tool(self, tool, args):
+        """
+        Run one checker.
+        :param tool: Tool dict.
+        :param args: Checker arguments.
+        :return: (exit status, output) tuple.
+        """
+        try:
+            proc = subprocess.Popen(tool["cmd"] + args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                    universal_newlines=True)
+            out = proc.communicate()[0]
+        except OSError as e:
+            return -1, str(e)
+
+        return proc.returncode, out
+
+    def run(self, args):
+        """
+        Run all checkers on one file.
+        :param args: Arguments given by kbuild, last one is the source file.
+        :return: 0
+        """
+        source = args[-1] if len(args) > 0 else ''
+        source_hash = self.preprocess(args) if self.cache is not None and len(args) > 0 else None
+
+        for tool in self.tools:
+            cache_path = self._cache_path(tool, args, source_hash) if source_hash is not None else None
+            out = self.cache_get(cache_path) if cache_path is not None else None
+            hit = out is not None
+
+            if not hit:
+                ret, out = self.run_tool(tool, args)
+                if ret == 0 and cache_path is not None:
+                    self.cache_put(cache_path, out)
+                # Checker failure shouldn't fail the compilation, report it as checker error instead.
+                if ret != 0:
+                    out += "%s: error: %s exited with status %d\n" % (source, tool["name"], ret)
+
+            if self.cache is not None:
+                self._append(tool_stats(self.log_dir, tool["name"]), 'h' if hit else 'm')
+            self._append(tool_log(self.log_dir, tool["name"]), out)
+
+        return 0
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+
+    if len(argv) < 1:
+        sys.stderr.write("Usage: check_wrapper.py <config file> [checker args]\n")
+        return 1
+
+    with open(argv[0]) as fobj:
+        config = json.load(fobj)
+
+    return CheckWrapper(config["tools"], config["log-dir"], config.get("cache", None)).run(argv[1:])
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+#
+# Parallel checkpatch runner class
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Basic class support
+# @TODO    :
+#
+#
+
+import os
+import re
+import hashlib
+import logging
+import subprocess
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+
+CHECKPATCH_TOTAL_REGEX = re.compile(r"total: ([0-9]*) errors, ([0-9]*) warnings,")
+# Last line of each commit report in git mode, checkpatch prints first 12 chars of SHA.
+CHECKPATCH_COMMIT_REGEX = re.compile(r'^Commit ([0-9a-f]{7,40}) \(.*\) has (?:style problems|no obvious style problems)')
+
+def parse_checkpatch_output(data):
+    """
+    Split checkpatch -g output of one or more commits.
+    :param data: checkpatch output.
+    :return: Dict of commit SHA prefix -> (error count, warning count, output) tuple. Output
+             without commit line (e.g. single commit run in quiet mode) is stored under None key.
+    """
+    results = {}
+    lines = []
+    counts = None
+
+    for line in data.splitlines():
+        lines.append(line)
+        match = CHECKPATCH_TOTAL_REGEX.search(line)
+        if match:
+            counts = (int(match.group(1)), int(match.group(2)))
+            continue
+        match = CHECKPATCH_COMMIT_REGEX.match(line)
+        if match and counts is not None:
+            results[match.group(1)] = counts + ('\n'.join(lines).strip(),)
+            lines = []
+            counts = None
+
+    if counts is not None:
+        results[None] = counts + ('\n'.join(lines).strip(),)
+
+    return results
+
+class Checkpatch(object):
+    """
+    Run checkpatch on every commit of base..head.
+
+    Commits are checked in batches (several commits per checkpatch.pl run, so
+    perl startup is paid once per batch) and batches are run in parallel. If
+    the cache (CheckpatchCache object) is given, results are stored by git
+    patch-id, commit message and script hash, so rebased and re-tested
+    commits are not checked again.
+
+    Usage is,
+        results = Checkpatch(src, "scripts/checkpatch.pl", jobs=8).run(base, head)
+    """
+    def __init__(self, src, script, jobs=None, batch_size=8, cache=None, logger=None):
+        """
+        Checkpatch init()
+        :param src: Kernel source dir.
+        :param script: checkpatch script, relative to source dir or absolute path.
+        :param jobs: Number of checkpatch processes run in parallel, default is CPU count.
+        :param batch_size: Maximum number of commits checked by one checkpatch run.
+        :param cache: CheckpatchCache object, None to disable the cache.
+        :param logger: Logger object.
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.src = os.path.abspath(src)
+        self.script = script if os.path.isabs(script) else os.path.join(self.src, script)
+        self.jobs = jobs if jobs else multiprocessing.cpu_count()
+        self.batch_size = max(batch_size, 1)
+        self.cache = cache
+
+    def _git(self, args, data=None):
+        proc = subprocess.Popen(['git'] + args, cwd=self.src, stdin=subprocess.PIPE if data is not None else None,
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        out, err = proc.communicate(data)
+        if proc.returncode != 0:
+            self.logger.error("git %s failed: %s", ' '.join(args), err.strip())
+            return None
+
+        return out
+
+    def commits(self, base, head):
+        """
+        Get the commits checked by checkpatch, merges are skipped same as checkpatch -g.
+        :return: List of commit SHAs (oldest first), None on error.
+        """
+        out = self._git(['rev-list', '--reverse', '--no-merges', '%s..%s' % (base, head)])
+
+        return out.split() if out is not None else None
+
+    def messages(self, base, head):
+        out = self._git(['log', '--no-merges', '--format=%H%x00%B%x00', '%s..%s' % (base, head)])
+        if out is None:
+            return {}
+
+        fields = out.split('\x00')
+
+        return dict([(fields[index].strip(), fields[index + 1]) for index in range(0, len(fields) - 1, 2)])
+
+    def patch_ids(self, base, head):
+        """
+        Get stable patch-id of each commit, commits without diff have no patch-id.
+        :return: Dict of commit SHA -> patch-id.
+        """
+        patches = self._git(['log', '-p', '--no-merges', '--no-color', '--no-ext-diff', '%s..%s' % (base, head)])
+        if patches is None:
+            return {}
+
+        out = self._git(['patch-id', '--stable'], patches)
+        if out is None:
+            return {}
+
+        return dict([(line.split()[1], line.split()[0]) for line in out.splitlines() if len(line.split()) == 2])
+
+    def script_id(self):
+        with open(self.script, 'rb') as fobj:
+            return hashlib.sha256(fobj.read()).hexdigest()
+
+    def _exec(self, commits):
+        try:
+            proc = subprocess.Popen([self.script, '-g'] + commits, cwd=self.src, stdout=subprocess.PIPE,
+                                    stderr=subprocess.STDOUT, universal_newlines=True)
+            out = proc.communicate()[0]
+        except OSError as e:
+            self.logger.error("Failed to run %s: %s", self.script, e)
+            return None
+
+        return parse_checkpatch_output(out)
+
+    def _check_batch(self, commits):
+        """
+        Check given commits with one checkpatch run.
+        :return: Dict of commit SHA -> (error count, warning count, output) tuple.
+        """
+        results = {}
+        parsed = self._exec(commits)
+        if parsed is None:
+            return results
+
+        for commit in commits:
+            for prefix in parsed:
+                if prefix is not None and commit.startswith(prefix):
+                    results[commit] = parsed[prefix]
+                    break
+
+        # Commits which can't be attributed are checked alone.
+        for commit in commits:
+            if commit not in results and len(commits) > 1:
+                parsed = self._exec([commit])
+                if parsed is not None and len(parsed) > 0:
+                    results[commit] = list(parsed.values())[0]
+
+        return results
+
+    def run(self, base, head):
+        """
+        Check all commits of base..head.
+        :param base: Base commit.
+        :param head: Head commit.
+        :return: List of dicts with commit, error_count, warning_count, cached and output keys in commit
+                 order, None on error.
+        """
+        commits = self.commits(base, head)
+        if commits is None:
+            return None
+
+        if not os.path.exists(self.script):
+            self.logger.error("Invalid checkpatch script %s", self.script)
+            return None
+
+        results = {}
+        keys = {}
+
+        if self.cache is not None:
+            patch_ids = self.patch_ids(base, head)
+            messages = self.messages(base, head)
+            script_id = self.script_id()
+            for commit in commits:
+                keys[commit] = self.cache.patch_key(patch_ids.get(commit, None), messages.get(commit, None),
+                                                    script_id)
+                cached = self.cache.get(keys[commit])
+                if cached is not None:
+                    results[commit] = dict(cached, commit=commit, cached=True)
+
+        pending = [commit for commit in commits if commit not in results]
+
+        self.logger.info("Checkpatch: %d commits, %d cached, %d to check", len(commits),
+                         len(commits) - len(pending), len(pending))
+
+        if len(pending) > 0:
+            # Make sure there are enough batches for all jobs.
+            size = min(self.batch_size, (len(pending) + self.jobs - 1) // self.jobs)
+            batches = [pending[index:index + size] for index in range(0, len(pending), size)]
+            pool = ThreadPool(min(self.jobs, len(batches)))
+            try:
+                batch_results = pool.map(self._check_batch, batches)
+            finally:
+                pool.close()
+                pool.join()
+
+            for batch in batch_results:
+                for commit, (errors, warnings, output) in batch.items():
+                    data = {"error_count": errors, "warning_count": warnings, "output": output}
+                    if keys.get(commit, None) is not None:
+                        self.cache.put(keys[commit], data)
+                    results[commit] = dict(data, commit=commit, cached=False)
+
+        missing = [commit for commit in commits if commit not in results]
+        if len(missing) > 0:
+            self.logger.error("Checkpatch: no results for %s", ' '.join(missing))
+            return None
+
+        return [results[commit] for commit in commits]
@@ -0,0 +1,185 @@
+#!/usr/bin/env python
+#
+# Parallel custom test runner class
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Basic class support
+# @TODO    :
+#
+#
+
+import os
+import re
+import sys
+import time
+import errno
+import signal
+import logging
+import subprocess
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+
+# Time (in seconds) given to a timed out test to exit after SIGTERM, before it's killed.
+KILL_GRACE_TIME = 5
+POLL_INTERVAL = 0.1
+
+def _log_name(name):
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', name) + '.log'
+
+def _test_cmd(cmd, memory_limit=0, cpu_limit=0):
+    """
+    Get the argv which runs the test shell command with given limits.
+    Limits are set by the shell (ulimit), so no Python code runs in the forked child, which isn't safe
+    with threads. Test gets its own session (and process group), so it can be killed with its children.
+    Python 3 starts the session in Popen, older versions use setsid(1).
+    """
+    limits = []
+    if memory_limit > 0:
+        limits.append('ulimit -v %d' % (memory_limit * 1024))
+    if cpu_limit > 0:
+        limits.append('ulimit -t %d' % cpu_limit)
+
+    argv = ['/bin/sh', '-c', ' && '.join(limits + [cmd])]
+
+    return argv if sys.version_info[0] >= 3 else ['setsid'] + argv
+
+class CustomTestRunner(object):
+    """
+    Run custom test commands in parallel.
+
+    Each test is run in its own process group with optional timeout, memory
+    and CPU time limits. stdout/stderr of the test is written to
+    <log_dir>/<name>.log instead of being kept in memory.
+
+    Usage is,
+        runner = CustomTestRunner("out/custom-test", jobs=4, timeout=600)
+        results = runner.run([{"name": "boot-test", "cmd": "./boot.sh HEAD"}])
+    """
+    def __init__(self, log_dir, jobs=None, timeout=0, memory_limit=0, cpu_limit=0, cwd=None, logger=None):
+        """
+        CustomTestRunner init()
+        :param log_dir: Directory for test log files.
+        :param jobs: Number of tests run in parallel, default is CPU count.
+        :param timeout: Default test timeout in seconds, 0 means no timeout.
+        :param memory_limit: Default address space limit in MB, 0 means no limit.
+        :param cpu_limit: Default CPU time limit in seconds, 0 means no limit.
+        :param cwd: Working directory of the tests.
+        :param logger: Logger object.
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.log_dir = os.path.abspath(log_dir)
+        self.jobs = jobs if jobs else multiprocessing.cpu_count()
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.cpu_limit = cpu_limit
+        self.cwd = cwd
+
+    def _kill(self, pid, sig):
+        try:
+            os.killpg(pid, sig)
+        except OSError as e:
+            if e.errno != errno.ESRCH:
+                raise
+
+    def _wait(self, pid, timeout):
+        """
+        Wait for test process, kill it if it doesn't finish in time.
+        :return: (status, rusage, timed out) tuple.
+        """
+        start = time.time()
+        deadline = None
+        timed_out = False
+
+        while True:
+            try:
+                wpid, status, rusage = os.wait4(pid, os.WNOHANG)
+            except OSError as e:
+                if e.errno == errno.EINTR:
+                    continue
+                raise
+            if wpid == pid:
+                return status, rusage, timed_out
+
+            now = time.time()
+            if timeout > 0 and not timed_out and now - start > timeout:
+                self.logger.error("Custom test pid %d timed out after %ds", pid, timeout)
+                timed_out = True
+                deadline = now + KILL_GRACE_TIME
+                self._kill(pid, signal.SIGTERM)
+            elif deadline is not None and now > deadline:
+                self._kill(pid, signal.SIGKILL)
+                deadline = None
+
+            time.sleep(POLL_INTERVAL)
+
+    def run_test(self, test):
+        """
+        Run a single test.
+        :param test: Dict with name and cmd (shell command string) keys, and optional timeout,
+                     memory-limit and cpu-limit keys to override the runner defaults.
+        :return: Dict with name, status, exit-status, duration, peak-rss (KB), timed-out and log keys.
+        """
+        timeout = test.get("timeout", 0) or self.timeout
+        memory_limit = test.get("memory-limit", 0) or self.memory_limit
+        cpu_limit = test.get("cpu-limit", 0) or self.cpu_limit
+        log = os.path.join(self.log_dir, _log_name(test["name"]))
+        result = {"name": test["name"], "status": False, "exit-status": -1, "duration": 0.0, "peak-rss": 0,
+                  "timed-out": False, "log": log}
+
+        self.logger.info("Running custom test %s", test["name"])
+
+        start = time.time()
+        with open(log, 'w') as fobj:
+            try:
+                proc = subprocess.Popen(_test_cmd(test["cmd"], memory_limit, cpu_limit), cwd=self.cwd, stdout=fobj,
+                                        stderr=subprocess.STDOUT,
+                                        **({"start_new_session": True} if sys.version_info[0] >= 3 else {}))
+            except OSError as e:
+                self.logger.error("Failed to run custom test %s: %s", test["name"], e)
+                return result
+
+            status, rusage, timed_out = self._wait(proc.pid, timeout)
+            # Process is reaped by wait4(), don't let Popen wait for it again.
+            proc.returncode = status
+
+        result["duration"] = round(time.time() - start, 3)
+        # ru_maxrss is in KB on Linux.
+        result["peak-rss"] = rusage.ru_maxrss
+        result["timed-out"] = timed_out
+        if os.WIFEXITED(status):
+            result["exit-status"] = os.WEXITSTATUS(status)
+        elif os.WIFSIGNALED(status):
+            result["exit-status"] = -os.WTERMSIG(status)
+        result["status"] = result["exit-status"] == 0 and not timed_out
+
+        self.logger.info("Custom test %s %s in %.1fs, exit status %d, logs in %s", test["name"],
+                         "passed" if result["status"] else "failed", result["duration"], result["exit-status"], log)
+
+        return result
+
+    def run(self, tests):
+        """
+        Run given tests in parallel.
+        :param tests: List of test dicts, see run_test().
+        :return: List of result dicts in test order.
+        """
+        if len(tests) == 0:
+            return []
+
+        if not os.path.exists(self.log_dir):
+            os.makedirs(self.log_dir)
+
+        pool = ThreadPool(min(self.jobs, len(tests)))
+        try:
+            return pool.map(self.run_test, tests)
+        finally:
+            pool.close()
+            pool.join()
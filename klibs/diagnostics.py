@@ -0,0 +1,256 @@
+#!/usr/bin/env python
+#
+# Compiler/checker diagnostics helper classes
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Basic class support
+# @TODO    :
+#
+#
+
+import os
+import re
+import json
+import hashlib
+import logging
+import collections
+
+# Location at the start of gcc/sparse (file:line:col:) and smatch (file:line func()) diagnostics.
+LOCATION_REGEX = re.compile(r'^(\S+?):\d+(?::\d+)?(?=[:\s])')
+# Locations referred in the message, e.g. "previous declaration at include/linux/usb.h:120".
+INLINE_LOCATION_REGEX = re.compile(r'(\S+\.[chsS]):\d+(?::\d+)?')
+SPACE_REGEX = re.compile(r'\s+')
+# Text diagnostic of gcc/clang/sparse, e.g. "drivers/usb/hub.c:120:5: warning: unused variable 'x' [-Wunused]".
+TEXT_DIAG_REGEX = re.compile(r'^(?P<file>[^\s:]+):(?P<line>\d+):(?:(?P<column>\d+):)?\s*'
+                             r'(?:fatal )?(?P<kind>warning|error|note):\s*(?P<message>.*?)'
+                             r'(?:\s+\[(?P<option>-W[^\]]+)\])?$')
+
+# Compiler flags for machine readable diagnostics, "json" is supported by gcc 9+ and "sarif" by clang 15+.
+DIAGNOSTICS_FLAGS = {
+    "json": "-fdiagnostics-format=json",
+    "sarif": "-fdiagnostics-format=sarif",
+}
+
+def normalize(line, roots=None):
+    """
+    Remove the parts of a diagnostic which change without changing the diagnostic itself.
+    :param line: Diagnostic line, e.g. "/src/drivers/usb/hub.c:120:5: warning: unused variable 'x'".
+    :param roots: Source/out dirs of the build, stripped from the paths.
+    :return: Normalized line, e.g. "drivers/usb/hub.c: warning: unused variable 'x'".
+    """
+    line = line.strip()
+
+    # Longest first, out dir can be inside the source dir.
+    for root in sorted([os.path.abspath(root) for root in roots or []], key=len, reverse=True):
+        line = line.replace(root + os.sep, '')
+
+    line = LOCATION_REGEX.sub(r'\1', line)
+    line = INLINE_LOCATION_REGEX.sub(r'\1', line)
+    if line.startswith('./'):
+        line = line[2:]
+
+    return SPACE_REGEX.sub(' ', line)
+
+def make_record(file, line, column, kind, message, option=None):
+    """
+    Get a structured diagnostic record.
+    :return: Dict with file, line, column, kind (warning | error | note), option and message keys.
+    """
+    return {"file": file, "line": int(line or 0), "column": int(column or 0), "kind": kind,
+            "option": option, "message": message}
+
+def format_record(record):
+    """
+    Format a record same as gcc text diagnostic, so it can be compared with text output.
+    """
+    out = "%s:%d:%d: %s: %s" % (record["file"], record["line"], record["column"], record["kind"], record["message"])
+
+    return out + (" [%s]" % record["option"] if record["option"] else '')
+
+def parse_text_diagnostic(line):
+    """
+    Parse a text diagnostic line.
+    :param line: Diagnostic line.
+    :return: Record dict, None if the line is not a diagnostic.
+    """
+    match = TEXT_DIAG_REGEX.match(line.strip())
+    if match is None:
+        return None
+
+    return make_record(match.group('file'), match.group('line'), match.group('column'), match.group('kind'),
+                       match.group('message'), match.group('option'))
+
+def _parse_gcc_json(data):
+    records = []
+    for diag in data:
+        if not isinstance(diag, dict) or diag.get("kind", None) not in ["warning", "error", "fatal error"]:
+            continue
+        locations = diag.get("locations", None) or [{}]
+        caret = locations[0].get("caret", {})
+        records.append(make_record(caret.get("file", ''), caret.get("line", 0), caret.get("column", 0),
+                                   "error" if diag["kind"] == "fatal error" else diag["kind"],
+                                   diag.get("message", ''), diag.get("option", None)))
+
+    return records
+
+def _parse_sarif(data):
+    records = []
+    for run in data.get("runs", []):
+        for result in run.get("results", []):
+            if result.get("level", "warning") not in ["warning", "error"]:
+                continue
+            locations = result.get("locations", None) or [{}]
+            location = locations[0].get("physicalLocation", {})
+            path = location.get("artifactLocation", {}).get("uri", '')
+            if path.startswith('file://'):
+                path = path[len('file://'):]
+            region = location.get("region", {})
+            rule = result.get("ruleId", None)
+            records.append(make_record(path, region.get("startLine", 0), region.get("startColumn", 0),
+                                       result.get("level", "warning"), result.get("message", {}).get("text", ''),
+                                       rule if rule and rule.startswith('-W') else None))
+
+    return records
+
+def parse_json_diagnostics(line):
+    """
+    Parse the machine readable diagnostics of one translation unit.
+    :param line: gcc JSON array or clang SARIF object, written as one line on stderr.
+    :return: List of warning/error records, None if the line is not JSON diagnostics.
+    """
+    line = line.strip()
+    if not line.startswith(('[', '{')):
+        return None
+
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return None
+
+    if isinstance(data, list):
+        return _parse_gcc_json(data)
+    if isinstance(data, dict) and "runs" in data:
+        return _parse_sarif(data)
+
+    return None
+
+def fingerprint(line, roots=None):
+    """
+    Get the stable fingerprint of a diagnostic.
+    :param line: Diagnostic line.
+    :param roots: Source/out dirs of the build.
+    :return: Hex string.
+    """
+    return hashlib.sha1(normalize(line, roots).encode('utf-8')).hexdigest()[:16]
+
+class DiagnosticDiff(object):
+    """
+    Diff of base and head diagnostics, based on fingerprints.
+
+    Diagnostics are matched by fingerprint instead of raw line, so they don't
+    show up as new when unrelated changes move them to other lines, or when
+    base and head are built in different dirs. Same diagnostic can be reported
+    many times (e.g. for each user of a header), so fingerprints are counted
+    and only the extra ones in head are new.
+
+    Usage is,
+        diff = DiagnosticDiff(base_warnings, head_warnings, roots=[src, out])
+        print(len(diff.new), len(diff.fixed), len(diff.unchanged))
+    """
+    def __init__(self, base, head, roots=None, logger=None):
+        """
+        DiagnosticDiff init()
+        :param base: List of base diagnostic lines.
+        :param head: List of head diagnostic lines.
+        :param roots: Source/out dirs of base and head builds.
+        :param logger: Logger object.
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.new = []
+        self.fixed = []
+        self.unchanged = []
+
+        base_fps = [fingerprint(line, roots) for line in base]
+        remaining = collections.Counter(base_fps)
+
+        for line in head:
+            fp = fingerprint(line, roots)
+            if remaining[fp] > 0:
+                remaining[fp] -= 1
+                self.unchanged.append(line)
+            else:
+                self.new.append(line)
+
+        for line, fp in zip(base, base_fps):
+            if remaining[fp] > 0:
+                remaining[fp] -= 1
+                self.fixed.append(line)
+
+    def counts(self):
+        return {"new": len(self.new), "fixed": len(self.fixed), "unchanged": len(self.unchanged)}
+
+class DiagnosticIndex(object):
+    """
+    Diagnostics of many builds (e.g. arch/config matrix) grouped by fingerprint.
+
+    Same warning in a shared header is reported by every config and arch which
+    builds it, the index keeps it once with the list of archs and configs which
+    hit it.
+
+    Usage is,
+        index = DiagnosticIndex()
+        index.add("warning", warnings, "x86_64", "defconfig", roots=[src, out])
+        print(index.count("warning"), index.unique_count("warning"))
+    """
+    def __init__(self):
+        self.entries = collections.OrderedDict()
+
+    def add(self, kind, lines, arch, config, roots=None):
+        """
+        Add the diagnostics of one build.
+        :param kind: warning | error.
+        :param lines: List of diagnostic lines.
+        :param arch: Arch of the build.
+        :param config: Config name of the build.
+        :param roots: Source/out dirs of the build.
+        :return: None
+        """
+        for line in lines:
+            fp = fingerprint(line, roots)
+            entry = self.entries.get(fp, None)
+            if entry is None:
+                entry = {"fingerprint": fp, "kind": kind, "message": normalize(line, roots), "count": 0,
+                         "archs": [], "configs": []}
+                self.entries[fp] = entry
+            entry["count"] += 1
+            if arch not in entry["archs"]:
+                entry["archs"].append(arch)
+            if config not in entry["configs"]:
+                entry["configs"].append(config)
+
+    def count(self, kind):
+        return sum([entry["count"] for entry in self.entries.values() if entry["kind"] == kind])
+
+    def unique_count(self, kind):
+        return len([entry for entry in self.entries.values() if entry["kind"] == kind])
+
+    def summary(self):
+        """
+        Get the index summary.
+        :return: Dict with total and unique counts and list of entries, most hit first.
+        """
+        return {
+            "warning_count": self.count("warning"),
+            "unique_warning_count": self.unique_count("warning"),
+            "error_count": self.count("error"),
+            "unique_error_count": self.unique_count("error"),
+            "diagnostics": sorted(self.entries.values(), key=lambda entry: entry["count"], reverse=True),
+        }
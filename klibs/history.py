@@ -0,0 +1,286 @@
+#!/usr/bin/env python
+#
+# Kernel test results history database
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Basic class support
+# @TODO    :
+#
+#
+
+import os
+import json
+import time
+import hashlib
+import logging
+import sqlite3
+from future.utils import viewitems
+
+from klibs.build_cache import CACHE_DEFAULT_DIR
+
+HISTORY_DEFAULT_PATH = os.path.join(CACHE_DEFAULT_DIR, 'history.db')
+
+HISTORY_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    digest TEXT UNIQUE,
+    head TEXT,
+    base TEXT,
+    branch TEXT,
+    version TEXT,
+    time REAL
+);
+CREATE TABLE IF NOT EXISTS static_results (
+    run_id INTEGER,
+    arch TEXT,
+    config TEXT,
+    test TEXT,
+    status TEXT,
+    warning_count INTEGER,
+    error_count INTEGER
+);
+CREATE TABLE IF NOT EXISTS diagnostics (
+    run_id INTEGER,
+    test TEXT,
+    fingerprint TEXT,
+    kind TEXT,
+    message TEXT,
+    count INTEGER,
+    archs TEXT,
+    configs TEXT
+);
+CREATE TABLE IF NOT EXISTS cell_costs (
+    key TEXT PRIMARY KEY,
+    arch TEXT,
+    config TEXT,
+    duration REAL,
+    time REAL
+);
+CREATE INDEX IF NOT EXISTS runs_head ON runs (head);
+CREATE INDEX IF NOT EXISTS runs_time ON runs (time);
+CREATE INDEX IF NOT EXISTS static_results_run ON static_results (run_id);
+CREATE INDEX IF NOT EXISTS static_results_cell ON static_results (arch, config, test);
+CREATE INDEX IF NOT EXISTS diagnostics_run ON diagnostics (run_id);
+CREATE INDEX IF NOT EXISTS diagnostics_fingerprint ON diagnostics (fingerprint);
+"""
+
+RUN_FIELDS = "runs.id, runs.head, runs.base, runs.branch, runs.version, runs.time"
+
+def _run_dict(row):
+    return dict(zip(["id", "head", "base", "branch", "version", "time"], row))
+
+class ResultsHistory(object):
+    """
+    SQLite store of kernel test results of many runs.
+
+    Each run stores kernel params, static test status of every arch/config
+    and the diagnostics summary (grouped by fingerprint, see DiagnosticIndex),
+    so questions like "when did this warning first appear" or "which configs
+    regressed since last week" are answered by indexed queries instead of
+    parsing old results files.
+
+    Usage is,
+        history = ResultsHistory("history.db")
+        history.add_run(kernel_results)
+        history.first_seen("3f2a9c0d1e2b4a5f")
+    """
+    def __init__(self, path=None, logger=None):
+        """
+        ResultsHistory init()
+        :param path: Database file, default is ~/.cache/klibs/history.db.
+        :param logger: Logger object.
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.path = os.path.abspath(path or HISTORY_DEFAULT_PATH)
+        if not os.path.exists(os.path.dirname(self.path)):
+            os.makedirs(os.path.dirname(self.path))
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(HISTORY_SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def add_run(self, results, timestamp=None):
+        """
+        Add the results of one test run.
+        :param results: KernelResults object or results dict (results schema).
+        :param timestamp: Run time (seconds since epoch), default is now.
+        :return: Run id, existing id if the same results are already stored.
+        """
+        if not isinstance(results, dict):
+            results = results.to_json()
+
+        digest = hashlib.sha1(json.dumps(results, sort_keys=True).encode('utf-8')).hexdigest()
+        row = self.db.execute("SELECT id FROM runs WHERE digest = ?", (digest,)).fetchone()
+        if row is not None:
+            self.logger.info("History: results already stored as run %d", row[0])
+            return row[0]
+
+        params = results.get("kernel-params", {})
+
+        with self.db:
+            run_id = self.db.execute("INSERT INTO runs (digest, head, base, branch, version, time) "
+                                     "VALUES (?, ?, ?, ?, ?, ?)",
+                                     (digest, params.get("head", ""), params.get("base", ""),
+                                      params.get("branch", ""), params.get("version", ""),
+                                      time.time() if timestamp is None else timestamp)).lastrowid
+
+            rows = []
+            for obj in results.get("static-test", []):
+                for config, tests in viewitems(obj):
+                    if config == "arch_name" or not isinstance(tests, dict):
+                        continue
+                    for test, value in viewitems(tests):
+                        # Tests which are not run are not stored.
+                        if value.get("status", "N/A") == "N/A":
+                            continue
+                        rows.append((run_id, obj["arch_name"], config, test, value["status"],
+                                     value.get("warning_count", 0), value.get("error_count", 0)))
+            self.db.executemany("INSERT INTO static_results VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+            rows = []
+            for test, summary in viewitems(results.get("static-summary", {})):
+                for entry in summary.get("diagnostics", []):
+                    rows.append((run_id, test, entry["fingerprint"], entry["kind"], entry["message"],
+                                 entry["count"], ','.join(entry["archs"]), ','.join(entry["configs"])))
+            self.db.executemany("INSERT INTO diagnostics VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+        return run_id
+
+    def add_cell_costs(self, cells, timestamp=None):
+        """
+        Store the durations of test matrix cells, used to balance matrix shards.
+        :param cells: List of dicts with key (see cell_key()), arch, config and duration keys.
+        :param timestamp: Run time, default is now.
+        :return: None
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO cell_costs VALUES (?, ?, ?, ?, ?)",
+                                [(cell["key"], cell["arch"], cell["config"], cell["duration"], timestamp)
+                                 for cell in cells])
+
+    def cell_costs(self):
+        """
+        Get the last duration of every test matrix cell.
+        :return: Dict of cell key -> duration (seconds).
+        """
+        return dict(self.db.execute("SELECT key, duration FROM cell_costs").fetchall())
+
+    def runs(self, head=None, limit=20):
+        """
+        Get the stored runs, newest first.
+        :param head: Only runs of given head commit.
+        :param limit: Maximum number of runs.
+        :return: List of run dicts.
+        """
+        query = "SELECT %s FROM runs" % RUN_FIELDS
+        args = []
+        if head is not None:
+            query += " WHERE head = ?"
+            args.append(head)
+        query += " ORDER BY time DESC LIMIT ?"
+        args.append(limit)
+
+        return [_run_dict(row) for row in self.db.execute(query, args)]
+
+    def trend(self, arch, config, test="compile-test", limit=50):
+        """
+        Get the results of one arch/config/test over time.
+        :return: List of dicts with run, status, warning_count and error_count keys, oldest first.
+        """
+        rows = self.db.execute("SELECT %s, status, warning_count, error_count FROM static_results "
+                               "JOIN runs ON runs.id = static_results.run_id "
+                               "WHERE arch = ? AND config = ? AND test = ? ORDER BY time DESC LIMIT ?" % RUN_FIELDS,
+                               (arch, config, test, limit)).fetchall()
+
+        return [{"run": _run_dict(row[:6]), "status": row[6], "warning_count": row[7], "error_count": row[8]}
+                for row in reversed(rows)]
+
+    def first_seen(self, fingerprint):
+        """
+        Find the first run which reported a diagnostic.
+        :param fingerprint: Diagnostic fingerprint or its prefix.
+        :return: Dict with run, test, fingerprint, kind and message keys, None if it's not found.
+        """
+        row = self.db.execute("SELECT %s, test, fingerprint, kind, message FROM diagnostics "
+                              "JOIN runs ON runs.id = diagnostics.run_id "
+                              "WHERE fingerprint >= ? AND fingerprint < ? ORDER BY time LIMIT 1" % RUN_FIELDS,
+                              (fingerprint, fingerprint + '\x7f')).fetchone()
+        if row is None:
+            return None
+
+        return {"run": _run_dict(row[:6]), "test": row[6], "fingerprint": row[7], "kind": row[8],
+                "message": row[9]}
+
+    def search(self, text, limit=20):
+        """
+        Find diagnostics by message text.
+        :return: List of dicts with fingerprint, kind, message, first_seen and last_seen keys.
+        """
+        rows = self.db.execute("SELECT fingerprint, kind, message, MIN(time), MAX(time) FROM diagnostics "
+                               "JOIN runs ON runs.id = diagnostics.run_id WHERE message LIKE ? "
+                               "GROUP BY fingerprint ORDER BY MIN(time) LIMIT ?", ('%' + text + '%', limit))
+
+        return [dict(zip(["fingerprint", "kind", "message", "first_seen", "last_seen"], row)) for row in rows]
+
+    def new_diagnostics(self, since, kind=None):
+        """
+        Get the diagnostics which first appeared after given time.
+        :param since: Time (seconds since epoch).
+        :param kind: warning | error, None for both.
+        :return: List of dicts with fingerprint, kind, message and first_seen keys, oldest first.
+        """
+        query = "SELECT fingerprint, kind, message, MIN(time) FROM diagnostics JOIN runs ON runs.id = diagnostics.run_id"
+        args = []
+        if kind is not None:
+            query += " WHERE kind = ?"
+            args.append(kind)
+        query += " GROUP BY fingerprint HAVING MIN(time) >= ? ORDER BY MIN(time)"
+        args.append(since)
+
+        return [dict(zip(["fingerprint", "kind", "message", "first_seen"], row)) for row in
+                self.db.execute(query, args)]
+
+    def regressions(self, since, until=None, test=None):
+        """
+        Find the arch/config/tests which got worse since given time, i.e. latest result before since is
+        compared with latest result up to until.
+        :param since: Time (seconds since epoch).
+        :param until: Time, default is now.
+        :param test: Only given test (compile-test, sparse-test or smatch-test).
+        :return: List of dicts with arch, config, test, before and after keys.
+        """
+        query = "SELECT arch, config, test, time, head, status, warning_count, error_count FROM static_results " \
+                "JOIN runs ON runs.id = static_results.run_id WHERE time <= ?"
+        args = [time.time() if until is None else until]
+        if test is not None:
+            query += " AND test = ?"
+            args.append(test)
+        query += " ORDER BY time"
+
+        before = {}
+        after = {}
+        for row in self.db.execute(query, args):
+            result = {"time": row[3], "head": row[4], "status": row[5], "warning_count": row[6],
+                      "error_count": row[7]}
+            (before if row[3] < since else after)[row[:3]] = result
+
+        regressions = []
+        for key, new in sorted(after.items()):
+            old = before.get(key, None)
+            if old is None:
+                continue
+            if (old["status"] == "Passed" and new["status"] == "Failed") or \
+                    new["warning_count"] > old["warning_count"] or new["error_count"] > old["error_count"]:
+                regressions.append({"arch": key[0], "config": key[1], "test": key[2], "before": old, "after": new})
+
+        return regressions
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+#
+# GNU make jobserver class
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Basic class support
+# @TODO    :
+#
+#
+
+import os
+import errno
+import select
+import shutil
+import logging
+import tempfile
+import threading
+import multiprocessing
+from contextlib import contextmanager
+
+JOBSERVER_TOKEN = b'+'
+
+class JobServer(object):
+    """
+    GNU make jobserver shared by all make commands spawned by klibs.
+
+    The token pool holds one token for each slot. Caller takes one token before
+    starting make, which covers the implicit job slot every make owns. make takes
+    the remaining tokens from the pool for its extra jobs. So the total number of
+    parallel jobs of all concurrent builds never exceeds the slot count.
+
+    Usage is,
+        jobserver = JobServer(16)
+        with jobserver.slot():
+            subprocess.call(['make'], env=jobserver.env(), close_fds=False)
+    """
+    def __init__(self, slots=None, fifo=False, logger=None):
+        """
+        JobServer init()
+        :param slots: Number of job slots. Defaults to cpu_count.
+        :param fifo: Use named FIFO (make >= 4.4) instead of anonymous pipe.
+        :param logger: Logger object.
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.slots = slots if slots else multiprocessing.cpu_count()
+        self.fifo = None
+        self._fifo_dir = None
+
+        if fifo:
+            self._fifo_dir = tempfile.mkdtemp("_dir", "jobserver_")
+            self.fifo = os.path.join(self._fifo_dir, 'fifo')
+            os.mkfifo(self.fifo, 0o600)
+            # O_RDWR open never blocks on a FIFO and keeps it alive while we hold it.
+            self.rfd = os.open(self.fifo, os.O_RDWR)
+            self.wfd = os.dup(self.rfd)
+        else:
+            self.rfd, self.wfd = os.pipe()
+
+        for fd in (self.rfd, self.wfd):
+            if hasattr(os, 'set_inheritable'):
+                os.set_inheritable(fd, True)
+
+        os.write(self.wfd, JOBSERVER_TOKEN * self.slots)
+
+        self.logger.debug("JobServer: created %d slots (fds %d,%d)", self.slots, self.rfd, self.wfd)
+
+    def makeflags(self):
+        """
+        Get the MAKEFLAGS value used by sub make to join this jobserver.
+        :return: MAKEFLAGS string.
+        """
+        if self.fifo is not None:
+            return " -j%d --jobserver-auth=fifo:%s" % (self.slots, self.fifo)
+
+        # --jobserver-fds is for make < 4.2, --jobserver-auth for newer versions.
+        return " -j%d --jobserver-fds=%d,%d --jobserver-auth=%d,%d" % (self.slots, self.rfd, self.wfd,
+                                                                       self.rfd, self.wfd)
+
+    def env(self, env=None):
+        """
+        Get environment for make with jobserver MAKEFLAGS.
+        :param env: Base environment, os.environ if None.
+        :return: New environment dict.
+        """
+        env = dict(os.environ if env is None else env)
+        env["MAKEFLAGS"] = self.makeflags()
+        env.pop("MFLAGS", None)
+
+        return env
+
+    def pass_fds(self):
+        """
+        File descriptors which needs to be inherited by make.
+        :return: Tuple of fds.
+        """
+        return (self.rfd, self.wfd)
+
+    def acquire(self):
+        """
+        Take one token from the pool, block until one is available.
+        :return: Token.
+        """
+        while True:
+            try:
+                token = os.read(self.rfd, 1)
+                if len(token) == 1:
+                    return token
+            except OSError as e:
+                # make sets O_NONBLOCK on the shared pipe, wait for a token in that case.
+                if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    select.select([self.rfd], [], [])
+                elif e.errno != errno.EINTR:
+                    raise
+
+    def release(self, token=JOBSERVER_TOKEN):
+        """
+        Return the token to the pool.
+        :param token: Token returned by acquire().
+        :return: None
+        """
+        os.write(self.wfd, token)
+
+    def resize(self, slots):
+        """
+        Change the number of job slots. Shrinking waits for the in use tokens to be returned.
+        :param slots: New number of job slots.
+        :return: None
+        """
+        if slots is None or slots <= 0 or slots == self.slots:
+            return
+
+        if slots > self.slots:
+            os.write(self.wfd, JOBSERVER_TOKEN * (slots - self.slots))
+        else:
+            for i in range(self.slots - slots):
+                self.acquire()
+
+        self.logger.debug("JobServer: resized from %d to %d slots", self.slots, slots)
+
+        self.slots = slots
+
+    @contextmanager
+    def slot(self):
+        """
+        Context manager which holds one job slot.
+        """
+        token = self.acquire()
+        try:
+            yield token
+        finally:
+            self.release(token)
+
+    def close(self):
+        for fd in (self.rfd, self.wfd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+        if self._fifo_dir is not None:
+            shutil.rmtree(self._fifo_dir, ignore_errors=True)
+            self._fifo_dir = None
+
+_jobserver = None
+_jobserver_lock = threading.Lock()
+
+def get_jobserver(slots=None, logger=None):
+    """
+    Get the klibs wide jobserver, create it on first use.
+    :param slots: Number of job slots, existing jobserver is resized if it differs.
+    :param logger: Logger object.
+    :return: JobServer object.
+    """
+    global _jobserver
+
+    with _jobserver_lock:
+        if _jobserver is None:
+            _jobserver = JobServer(slots, logger=logger)
+        else:
+            _jobserver.resize(slots)
+
+        return _jobserver
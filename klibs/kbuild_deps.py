@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+#
+# Kbuild dependency graph class
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Basic class support
+# @TODO    :
+#
+#
+
+import os
+import re
+import logging
+
+# Changes in these files can change the set of built objects or their flags, so they need a full check.
+BUILD_FILE_REGEX = re.compile(r'(^|/)(Kconfig[^/]*|Makefile[^/]*|Kbuild[^/]*)$|^scripts/')
+
+CMD_FILE_REGEX = re.compile(r'^\..+\.o\.cmd$')
+
+# Sources of objects in the graph, checkers are only run on C sources but assembly objects are rebuilt too.
+SOURCE_SUFFIXES = ('.c', '.S')
+
+def object_source(src_dir, target):
+    """
+    Find the source file of given object target.
+    :param src_dir: Kernel source dir.
+    :param target: Source relative object path, e.g. kernel/fork.o.
+    :return: Source relative path of C or assembly source, None if it does not exist in src_dir.
+    """
+    for suffix in SOURCE_SUFFIXES:
+        source = os.path.splitext(target)[0] + suffix
+        if os.path.exists(os.path.join(src_dir, source)):
+            return source
+
+    return None
+
+class DependencyGraph(object):
+    """
+    Dependency graph of C and assembly objects, read from the .<object>.cmd files kbuild
+    (fixdep) writes next to each object in the out dir.
+
+    Usage is,
+        graph = DependencyGraph(out_dir, src_dir)
+        objects = graph.affected_objects(["include/linux/usb.h", "drivers/usb/core/hub.c"])
+    """
+    def __init__(self, out_dir, src_dir, logger=None):
+        """
+        DependencyGraph init()
+        :param out_dir: Kernel out dir of an earlier build.
+        :param src_dir: Kernel source dir.
+        :param logger: Logger object.
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.out = os.path.abspath(out_dir)
+        self.src = os.path.abspath(src_dir)
+        # Object -> source file, and file -> set of objects which depend on it.
+        self.sources = {}
+        self.users = {}
+
+        if os.path.exists(self.out):
+            self._load()
+
+    def _src_path(self, path):
+        """
+        Convert dependency path to source relative path, None if it's outside source tree.
+        """
+        if not os.path.isabs(path):
+            path = os.path.join(self.out, path)
+        path = os.path.normpath(path)
+
+        if self.out != self.src and path.startswith(self.out + os.sep):
+            return None
+        if not path.startswith(self.src + os.sep):
+            return None
+
+        return os.path.relpath(path, self.src)
+
+    def parse_cmd_file(self, path):
+        """
+        Parse one .cmd file.
+        :param path: Path of .cmd file.
+        :return: (object, source, deps list) tuple, object is None for objects without C or assembly source.
+        """
+        obj = source = None
+        deps = []
+        in_deps = False
+
+        with open(path) as fobj:
+            for line in fobj:
+                line = line.strip()
+                if in_deps:
+                    if len(line) == 0:
+                        break
+                    if not line.startswith('$('):
+                        deps.append(line.rstrip('\\').strip())
+                elif line.startswith('source_'):
+                    obj, source = [x.strip() for x in line[len('source_'):].split(':=', 1)]
+                elif line.startswith('deps_'):
+                    in_deps = True
+
+        if source is None or not source.endswith(SOURCE_SUFFIXES):
+            return None, None, []
+
+        return obj, source, deps
+
+    def _load(self):
+        for root, dirs, files in os.walk(self.out):
+            for name in files:
+                if not CMD_FILE_REGEX.match(name):
+                    continue
+                try:
+                    obj, source, deps = self.parse_cmd_file(os.path.join(root, name))
+                except (IOError, OSError, ValueError):
+                    continue
+                if obj is None:
+                    continue
+
+                source = self._src_path(source)
+                if source is None:
+                    continue
+
+                obj = os.path.relpath(os.path.normpath(os.path.join(self.out, obj)), self.out)
+                self.sources[obj] = source
+                self.users.setdefault(source, set()).add(obj)
+                for dep in deps:
+                    dep = self._src_path(dep)
+                    if dep is not None:
+                        self.users.setdefault(dep, set()).add(obj)
+
+        self.logger.debug("DependencyGraph: %d objects in %s", len(self.sources), self.out)
+
+    def valid(self):
+        return len(self.sources) > 0
+
+    def affected_objects(self, changed_files):
+        """
+        Get the objects which need to be checked again after given files changed.
+        :param changed_files: List of source relative file paths.
+        :return: Sorted list of object targets, None if full check is needed.
+        """
+        if not self.valid():
+            self.logger.info("DependencyGraph: No dependency info in %s", self.out)
+            return None
+
+        objects = set()
+        for path in changed_files:
+            if BUILD_FILE_REGEX.search(path):
+                self.logger.info("DependencyGraph: %s changed, full check is needed", path)
+                return None
+            # Files which are not in the graph are not built with this config. New sources need a
+            # Makefile change, which is handled above.
+            if path in self.users:
+                objects |= self.users[path]
+
+        return sorted(objects)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+#
+# Parallel kernel bisect class
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Basic class support
+# @TODO    :
+#
+#
+
+import logging
+import threading
+
+from pyshell import GitShell
+
+class KernelBisect(object):
+    """
+    Find the first bad commit of good..bad with a k-ary search.
+
+    Every round splits the remaining range with jobs midpoints and tests them
+    in parallel, each in its own worktree (see WorktreePool), so a range of N
+    commits needs about log(N)/log(jobs + 1) rounds instead of log2(N) serial
+    tests. Commits are taken from the first parent history of bad.
+
+    Test function is called as test(commit, src_path) and returns True if the
+    commit is good, False if it's bad and None if it can't be tested (skipped,
+    same as "git bisect skip"). Skipped commits stay in the range, so if they
+    are right before the first bad commit, the result is ambiguous and run()
+    returns None with the possible first bad commits in candidates.
+
+    Usage is,
+        bisect = KernelBisect(src, build_test, worktrees, jobs=3)
+        first_bad = bisect.run("v4.18", "HEAD")
+    """
+    def __init__(self, src, test, worktrees, jobs=2, logger=None):
+        """
+        KernelBisect init()
+        :param src: Kernel git source path.
+        :param test: Test function.
+        :param worktrees: WorktreePool object.
+        :param jobs: Number of commits tested in each round.
+        :param logger: Logger object.
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.git = GitShell(wd=src, logger=self.logger)
+        self.test = test
+        self.worktrees = worktrees
+        self.jobs = max(jobs, 1)
+        # List of (commit, status) tuples in test order, status is True | False | None.
+        self.tested = []
+        self.rounds = 0
+        # Possible first bad commits after run(), more than one if skipped commits hide it.
+        self.candidates = []
+        self._lock = threading.Lock()
+
+    def commits(self, good, bad):
+        """
+        Get the commits of good..bad.
+        :return: List of commit SHAs (oldest first), None on error.
+        """
+        ret, out, err = self.git.cmd('rev-list', '--reverse', '--first-parent', '%s..%s' % (good, bad))
+        if ret != 0:
+            self.logger.error("git rev-list %s..%s failed", good, bad)
+            return None
+
+        return out.split()
+
+    def _test(self, commit, results):
+        status = None
+        try:
+            with self.worktrees.checkout(commit) as path:
+                if path is not None:
+                    status = self.test(commit, path)
+        except Exception as e:
+            self.logger.error("Bisect test of %s failed: %s", commit, e)
+            status = None
+
+        with self._lock:
+            results[commit] = status
+            self.tested.append((commit, status))
+
+    def test_commits(self, commits):
+        """
+        Test given commits in parallel.
+        :return: Dict of commit -> status.
+        """
+        results = {}
+        threads = [threading.Thread(target=self._test, args=(commit, results)) for commit in commits]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return results
+
+    def _midpoints(self, candidates):
+        # Split candidates in jobs + 1 parts, last candidate is known bad so it's not tested.
+        count = min(self.jobs, len(candidates) - 1)
+        points = []
+        for index in range(1, count + 1):
+            point = candidates[index * len(candidates) // (count + 1) - 1]
+            if point not in points and point != candidates[-1]:
+                points.append(point)
+
+        return points
+
+    def run(self, good, bad):
+        """
+        Bisect good..bad, good commit must pass and bad commit must fail the test.
+        :param good: Good commit.
+        :param bad: Bad commit.
+        :return: First bad commit SHA, None if it's not found or it's ambiguous (see candidates).
+        """
+        self.candidates = []
+
+        commits = self.commits(good, bad)
+        if commits is None or len(commits) == 0:
+            return None
+
+        # Candidates for first bad commit, last one is known bad.
+        candidates = commits
+        skipped = set()
+
+        while len(candidates) > 1:
+            untested = [commit for commit in candidates[:-1] if commit not in skipped]
+            if len(untested) == 0:
+                break
+
+            points = self._midpoints(untested + candidates[-1:])
+            self.rounds += 1
+            self.logger.info("Bisect round %d: %d candidates, testing %s", self.rounds, len(candidates),
+                             ' '.join([point[:12] for point in points]))
+
+            results = self.test_commits(points)
+
+            # Keep the candidates after the last good commit, up to first bad commit.
+            first = 0
+            last = len(candidates) - 1
+            for index, commit in enumerate(candidates):
+                if commit not in results:
+                    continue
+                if results[commit] is True and index < last:
+                    first = index + 1
+                elif results[commit] is False:
+                    last = index
+                    break
+
+            skipped.update([point for point in points if results[point] is None])
+            candidates = candidates[first:last + 1]
+
+        self.candidates = candidates
+
+        if len(candidates) > 1:
+            self.logger.error("First bad commit is one of %s, %d commits before %s can't be tested",
+                              ' '.join([commit[:12] for commit in candidates]), len(candidates) - 1,
+                              candidates[-1][:12])
+            return None
+
+        self.logger.info("First bad commit is %s, found in %d rounds", candidates[0], self.rounds)
+
+        return candidates[0]
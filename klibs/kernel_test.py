@@ -19,18 +19,44 @@
 
 import os
 import logging, logging.config
-import collections
 import tempfile
-import re
+import time
+import json
 import shutil
+import threading
 import pkg_resources
 from future.utils import viewitems
 
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
 from jsonparser import JSONParser
-from klibs import BuildKernel, is_valid_kernel
+from klibs import BuildKernel, is_valid_kernel, get_kernel_version
 from klibs.decorators import format_h1
 from pyshell import PyShell, GitShell
 from klibs import Email
+from klibs.scheduler import BuildScheduler, estimate_job_memory, get_total_memory
+from klibs.jobserver import get_jobserver
+from klibs.ccache import CCache
+from klibs.build_cache import BuildCache, BaselineCache, CheckpatchCache
+from klibs.checkpatch import Checkpatch
+from klibs.kernel_bisect import KernelBisect
+from klibs.custom_runner import CustomTestRunner
+from klibs.worktree import WorktreePool
+from klibs.kbuild_deps import DependencyGraph, object_source
+from klibs.diagnostics import DiagnosticDiff, DiagnosticIndex
+from klibs.results_store import StaticResults, static_tests
+from klibs.run_journal import RunJournal, cell_key
+from klibs.history import ResultsHistory
+from klibs.report import get_report_writer, write_report
+from klibs.shard import parse_shard, partition, plan_digest, default_cost
+from klibs.make_parser import MakeOutputParser
+from klibs.build_trace import BuildTrace
+from klibs.check_wrapper import check_command, write_check_config, tool_log, read_check_stats, check_cache_size, \
+    checker_version
+from klibs.build_cache import CACHE_DEFAULT_DIR
 
 CHECK_PATCH_SCRIPT='scripts/checkpatch.pl'
 SPARSE_BIN_PATH='/usr/bin/sparse'
@@ -47,11 +73,16 @@ class KernelResults(object):
         self.src = src
         self.results = {}
         self.kernel_params = {}
-        self.static_results = []
+        self.static = StaticResults(supported_archs, supported_configs)
         self.checkpatch_results = {}
         self.custom_results = []
         self.bisect_results = {}
-        self.custom_configs = []
+        self.static_summary = {}
+        self.diagnostic_index = {}
+        self.journal = None
+        self.reports = []
+        self.streamed = set()
+        self.lock = threading.RLock()
 
         res_obj = {}
 
@@ -60,21 +91,23 @@ class KernelResults(object):
         self.kernel_params["branch"] = ""
         self.kernel_params["version"] = "Linux"
 
-        for arch in supported_archs:
-            self.add_arch(arch)
-
         self.checkpatch_results["status"] = "N/A"
         self.checkpatch_results["warning_count"] = 0
         self.checkpatch_results["error_count"] = 0
+        self.checkpatch_results["commits"] = []
 
         self.bisect_results["status"] = "N/A"
         self.bisect_results["patch-list"] = []
+        self.bisect_results["runs"] = []
+        self.commit_results = []
 
+        # Static test results are kept in self.static and only converted to JSON on dump.
         res_obj["kernel-params"] = self.kernel_params
-        res_obj["static-test"] = self.static_results
+        res_obj["static-summary"] = self.static_summary
         res_obj["checkpatch"] = self.checkpatch_results
         res_obj["custom-test"] = self.custom_results
         res_obj["bisect"] = self.bisect_results
+        res_obj["commit-test"] = self.commit_results
 
         self.cfgobj = JSONParser(self.schema, res_obj, extend_defaults=True)
         self.results = self.cfgobj.get_cfg()
@@ -84,23 +117,18 @@ class KernelResults(object):
                 return None
 
     def get_static_obj(self, arch):
-        for index, obj in enumerate(self.static_results):
-            if isinstance(obj, dict) and obj.has_key("arch_name") and obj["arch_name"] == arch:
-                return index, obj
+        index = self.static.arch_index(arch)
+        if index < 0:
+            return -1, None
 
-        return -1, None
+        return index, self.static.arch_json(arch)
 
     def add_arch(self, arch):
         if arch is None or len(arch) == 0:
             return False
 
-        if self.get_static_obj(arch)[1] is None:
-            obj = {}
-            obj["arch_name"] = arch
-            self.static_results.append(obj)
-
-            for config in supported_configs + self.custom_configs:
-                self.add_config(config)
+        with self.lock:
+            self.static.add_arch(arch)
 
         return True
 
@@ -108,24 +136,8 @@ class KernelResults(object):
         if name is None or len(name) == 0:
             return False
 
-        for obj in self.static_results:
-            if not obj.has_key(name):
-                obj[name] = {}
-                obj[name]["compile-test"] = {}
-                obj[name]["compile-test"]["status"] = "N/A"
-                obj[name]["compile-test"]["warning_count"] = 0
-                obj[name]["compile-test"]["error_count"] = 0
-                obj[name]["sparse-test"] = {}
-                obj[name]["sparse-test"]["status"] = "N/A"
-                obj[name]["sparse-test"]["warning_count"] = 0
-                obj[name]["sparse-test"]["error_count"] = 0
-                obj[name]["smatch-test"] = {}
-                obj[name]["smatch-test"]["status"] = "N/A"
-                obj[name]["smatch-test"]["warning_count"] = 0
-                obj[name]["smatch-test"]["error_count"] = 0
-
-        if name not in supported_configs and name not in self.custom_configs:
-            self.custom_configs.append(name)
+        with self.lock:
+            self.static.add_config(name)
 
         return True
 
@@ -146,48 +158,233 @@ class KernelResults(object):
             self.logger.warning(e)
             return False
         else:
-            self.results = self.merge_results(self.results, new_results)
+            with self.lock:
+                self.static.load(new_results.get("static-test", []))
+                self.results = self.merge_results(self.results, dict([(key, value) for key, value in
+                                                                      viewitems(new_results) if key != "static-test"]))
             return True
 
-    def _update_static_test_results(self, type, arch, config, status, warning_count=0, error_count=0):
-        for obj in self.results["static-test"]:
-            if obj['arch_name'] == arch:
-                obj[config][type]["status"] = "Passed" if status else "Failed"
-                obj[config][type]["warning_count"] = warning_count
-                obj[config][type]["error_count"] = error_count
+    def merge(self, other):
+        """
+        Merge results of other KernelResults object, e.g. from another test run of the same kernel.
+        :param other: KernelResults object.
+        :return: None
+        """
+        with self.lock:
+            self.static.merge(other.static)
+            self.results = self.merge_results(self.results, other.results)
 
-    def update_compile_test_results(self, arch, config, status, warning_count=0, error_count=0):
-        self._update_static_test_results("compile-test", arch, config, status, warning_count, error_count)
+    def set_journal(self, journal):
+        """
+        Append every result update to given RunJournal object.
+        """
+        self.journal = journal
 
-    def update_sparse_test_results(self, arch, config, status, warning_count=0, error_count=0):
-        self._update_static_test_results("sparse-test", arch, config, status, warning_count, error_count)
+    def _log(self, kind, **args):
+        if self.journal is not None:
+            self.journal.append(kind, args=args)
 
-    def update_smatch_test_results(self, arch, config, status, warning_count=0, error_count=0):
-        self._update_static_test_results("smatch-test", arch, config, status, warning_count, error_count)
+    def replay(self, entries):
+        """
+        Rebuild the results from run journal entries.
+        :param entries: List of journal entries.
+        :return: Number of results replayed.
+        """
+        handlers = {
+            "static": self._update_static_test_results,
+            "diagnostics": self.add_static_diagnostics,
+            "custom": self.update_custom_test_results,
+            "checkpatch": self.update_checkpatch_results,
+            "bisect": self.update_bisect_results,
+            "commit": self.update_commit_test_results,
+        }
+        count = 0
+        journal = self.journal
+        self.journal = None
+        try:
+            for entry in entries:
+                if entry.get("kind", None) in handlers:
+                    handlers[entry["kind"]](**entry["args"])
+                    count += 1
+        finally:
+            self.journal = journal
+
+        return count
+
+    def _update_static_test_results(self, type, arch, config, status, warning_count=0, error_count=0, **kwargs):
+        self._log("static", type=type, arch=arch, config=config, status=status, warning_count=warning_count,
+                  error_count=error_count, **kwargs)
+        with self.lock:
+            self.static.update(arch, config, type, "Passed" if status else "Failed", warning_count, error_count,
+                               **kwargs)
+
+    def _stream_cell(self, writers, arch, config):
+        for type in static_tests:
+            record = self.static.get(arch, config, type)
+            # Tests which are not run are left out.
+            if record.status != "N/A":
+                for writer in writers:
+                    writer.add_cell(arch, config, type, record)
+        for writer in writers:
+            writer.flush()
+
+    def complete_cell(self, arch, config):
+        """
+        Stream the static test results of arch/config to report writers, once all its tests are done.
+        Every cell is streamed only once, with final status of its tests.
+        :param arch: Arch name.
+        :param config: Config name.
+        :return: None
+        """
+        with self.lock:
+            if (arch, config) not in self.streamed:
+                self.streamed.add((arch, config))
+                self._stream_cell(self.reports, arch, config)
+
+    def add_report(self, writer):
+        """
+        Stream static test results to given ReportWriter object as their cells are completed.
+        """
+        with self.lock:
+            writer.start(self)
+            # Cells which are already completed, e.g. replayed from journal.
+            for arch in self.static.archs:
+                for config in self.static.configs:
+                    if (arch, config) in self.streamed:
+                        self._stream_cell([writer], arch, config)
+            self.reports.append(writer)
+
+    def finish_reports(self):
+        with self.lock:
+            # Cells not completed by the test matrix, e.g. tests run directly.
+            for arch in self.static.archs:
+                for config in self.static.configs:
+                    self.complete_cell(arch, config)
+            for writer in self.reports:
+                writer.finish(self)
+            self.reports = []
+
+    def write_report(self, fobj, format="text"):
+        """
+        Write the report of current results.
+        :param fobj: File like object.
+        :param format: text | junit | html.
+        :return: None
+        """
+        with self.lock:
+            write_report(self, fobj, format, logger=self.logger)
+
+    def update_compile_test_results(self, arch, config, status, warning_count=0, error_count=0, ccache=None,
+                                    trace=None, diagnostics=None):
+        self._update_static_test_results("compile-test", arch, config, status, warning_count, error_count,
+                                         ccache=ccache, trace=trace, diagnostics=diagnostics)
+
+    def update_sparse_test_results(self, arch, config, status, warning_count=0, error_count=0, check_cache=None,
+                                   diff=None):
+        self._update_static_test_results("sparse-test", arch, config, status, warning_count, error_count,
+                                         check_cache=check_cache, diff=diff)
+
+    def update_smatch_test_results(self, arch, config, status, warning_count=0, error_count=0, check_cache=None,
+                                   diff=None):
+        self._update_static_test_results("smatch-test", arch, config, status, warning_count, error_count,
+                                         check_cache=check_cache, diff=diff)
+
+    def add_static_diagnostics(self, type, arch, config, warnings=[], errors=[], roots=None):
+        """
+        Add the diagnostics of one arch/config to the matrix summary, where they are grouped by fingerprint.
+        :param type: compile-test | sparse-test | smatch-test.
+        :param warnings: List of warning lines.
+        :param errors: List of error lines.
+        :param roots: Source/out dirs of the build.
+        :return: None
+        """
+        self._log("diagnostics", type=type, arch=arch, config=config, warnings=warnings, errors=errors, roots=roots)
+        with self.lock:
+            index = self.diagnostic_index.setdefault(type, DiagnosticIndex())
+            index.add("warning", warnings, arch, config, roots)
+            index.add("error", errors, arch, config, roots)
+            self.results["static-summary"][type] = index.summary()
 
     def update_custom_test_results(self, name, status, **kwargs):
         test_obj = {}
         new_obj = True
 
-        for obj in self.custom_results:
-            if obj['name'] == name:
-                test_obj = obj
-                new_obj = False
+        self._log("custom", name=name, status=status, **kwargs)
+
+        with self.lock:
+            for obj in self.custom_results:
+                if obj['name'] == name:
+                    test_obj = obj
+                    new_obj = False
 
-        test_obj["name"] = name
-        test_obj["status"] = "Passed" if status else "Failed"
-        for key, value in viewitems(kwargs):
-            test_obj[key] = value
+            test_obj["name"] = name
+            test_obj["status"] = "Passed" if status else "Failed"
+            for key, value in viewitems(kwargs):
+                test_obj[key] = value
 
-        if new_obj:
-            self.custom_results.append(test_obj)
+            if new_obj:
+                self.custom_results.append(test_obj)
 
-    def update_checkpatch_results(self, status, warning_count=None, error_count=None):
+    def update_checkpatch_results(self, status, warning_count=None, error_count=None, commits=None):
+        self._log("checkpatch", status=status, warning_count=warning_count, error_count=error_count, commits=commits)
         self.results["checkpatch"]["status"] = "Passed" if status else "Failed"
         if warning_count is not None:
             self.results["checkpatch"]["warning_count"] = warning_count
         if error_count is not None:
             self.results["checkpatch"]["error_count"] = error_count
+        if commits is not None:
+            self.results["checkpatch"]["commits"] = commits
+
+    def update_bisect_results(self, arch, config, first_bad=None, tested=[], rounds=0, base=None, head=None,
+                              candidates=None):
+        """
+        Add the results of one arch/config bisect.
+        :param first_bad: First bad commit, None if it's not found.
+        :param tested: List of (commit, status) tuples, status is True | False | None (skipped).
+        :param rounds: Number of bisect rounds.
+        :param base: Good commit of bisect range.
+        :param head: Bad commit of bisect range.
+        :param candidates: Possible first bad commits, if untested commits make the result ambiguous.
+        :return: None
+        """
+        self._log("bisect", arch=arch, config=config, first_bad=first_bad, tested=tested, rounds=rounds, base=base,
+                  head=head, candidates=candidates)
+        with self.lock:
+            bisect = self.results["bisect"]
+            bisect["runs"].append({
+                "arch": arch,
+                "config": config,
+                "base": base or "",
+                "head": head or "",
+                "first-bad-commit": first_bad if first_bad is not None else "",
+                "candidates": candidates if candidates is not None and len(candidates) > 1 else [],
+                "rounds": rounds,
+                "tested": [{"commit": commit, "status": "N/A" if status is None else
+                            ("Passed" if status else "Failed")} for commit, status in tested],
+            })
+            if first_bad is not None and first_bad not in bisect["patch-list"]:
+                bisect["patch-list"].append(first_bad)
+            bisect["status"] = "Failed" if len(bisect["patch-list"]) > 0 or \
+                len([run for run in bisect["runs"] if len(run.get("candidates", [])) > 0]) > 0 else "Passed"
+
+    def update_commit_test_results(self, arch, config, commit, status, warning_count=0, error_count=0):
+        self._log("commit", arch=arch, config=config, commit=commit, status=status, warning_count=warning_count,
+                  error_count=error_count)
+        with self.lock:
+            self.results["commit-test"].append({"arch": arch, "config": config, "commit": commit,
+                                                "status": "Passed" if status else "Failed",
+                                                "warning_count": warning_count, "error_count": error_count})
+
+    def update_shard_results(self, index, count, plan):
+        """
+        Record which shard of the test matrix these results are.
+        :param index: Shard index (1 based).
+        :param count: Number of shards.
+        :param plan: Shard plan digest, same for all shards of one run.
+        :return: None
+        """
+        with self.lock:
+            self.results["shard"] = {"index": index, "count": count, "plan": plan}
 
     def update_kernel_params(self, version=None, branch=None, base=None, head=None):
         if version is not None:
@@ -211,17 +408,47 @@ class KernelResults(object):
         return out + '\n'
 
     def static_test_results(self):
-        width = len(max(supported_configs + self.custom_configs, key=len)) * 2
-        out = 'Static Test Results:\n'
-        for obj in self.results["static-test"]:
-            out += '\t%s results:\n' % obj['arch_name']
-            for config in supported_configs + self.custom_configs:
-                out += '\t\t%s results:\n' % config
-                for type in ["compile-test", "sparse-test", "smatch-test"]:
-                    out += '\t\t\t%s results:\n' % type
-                    out += ('\t\t\t\t%-' + str(width) + 's: %s\n') % ("status", obj[config][type]["status"])
-                    out += ('\t\t\t\t%-' + str(width) + 's: %s\n') % ("warning", obj[config][type]["warning_count"])
-                    out += ('\t\t\t\t%-' + str(width) + 's: %s\n') % ("error", obj[config][type]["error_count"])
+        width = str(len(max(self.static.configs, key=len)) * 2)
+        fmt = '\t\t\t\t%-' + width + 's: %s\n'
+        lines = ['Static Test Results:\n']
+        for arch in self.static.archs:
+            lines.append('\t%s results:\n' % arch)
+            for config in self.static.configs:
+                lines.append('\t\t%s results:\n' % config)
+                for type in static_tests:
+                    record = self.static.get(arch, config, type)
+                    extra = record.extra or {}
+                    lines.append('\t\t\t%s results:\n' % type)
+                    lines.append(fmt % ("status", record.status))
+                    lines.append(fmt % ("warning", record.warning_count))
+                    lines.append(fmt % ("error", record.error_count))
+                    if "ccache" in extra:
+                        lines.append(('\t\t\t\t%-' + width + 's: %s%% (%s hits, %s misses)\n') %
+                                     ("ccache", extra["ccache"]["hit_rate"], extra["ccache"]["hits"],
+                                      extra["ccache"]["misses"]))
+                    if "diff" in extra:
+                        for key in ["warnings", "errors"]:
+                            lines.append(('\t\t\t\t%-' + width + 's: %s new, %s fixed, %s unchanged\n') %
+                                         (key + " diff", extra["diff"][key]["new"], extra["diff"][key]["fixed"],
+                                          extra["diff"][key]["unchanged"]))
+        lines.append('\n')
+
+        return ''.join(lines)
+
+    def static_summary_results(self):
+        if len(self.results["static-summary"]) == 0:
+            return ''
+        out = 'Static Test Summary (unique across archs/configs):\n'
+        for type in ["compile-test", "sparse-test", "smatch-test"]:
+            if type not in self.results["static-summary"]:
+                continue
+            summary = self.results["static-summary"][type]
+            out += '\t%s: %d warnings (%d unique), %d errors (%d unique)\n' % \
+                   (type, summary["warning_count"], summary["unique_warning_count"], summary["error_count"],
+                    summary["unique_error_count"])
+            for entry in summary["diagnostics"]:
+                out += '\t\t[%dx %s | %s] %s\n' % (entry["count"], ','.join(entry["archs"]),
+                                                    ','.join(entry["configs"]), entry["message"])
 
         return out + '\n'
 
@@ -230,6 +457,10 @@ class KernelResults(object):
         out += '\tstatus       : %s\n' % self.checkpatch_results["status"]
         out += '\twarning_count: %s\n' % self.checkpatch_results["warning_count"]
         out += '\terror_count  : %s\n' % self.checkpatch_results["error_count"]
+        for commit in self.checkpatch_results.get("commits", []):
+            if commit["warning_count"] > 0 or commit["error_count"] > 0:
+                out += '\t\t%s: %s errors, %s warnings\n' % (commit["commit"][:12], commit["error_count"],
+                                                            commit["warning_count"])
 
         return out + '\n'
 
@@ -237,19 +468,38 @@ class KernelResults(object):
         if len(self.custom_results) == 0:
             return 'Custom Test Results: N/A\n'
         width = len(max(self.custom_results[0].keys(), key=len)) * 2
-        out = 'Custom Test Results:\n'
+        lines = ['Custom Test Results:\n']
         for obj in self.results["custom-test"]:
-            out += '\t%s results:\n' % obj['name']
+            lines.append('\t%s results:\n' % obj['name'])
             for key, value in viewitems(obj):
                 if key == 'name':
                     continue
-                out += ('\t\t%-' + str(width) + 's: %s\n') % (key, value)
+                lines.append(('\t\t%-' + str(width) + 's: %s\n') % (key, value))
+        lines.append('\n')
 
-        return out + '\n'
+        return ''.join(lines)
 
     def bisect_test_results(self):
         out = 'Bisect Test Results:\n'
         out += '\tstatus       : %s\n' % self.bisect_results["status"]
+        for run in self.bisect_results.get("runs", []):
+            if len(run.get("candidates", [])) > 0:
+                first_bad = "one of %s (untested commits)" % ' '.join([commit[:12] for commit in run["candidates"]])
+            else:
+                first_bad = run["first-bad-commit"] or "not found"
+            out += '\t%s/%s: first bad commit %s (%d commits tested in %d rounds)\n' % \
+                   (run["arch"], run["config"], first_bad, len(run["tested"]), run["rounds"])
+
+        return out + '\n'
+
+    def commit_test_results(self):
+        if len(self.results["commit-test"]) == 0:
+            return 'Commit Test Results: N/A\n'
+        out = 'Commit Test Results:\n'
+        for obj in self.results["commit-test"]:
+            out += '\t%s %s/%s: %s (%d warnings, %d errors)\n' % (obj["commit"][:12], obj["arch"], obj["config"],
+                                                                 obj["status"], obj["warning_count"],
+                                                                 obj["error_count"])
 
         return out + '\n'
 
@@ -258,11 +508,16 @@ class KernelResults(object):
         out += self.kernel_info()
         if test_type == "static":
             out += self.static_test_results()
+            out += self.static_summary_results()
         elif test_type == "checkpatch":
             out += self.checkpatch_test_results()
+        elif test_type == "commit":
+            out += self.commit_test_results()
         elif test_type == "all":
             out += self.static_test_results()
+            out += self.static_summary_results()
             out += self.checkpatch_test_results()
+            out += self.commit_test_results()
 
         return out
 
@@ -271,30 +526,49 @@ class KernelResults(object):
 
     def merge_results(self, dest, src):
 
-        if isinstance(src, collections.Mapping):
-            for key, value in src.iteritems():
-                dest[key] = self.merge_results(dest.get(key, src[key]), src[key])
-        elif isinstance(src, (list, tuple)):
+        if isinstance(src, Mapping) and isinstance(dest, Mapping):
+            for key, value in viewitems(src):
+                dest[key] = self.merge_results(dest[key], value) if key in dest else value
+        elif isinstance(src, (list, tuple)) and isinstance(dest, list):
             for index, value in enumerate(src):
-                dest[index] = self.merge_results(dest[index] if len(dest) <= index else src[index], src[index])
+                if index < len(dest):
+                    dest[index] = self.merge_results(dest[index], value)
+                else:
+                    dest.append(value)
         else:
             dest = src
 
         return dest
 
+    def to_json(self):
+        """
+        Get the results in JSON (results schema) form.
+        """
+        with self.lock:
+            res_obj = dict(self.results)
+            res_obj["static-test"] = self.static.to_json()
+
+        return res_obj
+
     def dump_results(self, outfile):
         fobj = open(outfile, 'w+')
         fobj.truncate()
         fobj.close()
-        self.cfgobj.dump_cfg(outfile)
+        JSONParser(self.schema, self.to_json(), extend_defaults=True).dump_cfg(outfile)
 
 class KernelTest(object):
 
     def __init__(self, src, cfg=None, out=None, rname=None, rurl=None, branch=None, head=None, base=None,
-                 res_cfg=None, logger=None):
+                 res_cfg=None, logger=None, journal=None, resume=False, shard=None):
+        """
+        KernelTest init()
+        :param journal: Run journal file, default is <out>/ktest-journal.jsonl.
+        :param resume: Resume the run from journal, completed tests are not run again.
+        :param shard: Run only one shard of the test matrix, "i/N" string or (i, N) tuple.
+        """
         self.logger = logger or logging.getLogger(__name__)
         self.src = src
-        self.out = os.path.join(self.src, 'out') if out is None else os.path.absapth(out)
+        self.out = os.path.join(self.src, 'out') if out is None else os.path.abspath(out)
         self.branch = branch
         self.rname = rname
         self.rurl = rurl
@@ -309,6 +583,23 @@ class KernelTest(object):
         self.sh = PyShell(wd=self.src, logger=logger)
         self.checkpatch_source = CHECK_PATCH_SCRIPT
         self.custom_configs = []
+        self.scheduler = None
+        self.ccache_params = None
+        self.build_cache = None
+        self.progress = None
+        self.trace_params = None
+        self.worktrees = None
+        self.check_cache = None
+        self.baseline_cache = None
+        self.changed_files_only = False
+        self.diagnostics_format = None
+        self.report_files = []
+        self.shard = parse_shard(shard) if isinstance(shard, str) else shard
+        # Durations of the matrix cells run in this session, stored in history as cell costs.
+        self.cell_costs = []
+        self.journal = RunJournal(journal or os.path.join(self.out, 'ktest-journal.jsonl'), logger=self.logger)
+        # Journal keys of completed tests -> status, used to skip them on resume.
+        self.completed = {}
 
         if self.rname is not None and len(self.rname) > 0:
             if not os.path.exists(self.src):
@@ -340,15 +631,120 @@ class KernelTest(object):
         if not is_valid_kernel(src, logger):
             return
 
-        self.version = BuildKernel(self.src).uname
+        self.version = get_kernel_version(self.src, self.logger)
 
         if len(self.version) > 0:
             self.resobj.update_kernel_params(version=self.version)
 
+        if resume:
+            self._resume()
+        else:
+            self.journal.start(head=self.head, base=self.base, branch=self.branch)
+
+        self.resobj.set_journal(self.journal)
+
         if cfg is not None:
             self.cfgobj = JSONParser(self.schema, cfg, extend_defaults=True, os_env=True, logger=logger)
             self.cfg = self.cfgobj.get_cfg()
 
+            ccache_config = self.cfg.get("ccache-config", None)
+            if ccache_config is not None and ccache_config["enable"] is True:
+                self.ccache_params = ccache_config
+
+            build_cache_config = self.cfg.get("build-cache", None)
+            if build_cache_config is not None and build_cache_config["enable"] is True:
+                self.build_cache = BuildCache(build_cache_config.get("dir", None) or None, logger=self.logger)
+
+            trace_config = self.cfg.get("build-trace", None)
+            if trace_config is not None and trace_config["enable"] is True:
+                self.trace_params = trace_config
+
+            static_config = self.cfg.get("static-config", None)
+            if static_config is not None:
+                self.changed_files_only = static_config.get("changed-files-only", False)
+                if static_config.get("diagnostics-format", "text") != "text":
+                    self.diagnostics_format = static_config["diagnostics-format"]
+
+            baseline_cache_config = self.cfg.get("baseline-cache", None)
+            if baseline_cache_config is not None and baseline_cache_config["enable"] is True:
+                self.baseline_cache = BaselineCache(baseline_cache_config.get("dir", None) or None, logger=self.logger)
+
+            check_cache_config = self.cfg.get("check-cache", None)
+            if check_cache_config is not None and check_cache_config["enable"] is True:
+                self.check_cache = check_cache_config
+
+            worktree_config = self.cfg.get("worktree-config", None)
+            if worktree_config is not None and worktree_config["enable"] is True and self.valid_git:
+                self.worktrees = WorktreePool(self.src, worktree_config.get("dir", None) or None,
+                                              max_count=worktree_config.get("max-count", 4),
+                                              reflink=worktree_config.get("reflink", False), logger=self.logger)
+
+    def _shard_plan(self, cells):
+        """
+        Split the matrix cells in shards. Costs of cells come from history database if it's enabled, so
+        all shards must use the same database (or none) to get the same plan.
+        :param cells: List of (key, config, test count) tuples.
+        :return: Dict of key -> shard index.
+        """
+        costs = {}
+        history_config = self.cfg.get("history-config", None)
+        if history_config is not None and history_config["enable"] is True:
+            history = ResultsHistory(history_config.get("path", None) or None, logger=self.logger)
+            costs = history.cell_costs()
+            history.close()
+
+        # Scale estimates of cells without history to the measured durations of other cells.
+        known = [(costs[key], default_cost(config, tests)) for key, config, tests in cells if key in costs]
+        scale = sum([cost[0] for cost in known]) / sum([cost[1] for cost in known]) if len(known) > 0 else 1.0
+
+        plan = partition([(key, costs[key] if key in costs else default_cost(config, tests) * scale)
+                          for key, config, tests in cells], self.shard[1])
+        self.resobj.update_shard_results(self.shard[0], self.shard[1], plan_digest(plan))
+
+        self.logger.info("Shard %d/%d: %d of %d cells, plan %s", self.shard[0], self.shard[1],
+                         len([key for key in plan if plan[key] == self.shard[0]]), len(cells), plan_digest(plan))
+
+        return plan
+
+    def _primary_shard(self):
+        # Tests outside the static matrix run only in first shard.
+        return self.shard is None or self.shard[0] == 1
+
+    def _resume(self):
+        header = self.journal.header()
+
+        if header is None or header.get("head", None) != self.head:
+            self.logger.warning("Journal %s is not for head %s, starting new run", self.journal.path, self.head)
+            self.journal.start(head=self.head, base=self.base, branch=self.branch)
+            return
+
+        entries = self.journal.entries()
+
+        # Static results of cells which didn't complete are dropped, those cells are run again.
+        cells = set([(entry["arch"], entry["config"]) for entry in entries if entry["kind"] == "cell"])
+        entries = [entry for entry in entries if entry["kind"] not in ["static", "diagnostics"] or
+                   (entry["args"]["arch"], entry["args"]["config"]) in cells]
+        self.journal.rewrite(entries)
+
+        count = self.resobj.replay(entries)
+
+        for entry in entries:
+            args = entry.get("args", {})
+            if entry["kind"] == "cell":
+                self.completed[("cell", entry["key"])] = entry["status"]
+                self.resobj.complete_cell(entry["arch"], entry["config"])
+            elif entry["kind"] == "custom":
+                self.completed[("custom", args["name"])] = args["status"]
+            elif entry["kind"] == "checkpatch":
+                self.completed[("checkpatch",)] = args["status"]
+            elif entry["kind"] == "commit":
+                self.completed[("commit", args["arch"], args["config"], args["commit"])] = args["status"]
+            elif entry["kind"] == "bisect":
+                self.completed[("bisect", args["arch"], args["config"], args.get("base", None),
+                                args.get("head", None))] = args["first_bad"]
+
+        self.logger.info("Resumed %d results from journal %s", count, self.journal.path)
+
     def send_email(self, emailcfg, sub=None):
 
         if emailcfg is not None:
@@ -362,14 +758,10 @@ class KernelTest(object):
 
         content = []
 
-        outfile = tempfile.NamedTemporaryFile()
-        self.resobj.dump_results(outfile=outfile.name)
-
-        with open(outfile.name) as fobj:
-            content.append(format_h1("Test Results"))
-            content.append('')
-            content.append(fobj.read())
-            content.append('\n')
+        content.append(format_h1("Test Results"))
+        content.append('')
+        content.append(json.dumps(self.resobj.to_json(), indent=4))
+        content.append('\n')
 
         emailobj.send_email(' '.join(subject), '\n'.join(content))
 
@@ -445,35 +837,66 @@ class KernelTest(object):
 
         config_temp = tempfile.mkdtemp("_dir", "config_")
         cgit = GitShell(wd=config_temp, init=True, logger=self.logger)
+        # Remote configs are copied out of the shared checkout, so parallel cells don't see each other's checkout.
+        config_copies = tempfile.mkdtemp("_dir", "configsrc_")
+        config_sources = {}
+        config_lock = threading.Lock()
+
+        report_config = self.cfg.get("report-config", None)
+
+        if report_config is not None and report_config["enable"] is True:
+            for format in ["text", "junit", "html"]:
+                if len(report_config.get(format, "")) > 0:
+                    self.add_report(format, report_config[format])
 
         static_config = self.cfg.get("static-config", None)
         sparse_config = self.cfg.get("sparse-config", None)
         smatch_config = self.cfg.get("smatch-config", None)
         custom_test = self.cfg.get("custom-test", None)
+        bisect_config = self.cfg.get("bisect-config", None)
+
+        # Args of the builds which failed, they are bisected after static tests.
+        failed_builds = []
+
+        def add_failed_build(obj, cobj, config):
+            failed_builds.append((obj["arch_name"], config, obj["compiler_options"]["CC"],
+                                  obj["compiler_options"]["cflags"], cobj.get('name', None),
+                                  get_configsrc(cobj.get('source-params', None))))
 
         # If there is a config in remote source, fetch it and give the local path.
         def get_configsrc(options):
 
-            if options is None or not isinstance(options, collections.Mapping):
+            if options is None or not isinstance(options, Mapping):
                 return None
 
             if len(options["url"]) == 0:
                 return os.path.abspath(os.path.join(self.src, options["remote-dir"], options["name"]))
 
             if options["sync-mode"] == "git":
-                cgit.cmd("clean -xdf")
-                remote_list = cgit.cmd("remote")[1].split('\n')
-                rname = 'origin'
-                for remote in remote_list:
-                    rurl = cgit.cmd("remote get-url %s" % remote)[1].strip()
-                    if rurl == options["url"]:
-                        rname =  remote
-                        break
-                cgit.add_remote(rname, options["url"])
-                cgit.cmd("pull %s" % rname)
-                cgit.cmd("checkout %s/%s" % (rname, options["branch"]))
-
-                return os.path.abspath(os.path.join(config_temp, options["remote-dir"], options["name"]))
+                key = (options["url"], options["branch"], options["remote-dir"], options["name"])
+                # Cells run in scheduler threads, only one of them can use the checkout at a time.
+                with config_lock:
+                    if key not in config_sources:
+                        cgit.cmd("clean -xdf")
+                        remote_list = cgit.cmd("remote")[1].split('\n')
+                        rname = 'origin'
+                        for remote in remote_list:
+                            rurl = cgit.cmd("remote get-url %s" % remote)[1].strip()
+                            if rurl == options["url"]:
+                                rname =  remote
+                                break
+                        cgit.add_remote(rname, options["url"])
+                        cgit.cmd("pull %s" % rname)
+                        cgit.cmd("checkout %s/%s" % (rname, options["branch"]))
+
+                        path = os.path.join(config_temp, options["remote-dir"], options["name"])
+                        copy_path = os.path.join(config_copies, "%d-%s" % (len(config_sources),
+                                                                          os.path.basename(options["name"])))
+                        if os.path.exists(path):
+                            shutil.copy2(path, copy_path)
+                        config_sources[key] = os.path.abspath(copy_path)
+
+                    return config_sources[key]
 
 
             return None
@@ -495,16 +918,58 @@ class KernelTest(object):
             else:
                 return getattr(self, _type)
 
-        def static_test(obj, cobj, config):
+        # Get sparse/smatch checker params of fused mode, None if the test is disabled.
+        def get_checker(cobj, test, tconfig, script_bin, args):
+            if not cobj[test]:
+                return None
+            if tconfig is None:
+                return {"name": test.split('-')[0], "cmd": [self._get_bin_path(script_bin)] + args,
+                        "flags": ["C=2"], "base": None}
+            if tconfig["enable"] is False:
+                return None
+            return {"name": test.split('-')[0], "cmd": [self._get_bin_path(tconfig["source"])] + args,
+                    "flags": tconfig["cflags"], "base": get_sha("base", tconfig)}
+
+        def fused_test(obj, cobj, config, threads=None):
+            checkers = [get_checker(cobj, "sparse-test", sparse_config, SPARSE_BIN_PATH, []),
+                        get_checker(cobj, "smatch-test", smatch_config, "smatch", ["-p=kernel"])]
+            checkers = [checker for checker in checkers if checker is not None]
+
+            # All tests must share the base commit, and fusing a single build gives nothing.
+            if len(set([checker["base"] for checker in checkers])) > 1 or \
+                    len(checkers) + (1 if cobj["compile-test"] else 0) < 2:
+                return None
+
+            status = self.fused_test(obj["arch_name"], config, obj["compiler_options"]["CC"],
+                                     obj["compiler_options"]["cflags"], cobj.get('name', None),
+                                     get_configsrc(cobj.get('source-params', None)), cobj["compile-test"],
+                                     checkers, checkers[0]["base"] if len(checkers) > 0 else None,
+                                     threads=threads)
+            if status is False:
+                self.logger.error("Fused test of arch:%s config:%s failed\n" % (obj["arch_name"],
+                                                                                cobj.get('name', config)))
+                if cobj["compile-test"]:
+                    add_failed_build(obj, cobj, config)
+
+            return status
+
+        def static_test(obj, cobj, config, threads=None):
             status = True
 
+            if static_config.get("fused-mode", False):
+                current_status = fused_test(obj, cobj, config, threads)
+                if current_status is not None:
+                    return current_status
+
             if cobj["compile-test"]:
                 current_status = self.compile(obj["arch_name"], config, obj["compiler_options"]["CC"],
                                               obj["compiler_options"]["cflags"],
-                                              cobj.get('name', None), get_configsrc(cobj.get('source-params', None)))
+                                              cobj.get('name', None), get_configsrc(cobj.get('source-params', None)),
+                                              threads=threads)
                 if current_status is False:
                     self.logger.error("Compilation of arch:%s config:%s failed\n" % (obj["arch_name"],
                                                                                      cobj.get('name', config)))
+                    add_failed_build(obj, cobj, config)
 
                 status &= current_status
 
@@ -525,7 +990,7 @@ class KernelTest(object):
                         args.append(sparse_config["source"])
 
                 if skip is False:
-                    current_status = self.sparse(*args)
+                    current_status = self.sparse(*args, threads=threads)
 
                     if current_status is False:
                         self.logger.error("Sparse test of arch:%s config:%s failed\n" % (obj["arch_name"],
@@ -549,7 +1014,7 @@ class KernelTest(object):
                         args.append(smatch_config["source"])
 
                 if skip is False:
-                    current_status = self.smatch(*args)
+                    current_status = self.smatch(*args, threads=threads)
 
                     if current_status is False:
                         self.logger.error("Smatch test of arch:%s config:%s failed\n" % (obj["arch_name"],
@@ -558,13 +1023,72 @@ class KernelTest(object):
 
             return status
 
+        # Without worktree pool, Sparse/Smatch base test checks out the base commit in source tree, so it
+        # can't run in parallel.
+        def need_exclusive(cobj):
+            if self.worktrees is not None:
+                return False
+            for test, tconfig in [("sparse-test", sparse_config), ("smatch-test", smatch_config)]:
+                if cobj[test] and tconfig is not None and tconfig["enable"] is True:
+                    return True
+            return False
+
         if static_config is not None and static_config["enable"] is True:
+            mparams = static_config.get("matrix-params", {})
+            cpu_budget = mparams.get("cpu-budget", 0)
+            memory_budget = mparams.get("memory-budget", 0)
+            max_jobs = mparams.get("max-jobs", 1)
+            job_threads = mparams.get("job-threads", 0)
+
+            self.scheduler = BuildScheduler(cpu_budget=cpu_budget, logger=self.logger,
+                                            memory_budget=get_total_memory() if memory_budget == 0 else
+                                            max(memory_budget, 0),
+                                            max_jobs=max_jobs)
+
+            if job_threads <= 0:
+                job_threads = max(self.scheduler.cpu_budget // self.scheduler.max_jobs, 1)
+
+            # All builds share one jobserver, so total make jobs stays within the CPU budget.
+            get_jobserver(self.scheduler.cpu_budget, logger=self.logger)
+
+            # Run the matrix cell and record it in journal, so it's skipped on resume.
+            def static_cell(key, obj, cobj, config, threads=None):
+                start = time.time()
+                status = static_test(obj, cobj, config, threads)
+                duration = round(time.time() - start, 3)
+                self.resobj.complete_cell(obj["arch_name"], cobj.get('name', None) or config)
+                self.journal.append("cell", key=key, arch=obj["arch_name"], config=cobj.get('name', None) or config,
+                                    status=status, duration=duration)
+                self.cell_costs.append({"key": key, "arch": obj["arch_name"],
+                                        "config": cobj.get('name', None) or config, "duration": duration})
+                return status
+
+            def get_cell_key(obj, cobj, config):
+                return cell_key(obj["arch_name"], obj["compiler_options"], cobj, config)
+
+            def add_static_job(obj, cobj, config):
+                name = cobj.get('name', None) or config
+                key = get_cell_key(obj, cobj, config)
+                if ("cell", key) in self.completed:
+                    self.logger.info("Skipping arch:%s config:%s, completed in journal", obj["arch_name"], name)
+                    # Failed build of the cell is still bisected.
+                    if cobj["compile-test"] and \
+                            self.resobj.static.get(obj["arch_name"], name, "compile-test").status == "Failed":
+                        add_failed_build(obj, cobj, config)
+                    return
+                self.scheduler.add_job("%s/%s" % (obj["arch_name"], name), static_cell, (key, obj, cobj, config),
+                                       {"threads": job_threads}, cpus=job_threads,
+                                       memory=estimate_job_memory(config, job_threads),
+                                       exclusive=need_exclusive(cobj))
+
+            cells = []
+
             # Compile standard configs
             for obj in static_config["test-list"]:
 
                 for config in supported_configs:
-                    if isinstance(obj, collections.Mapping) and obj.has_key(config):
-                        status &= static_test(obj, obj[config], config)
+                    if isinstance(obj, Mapping) and config in obj:
+                        cells.append((obj, obj[config], config))
 
                 # Compile custom configs
                 for cobj in obj["customconfigs"]:
@@ -573,24 +1097,72 @@ class KernelTest(object):
 
                     self.resobj.add_config(cobj['name'])
 
-                    status &= static_test(obj, cobj, cobj['defaction'])
+                    cells.append((obj, cobj, cobj['defaction']))
+
+            if self.shard is not None:
+                plan = self._shard_plan([(get_cell_key(*cell), cell[2],
+                                          len([test for test in static_tests if cell[1].get(test, False)]))
+                                         for cell in cells])
+                cells = [cell for cell in cells if plan[get_cell_key(*cell)] == self.shard[0]]
+
+            for obj, cobj, config in cells:
+                add_static_job(obj, cobj, config)
+
+            for job in self.scheduler.run():
+                status &= job.result is True
+
+            for key, value in viewitems(self.completed):
+                if key[0] == "cell":
+                    status &= value is True
+
+            self.logger.info(self.scheduler.report())
+
+        commit_config = self.cfg.get("commit-test-config", None)
+
+        if commit_config is not None and commit_config["enable"] is True and self._primary_shard():
+            options = commit_config.get("compiler_options", {})
+            status &= self.commit_test(commit_config.get("arch_name", "x86_64"),
+                                       commit_config.get("config", "defconfig"), options.get("CC", ""),
+                                       options.get("cflags", []), base=get_sha('base', commit_config), head=get_sha('head', commit_config),
+                                       jobs=commit_config.get("jobs", 2))
+
+        if bisect_config is not None and bisect_config["enable"] is True:
+            for args in failed_builds:
+                self.bisect(*args, base=get_sha('base', bisect_config), head=get_sha('head', bisect_config),
+                            jobs=bisect_config.get("jobs", 2))
 
         checkpatch_config = self.cfg.get("checkpatch-config", None)
 
-        if checkpatch_config is not None and checkpatch_config["enable"] is True:
+        if checkpatch_config is not None and checkpatch_config["enable"] is True and \
+                ("checkpatch",) in self.completed:
+            self.logger.info("Skipping checkpatch, completed in journal")
+            status &= self.completed[("checkpatch",)]
+        elif checkpatch_config is not None and checkpatch_config["enable"] is True and self._primary_shard():
             if len(checkpatch_config["source"]) > 0:
                 self.checkpatch_source = checkpatch_config["source"]
 
-            status &= self.run_checkpatch(get_sha('head', checkpatch_config), get_sha('base', checkpatch_config))
+            status &= self.run_checkpatch(get_sha('head', checkpatch_config), get_sha('base', checkpatch_config),
+                                          checkpatch_config.get("jobs", 0) or None,
+                                          checkpatch_config.get("batch-size", 8),
+                                          checkpatch_config.get("cache", True),
+                                          checkpatch_config.get("cache-dir", None))
 
-        if custom_test is not None and custom_test["enable"] is True:
-            for ctest in custom_test["test-list"]:
-                status &=  self.custom_test(ctest["name"], ctest["source"], ctest["arg-list"],
-                                            get_sha("head", custom_test),
-                                            get_sha("base", custom_test),
-                                            ctest["enable-head-sub"],
-                                            ctest["enable-base-sub"],
-                                            ctest["enable-src-sub"])
+        if custom_test is not None and custom_test["enable"] is True and self._primary_shard():
+            status &= self.custom_tests(custom_test["test-list"], get_sha("head", custom_test),
+                                        get_sha("base", custom_test), custom_test.get("jobs", 0) or None,
+                                        custom_test.get("timeout", 0), custom_test.get("memory-limit", 0),
+                                        custom_test.get("cpu-limit", 0), custom_test.get("log-dir", None))
+
+        self.finish_reports()
+
+        history_config = self.cfg.get("history-config", None)
+
+        if history_config is not None and history_config["enable"] is True:
+            history = ResultsHistory(history_config.get("path", None) or None, logger=self.logger)
+            run_id = history.add_run(self.resobj)
+            history.add_cell_costs(self.cell_costs)
+            history.close()
+            self.logger.info("Results stored as run %d in %s", run_id, history.path)
 
         output_config = self.cfg.get("output-config", None)
 
@@ -609,10 +1181,21 @@ class KernelTest(object):
 
 
         shutil.rmtree(config_temp, ignore_errors=True)
+        shutil.rmtree(config_copies, ignore_errors=True)
 
         return status
 
-    def _compile(self, arch='', config='', cc='', cflags=[], name='', cfg=None, clean_build=False):
+    def _get_ccache(self, arch, cc):
+        if self.ccache_params is None:
+            return None
+
+        return CCache(arch, cc, cache_dir=self.ccache_params.get("dir", None) or None,
+                      max_size=self.ccache_params.get("max-size", "5G"),
+                      ccache_bin=self._get_bin_path(self.ccache_params.get("source", "ccache")),
+                      logger=self.logger)
+
+    def _compile(self, arch='', config='', cc='', cflags=[], name='', cfg=None, clean_build=False, threads=None,
+                 build_info=None, src=None, out=None, checks=None, targets=None):
 
         custom_config = False
 
@@ -635,12 +1218,20 @@ class KernelTest(object):
         if name in self.custom_configs:
             custom_config = True
 
-        out_dir = os.path.join(self.out, arch, name if custom_config else config)
+        # Builds of other commits use worktree source and a separate out dir.
+        src = self.src if src is None else src
+        out_dir = os.path.join(self.out if out is None else out, arch, name if custom_config else config)
 
         if clean_build:
             self.sh.cmd("rm -fr %s/*" % out_dir, shell=True)
 
-        kobj = BuildKernel(src_dir=self.src, out_dir=out_dir, arch=arch, cc=cc, cflags=cflags, logger=self.logger)
+        # Used to strip build dirs from the diagnostics.
+        if build_info is not None:
+            build_info["roots"] = [os.path.abspath(src), os.path.abspath(out_dir)]
+
+        kobj = BuildKernel(src_dir=src, out_dir=out_dir, arch=arch, cc=cc, cflags=cflags, threads=threads,
+                           ccache=self._get_ccache(arch, cc), diagnostics_format=self.diagnostics_format,
+                           logger=self.logger)
 
         # If custom config source is given, use it.
         if custom_config:
@@ -648,29 +1239,141 @@ class KernelTest(object):
 
         getattr(kobj, 'make_' + config)()
 
-        ret, out, err = kobj.make_kernel()
+        # Only build given objects, which don't exist in this tree are skipped.
+        if targets is not None:
+            targets = [target for target in targets if object_source(src, target) is not None]
+            if len(targets) == 0:
+                if build_info is not None:
+                    build_info["checks"] = dict([(tool["name"], (0, 0, [], [])) for tool in checks or []])
+                return True, 0, 0, [], []
+            # Remove old objects, so they are compiled and checked again.
+            for target in targets:
+                if os.path.exists(os.path.join(out_dir, target)):
+                    os.remove(os.path.join(out_dir, target))
+
+        # If same tree/config/toolchain is already built, replay the stored results.
+        cache_key = None
+        if self.build_cache is not None:
+            git = self.git if src == self.src else GitShell(wd=src, logger=self.logger)
+            cache_key = self.build_cache.build_key(git, kobj.cfg, arch, cc,
+                                                   cflags + ([json.dumps(checks)] if checks else []) +
+                                                   (targets if targets else []) +
+                                                   ([self.diagnostics_format] if self.diagnostics_format else []))
+            cached = self.build_cache.get(cache_key)
+            if cached is not None:
+                self.logger.info("Using cached build results of arch:%s config:%s key:%s", arch,
+                                 name if custom_config else config, cache_key)
+                if build_info is not None:
+                    build_info["cached"] = True
+                    build_info["checks"] = cached.get("checks", None)
+                    build_info["diagnostics"] = cached.get("diagnostics", None)
+                return cached["status"], cached["warning_count"], cached["error_count"], \
+                       cached["warning_data"], cached["error_data"]
+
+        trace = None
+        if self.trace_params is not None:
+            trace = BuildTrace("%s/%s" % (arch, name if custom_config else config), logger=self.logger)
+
+        def progress(event):
+            event['arch'] = arch
+            event['config'] = name if custom_config else config
+            if trace is not None:
+                trace.record(event)
+            if self.progress is not None:
+                self.progress(event)
+            elif event['objects'] > 0 and event['objects'] % 1000 == 0 and event['step'] in ['CC', 'CC [M]']:
+                self.logger.info("Arch:%s Config:%s %d objects compiled, now in %s", arch, event['config'],
+                                 event['objects'], event['dir'])
+
+        log_dir = os.path.join(out_dir, 'klibs-logs')
+
+        # Make output is parsed while the build is running, raw logs are kept in out dir.
+        parser = MakeOutputParser(log_dir=log_dir, progress=progress, structured=self.diagnostics_format is not None,
+                                  logger=self.logger)
+
+        # Source checkers are run through CHECK wrapper, which writes their output in separate logs.
+        flags = []
+        cache = None
+        if checks:
+            check_dir = os.path.join(log_dir, 'checks')
+            tools = checks
+            if self.check_cache is not None:
+                cache = {
+                    "dir": self.check_cache.get("dir", None) or os.path.join(CACHE_DEFAULT_DIR, 'checks'),
+                    "cpp": [(cc if cc else '') + 'gcc', '-E'],
+                    "roots": [os.path.abspath(src), os.path.abspath(out_dir)],
+                }
+                tools = [dict(tool, version=checker_version(tool["cmd"])) for tool in checks]
+            write_check_config(os.path.join(log_dir, 'check.json'), tools, check_dir, cache)
+            flags.append('CHECK=%s' % check_command(os.path.join(log_dir, 'check.json')))
 
-        def parse_results(outputlog, errorlog, status):
-            data = errorlog.split('\n')
+        try:
+            ret, out, err = kobj.make_kernel(flags=flags, parser=parser, targets=targets)
+        finally:
+            parser.close()
+
+        check_results = None
+        check_stats = None
+        if checks:
+            check_results = {}
+            for tool in checks:
+                check_results[tool["name"]] = self._read_check_log(tool_log(check_dir, tool["name"]))
+
+        if cache is not None:
+            check_stats = {}
+            size = check_cache_size(cache["dir"], self.check_cache.get("max-size", 0) * 1024 or None)
+            for tool in checks:
+                hits, misses = read_check_stats(check_dir, tool["name"])
+                check_stats[tool["name"]] = {
+                    'hits': hits,
+                    'misses': misses,
+                    'hit_rate': round(hits * 100.0 / (hits + misses), 2) if (hits + misses) > 0 else 0.0,
+                    'size': size,
+                }
+                self.logger.info("Arch:%s Config:%s %s cache hits:%d misses:%d size:%dKiB", arch,
+                                 name if custom_config else config, tool["name"], hits, misses, size)
+
+        self.logger.debug("Arch:%s Config:%s build %s, logs in %s", arch, name if custom_config else config,
+                          parser.summary(), os.path.dirname(parser.out_log))
+
+        # Extra build details used by the caller.
+        if build_info is not None:
+            build_info["ccache"] = kobj.ccache_stats
+            build_info["logs"] = [parser.out_log, parser.err_log]
+            build_info["checks"] = check_results
+            build_info["check_cache"] = check_stats
+            build_info["diagnostics"] = parser.records if parser.structured else None
+
+        if trace is not None:
+            trace.stop(out_dir)
+            trace_file = os.path.join(out_dir, 'klibs-logs', 'trace.json')
+            trace.dump(trace_file, self.trace_params.get("top-count", 10))
+            self.logger.info(trace.summary_text(self.trace_params.get("top-count", 10)))
+            if build_info is not None:
+                build_info["trace"] = trace_file
 
-            warning_count = len(filter(lambda x: True if "warning:" in x else False, data))
-            error_count = len(filter(lambda x: True if "error:" in x else False, data))
+        status = True if ret == 0 else False
 
-            warning_data =filter(lambda x: True if "warning:" in x else False, data)
-            error_data = filter(lambda x: True if "error:" in x else False, data)
+        if not status:
+            self.logger.error('\n'.join(parser.tail))
 
-            return status, warning_count, error_count, warning_data, error_data
+        results = (status, parser.warning_count, parser.error_count, parser.warnings, parser.errors)
 
-        status = True if ret == 0 else False
+        # Don't cache builds killed by a signal (OOM, user interrupt).
+        if cache_key is not None and ret >= 0:
+            data = dict(zip(["status", "warning_count", "error_count", "warning_data", "error_data"], results))
+            data["checks"] = check_results
+            data["diagnostics"] = parser.records if parser.structured else None
+            self.build_cache.put(cache_key, data)
 
-        if not status:
-            self.logger.error(err)
+        return results
 
-        return parse_results(out, err, status)
+    def compile(self, arch='', config='', cc='', cflags=[], name='', cfg=None, threads=None):
 
-    def compile(self, arch='', config='', cc='', cflags=[], name='', cfg=None):
+        build_info = {}
 
-        status, warning_count, error_count, wdata, edata = self._compile(arch, config, cc, cflags, name, cfg)
+        status, warning_count, error_count, wdata, edata = self._compile(arch, config, cc, cflags, name, cfg,
+                                                                         threads=threads, build_info=build_info)
 
         self.logger.info("List of warnings Arch:%s Config:%s Name:%s Count:%d\n", arch, config, name, warning_count)
 
@@ -690,7 +1393,10 @@ class KernelTest(object):
 
         name = config if name is None or len(name) == 0 else name
 
-        self.resobj.update_compile_test_results(arch, name, status, warning_count, error_count)
+        self.resobj.update_compile_test_results(arch, name, status, warning_count, error_count,
+                                                build_info.get("ccache", None), build_info.get("trace", None),
+                                                build_info.get("diagnostics", None))
+        self.resobj.add_static_diagnostics("compile-test", arch, name, wdata, edata, self._roots(build_info))
 
         return status
 
@@ -720,125 +1426,336 @@ class KernelTest(object):
             new_path = which(path)
             return new_path if which(path) is not None else path
 
-    def _diff_count(self, data1, data2):
-        ncount = 0
-        for entry in data2:
-            if entry not in data1:
-                ncount = ncount + 1
-                self.logger.info(entry)
+    def _diff(self, data1, data2, roots=None):
+        """
+        Diff base and head diagnostics, new ones are logged.
+        :param data1: List of base diagnostics.
+        :param data2: List of head diagnostics.
+        :param roots: Source/out dirs of the builds.
+        :return: DiagnosticDiff object.
+        """
+        diff = DiagnosticDiff(data1, data2, roots, logger=self.logger)
+        for entry in diff.new:
+            self.logger.info(entry)
+        for entry in diff.fixed:
+            self.logger.debug("Fixed: %s", entry)
 
-        return ncount
+        return diff
 
-    def sparse(self, arch='', config='', cc='', cflags=[], name='', cfg=None, sparse_flags=["C=2"],
-               base=None, script_bin=SPARSE_BIN_PATH):
+    def _diff_results(self, base_results, head_results, base_info, head_info):
+        """
+        Diff base and head warnings/errors of a static analyzer test.
+        :param base_results: (warning count, error count, warnings, errors) of base build.
+        :param head_results: (warning count, error count, warnings, errors) of head build.
+        :param base_info: build_info of base build.
+        :param head_info: build_info of head build.
+        :return: (warnings DiagnosticDiff, errors DiagnosticDiff) tuple.
+        """
+        roots = self._roots(base_info, head_info)
 
-        base_warning_count = 0
-        base_error_count = 0
-        base_edata = []
-        base_wdata = []
-        flags = []
+        self.logger.debug(format_h1("Diff between Base/New warnings", tab=2))
+        wdiff = self._diff(base_results[2], head_results[2], roots)
+        self.logger.debug(format_h1("End of new warnings, count:%d" % len(wdiff.new), tab=2))
+
+        self.logger.debug(format_h1("Diff between Base/New errors\n", tab=2))
+        ediff = self._diff(base_results[3], head_results[3], roots)
+        self.logger.debug(format_h1("End of new errors, count:%d" % len(ediff.new), tab=2))
 
-        flags.append('CHECK="' + self._get_bin_path(script_bin) + '"')
+        return wdiff, ediff
 
-        if base is not None:
+    def _roots(self, *build_infos):
+        roots = [self.src, self.out]
+        for build_info in build_infos:
+            roots += build_info.get("roots", None) or []
+
+        return roots
+
+    def _read_check_log(self, log_file):
+        parser = MakeOutputParser(structured=self.diagnostics_format is not None, logger=self.logger)
+        if os.path.exists(log_file):
+            with open(log_file) as fobj:
+                for line in fobj:
+                    parser.feed(line, 'err')
+
+        return parser.warning_count, parser.error_count, parser.warnings, parser.errors
+
+    def _changed_targets(self, arch, config, name, base):
+        """
+        Get the objects affected by base..HEAD changes, from the dependency files of earlier build.
+        :return: List of object targets, None if full check is needed.
+        """
+        custom_config = name in self.custom_configs or config not in supported_configs
+        out_dir = os.path.join(self.out, arch, name if custom_config else config)
+
+        ret, out, err = self.git.cmd('diff', '--name-only', base, 'HEAD')
+        if ret != 0:
+            self.logger.warning("Failed to get changed files of %s..HEAD, doing full check", base)
+            return None
+
+        targets = DependencyGraph(out_dir, self.src, logger=self.logger).affected_objects(out.split())
+        if targets is not None:
+            self.logger.info("Arch:%s Config:%s %d objects affected by %s..HEAD changes", arch,
+                             name if custom_config else config, len(targets), base)
+
+        return targets
+
+    def _check_base_head(self, arch, config, cc, cflags, name, cfg, base=None, threads=None, checks=None,
+                         base_info=None, head_info=None, changed_files_only=None):
+        """
+        Do clean builds of base and head commits for static analyzer tests.
+        :param checks: Checkers run through CHECK wrapper, see _compile().
+        :param base_info: Dict updated with build_info of base build.
+        :param head_info: Dict updated with build_info of head build.
+        :param changed_files_only: Only build objects affected by base..HEAD changes, default is from config.
+        :return: (base results, head results) tuple of _compile() results, None on failure.
+        """
+        base_results = [(True, 0, 0, [], [])]
+        base_info = {} if base_info is None else base_info
+        targets = None
+
+        def build_head():
+            return self._compile(arch, config, cc, cflags, name, cfg, targets is None, threads,
+                                 build_info=head_info, checks=checks, targets=targets)
+
+        def build_base(src=None, out=None):
+            base_results[0] = self._compile(arch, config, cc, cflags, name, cfg, targets is None, threads,
+                                            build_info=base_info, src=src, out=out, checks=checks,
+                                            targets=targets)
+            if baseline_key is not None and base_results[0] and base_results[0][0] is True:
+                self.baseline_cache.put(baseline_key, {"results": base_results[0],
+                                                       "checks": base_info.get("checks", None),
+                                                       "roots": base_info.get("roots", None)})
+
+        # _compile() returns False for invalid arch/config.
+        def check_results(head_results):
+            if not base_results[0] or base_results[0][0] is False or not head_results:
+                return None
+            return base_results[0], head_results
+
+        if base is None:
+            return check_results(build_head())
+
+        # Only check the objects affected by base..head changes, C=1 checks the objects which are compiled.
+        if self.changed_files_only if changed_files_only is None else changed_files_only:
+            targets = self._changed_targets(arch, config, name, base)
+            if targets is not None:
+                cflags = ['C=1' if flag.startswith('C=') else flag for flag in cflags]
+
+        # Base results only depend on base commit and build params, so reuse them across runs and branches.
+        # Randconfig generates a different .config on every build, so its results are not reused.
+        baseline_key = None
+        if self.baseline_cache is not None and config != 'randconfig':
+            versions = [dict(tool, version=checker_version(tool["cmd"])) for tool in checks] if checks else None
+            baseline_key = self.baseline_cache.baseline_key(self.git, base, arch, name if name else config,
+                                                            cfg if name else None, cc,
+                                                            cflags + (targets if targets else []), versions)
+            cached = self.baseline_cache.get(baseline_key)
+            if cached is not None:
+                self.logger.info("Using cached base results of arch:%s config:%s base:%s", arch,
+                                 name if name else config, base)
+                base_results[0] = tuple(cached["results"])
+                base_info["checks"] = cached["checks"]
+                base_info["roots"] = cached.get("roots", None)
+                base_info["cached"] = True
+                return check_results(build_head())
+
+        if self.worktrees is None:
             curr_head = self.git.head_sha()
 
             if self.git.cmd('checkout', base)[0] != 0:
                 self.logger.error("Git checkout command failed in %s", base)
-                return False
+                return None
 
-            status, base_warning_count,\
-            base_error_count, base_wdata,\
-            base_edata = self._compile(arch, config, cc, sparse_flags + flags + cflags, name, cfg, True)
-
-            if status is False:
-                return False
+            build_base()
 
             if self.git.cmd('checkout', curr_head)[0] != 0:
                 self.logger.error("Git checkout command failed in %s", curr_head)
-                return False
+                return None
 
-        status, warning_count,\
-        error_count, wdata, edata = self._compile(arch, config, cc, sparse_flags + flags + cflags, name, cfg, True)
+            if not base_results[0] or base_results[0][0] is False:
+                return None
 
-        self.logger.info("Base warinings:%d Base errors:%d New warining:%d New errors:%d\n",
-                         base_warning_count, base_error_count, warning_count, error_count)
+            return check_results(build_head())
+
+        # Build base in a worktree while head is built in source tree.
+        def build_worktree():
+            try:
+                with self.worktrees.checkout(base) as path:
+                    if path is None:
+                        base_results[0] = None
+                        return
+                    build_base(path, os.path.join(self.out, 'base'))
+            except Exception as e:
+                self.logger.error("Base build of arch:%s config:%s failed: %s", arch, config, e)
+                base_results[0] = None
+
+        base_thread = threading.Thread(target=build_worktree)
+        base_thread.start()
+        try:
+            head_results = build_head()
+        finally:
+            base_thread.join()
 
-        self.logger.debug(format_h1("Diff between Base/New warnings", tab=2))
-        warning_count = self._diff_count(base_wdata, wdata)
-        self.logger.debug(format_h1("End of new warnings, count:%d" % warning_count, tab=2))
+        return check_results(head_results)
 
-        self.logger.debug(format_h1("Diff between Base/New errors\n", tab=2))
-        error_count = self._diff_count(base_edata, edata)
-        self.logger.debug(format_h1("End of new errors, count:%d" % error_count, tab=2))
+    def sparse(self, arch='', config='', cc='', cflags=[], name='', cfg=None, sparse_flags=["C=2"],
+               base=None, script_bin=SPARSE_BIN_PATH, threads=None):
+
+        # Checker cache works on CHECK wrapper, which keeps checker output separate from compiler output.
+        if self.check_cache is not None:
+            return self.fused_test(arch, config, cc, cflags, name, cfg, False,
+                                   [{"name": "sparse", "cmd": [self._get_bin_path(script_bin)],
+                                     "flags": sparse_flags}], base, threads)
+
+        flags = []
+
+        flags.append('CHECK=' + self._get_bin_path(script_bin))
+
+        base_info = {}
+        head_info = {}
+
+        results = self._check_base_head(arch, config, cc, sparse_flags + flags + cflags, name, cfg, base, threads,
+                                        base_info=base_info, head_info=head_info)
+        if results is None:
+            return False
+
+        base_results, head_results = results
+        status = head_results[0]
+
+        self.logger.info("Base warinings:%d Base errors:%d New warining:%d New errors:%d\n",
+                         base_results[1], base_results[2], head_results[1], head_results[2])
+
+        wdiff, ediff = self._diff_results(base_results[1:], head_results[1:], base_info, head_info)
 
         name = config if name is None or len(name) == 0 else name
 
-        self.resobj.update_sparse_test_results(arch, name, status, warning_count, error_count)
+        self.resobj.update_sparse_test_results(arch, name, status, len(wdiff.new), len(ediff.new),
+                                                diff={"warnings": wdiff.counts(), "errors": ediff.counts()})
+        self.resobj.add_static_diagnostics("sparse-test", arch, name, wdiff.new, ediff.new,
+                                           self._roots(base_info, head_info))
 
         return status
 
     def smatch(self, arch='', config='', cc='', cflags=[], name='', cfg=None, smatch_flags=["C=2"],
-               base=None, script_bin="smatch"):
+               base=None, script_bin="smatch", threads=None):
+
+        # Checker cache works on CHECK wrapper, which keeps checker output separate from compiler output.
+        if self.check_cache is not None:
+            return self.fused_test(arch, config, cc, cflags, name, cfg, False,
+                                   [{"name": "smatch", "cmd": [self._get_bin_path(script_bin), '-p=kernel'],
+                                     "flags": smatch_flags}], base, threads)
 
-        base_warning_count = 0
-        base_error_count = 0
-        base_edata = []
-        base_wdata = []
         flags = []
 
-        flags.append('CHECK="' + self._get_bin_path(script_bin) + ' -p=kernel"')
+        flags.append('CHECK=' + self._get_bin_path(script_bin) + ' -p=kernel')
 
-        if base is not None:
-            curr_head = self.git.head_sha()
+        base_info = {}
+        head_info = {}
 
-            if self.git.cmd('checkout', base)[0] != 0:
-                self.logger.error("Git checkout command failed in %s", base)
-                return False
+        results = self._check_base_head(arch, config, cc, smatch_flags + flags + cflags, name, cfg, base, threads,
+                                        base_info=base_info, head_info=head_info)
+        if results is None:
+            return False
 
-            status, base_warning_count,\
-            base_error_count, base_wdata,\
-            base_edata = self._compile(arch, config, cc,smatch_flags + flags + cflags, name, cfg, True)
+        base_results, head_results = results
+        status = head_results[0]
 
-            if status is False:
-                return False
+        self.logger.info("Base warinings:%d Base errors:%d New warining:%d New errors:%d\n",
+                         base_results[1], base_results[2], head_results[1], head_results[2])
 
-            if self.git.cmd('checkout', curr_head)[0] != 0:
-                self.logger.error("Git checkout command failed in %s", curr_head)
-                return False
+        wdiff, ediff = self._diff_results(base_results[1:], head_results[1:], base_info, head_info)
 
-        status, warning_count,\
-        error_count, wdata, edata = self._compile(arch, config, cc, smatch_flags + flags + cflags, name, cfg, True)
+        name = config if name is None or len(name) == 0 else name
 
-        self.logger.info("Base warinings:%d Base errors:%d New warining:%d New errors:%d\n",
-                         base_warning_count, base_error_count, warning_count, error_count)
+        self.resobj.update_smatch_test_results(arch, name, status, len(wdiff.new), len(ediff.new),
+                                                diff={"warnings": wdiff.counts(), "errors": ediff.counts()})
+        self.resobj.add_static_diagnostics("smatch-test", arch, name, wdiff.new, ediff.new,
+                                           self._roots(base_info, head_info))
 
-        self.logger.debug(format_h1("Diff between Base/New warnings", tab=2))
-        warning_count = self._diff_count(base_wdata, wdata)
-        self.logger.debug(format_h1("End of new warnings, count:%d" % warning_count, tab=2))
+        return status
 
-        self.logger.debug(format_h1("Diff between Base/New errors\n", tab=2))
-        error_count = self._diff_count(base_edata, edata)
-        self.logger.debug(format_h1("End of new errors, count:%d" % error_count, tab=2))
+    def fused_test(self, arch='', config='', cc='', cflags=[], name='', cfg=None, compile_test=True, checkers=[],
+                   base=None, threads=None):
+        """
+        Do compile, sparse and smatch tests with one build. Compiler runs as usual and each
+        translation unit is given to all checkers through CHECK wrapper, which keeps the
+        diagnostics of each checker separate.
+        :param compile_test: Update compile test results.
+        :param checkers: List of dicts with name (sparse | smatch), cmd (command args) and flags (make flags).
+        :param base: Base commit for checker warnings diff.
+        :return: True | False
+        """
+        check_flags = []
+        for checker in checkers:
+            check_flags += [flag for flag in checker["flags"] if flag not in check_flags]
+
+        checks = [{"name": checker["name"], "cmd": checker["cmd"]} for checker in checkers]
+        base_info = {}
+        head_info = {}
+
+        results = self._check_base_head(arch, config, cc, check_flags + cflags, name, cfg,
+                                        base if len(checkers) > 0 else None, threads, checks, base_info, head_info,
+                                        # Compile test needs the full build.
+                                        False if compile_test else None)
+        if results is None:
+            return False
+
+        status, warning_count, error_count, wdata, edata = results[1]
 
         name = config if name is None or len(name) == 0 else name
 
-        self.resobj.update_smatch_test_results(arch, name, status, warning_count, error_count)
+        if compile_test:
+            self.logger.info("List of warnings Arch:%s Config:%s Count:%d\n", arch, name, warning_count)
+            for entry in wdata:
+                self.logger.info(entry)
+            self.logger.info("List of errors Arch:%s Config:%s Count:%d\n", arch, name, error_count)
+            for entry in edata:
+                self.logger.info(entry)
+
+            self.resobj.update_compile_test_results(arch, name, status, warning_count, error_count,
+                                                    head_info.get("ccache", None), head_info.get("trace", None),
+                                                    head_info.get("diagnostics", None))
+            self.resobj.add_static_diagnostics("compile-test", arch, name, wdata, edata, self._roots(head_info))
+
+        for checker in checkers:
+            base_checks = (base_info.get("checks", None) or {}).get(checker["name"], (0, 0, [], []))
+            head_checks = (head_info.get("checks", None) or {}).get(checker["name"], (0, 0, [], []))
+
+            self.logger.info("%s Base warinings:%d Base errors:%d New warining:%d New errors:%d\n", checker["name"],
+                             base_checks[0], base_checks[1], head_checks[0], head_checks[1])
+
+            wdiff, ediff = self._diff_results(base_checks, head_checks, base_info, head_info)
+
+            getattr(self.resobj, "update_%s_test_results" % checker["name"])(
+                arch, name, status, len(wdiff.new), len(ediff.new),
+                (head_info.get("check_cache", None) or {}).get(checker["name"], None),
+                {"warnings": wdiff.counts(), "errors": ediff.counts()})
+            self.resobj.add_static_diagnostics(checker["name"] + "-test", arch, name, wdiff.new, ediff.new,
+                                               self._roots(base_info, head_info))
 
         return status
 
     def process_custom_test(self, name, ret):
         self.resobj.update_custom_test_results(name, ret[0] == 0)
 
-    def custom_test(self, name, script, arg_list=[], head=None, base=None,
-                    enable_head_sub=False, enable_base_sub=False, enable_src_sub=False):
-        self.logger.info(format_h1("Running custom test %s" % name, tab=2))
+    def process_custom_result(self, name, result):
+        """
+        Store the result of a custom test run by CustomTestRunner.
+        :param name: Test name.
+        :param result: Result dict of CustomTestRunner.run_test().
+        :return: None
+        """
+        self.resobj.update_custom_test_results(name, result["status"], **dict([(key, value) for key, value in
+                                                                              viewitems(result) if key not in
+                                                                              ["name", "status"]]))
 
+    def _custom_test_cmd(self, script, arg_list=[], head=None, base=None, enable_head_sub=False,
+                         enable_base_sub=False, enable_src_sub=False):
         script = self._get_bin_path(script)
 
         if not os.path.exists(script):
             self.logger.error("Invalid script %s", script)
-            return False
+            return None
 
         cmd = [script]
 
@@ -862,11 +1779,54 @@ class KernelTest(object):
                 if "$SRC" in item:
                     cmd[index] = cmd[index].replace("$SRC", self.src)
 
-        ret = self.sh.cmd("%s" % (' '.join(cmd)))
+        return ' '.join(cmd)
 
-        self.process_custom_test(name, ret)
+    def custom_tests(self, test_list, head=None, base=None, jobs=None, timeout=0, memory_limit=0, cpu_limit=0,
+                     log_dir=None):
+        """
+        Run custom tests in parallel.
+        :param test_list: List of custom test config dicts (see custom-test test-list in test schema).
+        :param jobs: Number of tests run in parallel, default is CPU count.
+        :param timeout: Default test timeout in seconds, 0 means no timeout.
+        :param memory_limit: Default memory limit in MB, 0 means no limit.
+        :param cpu_limit: Default CPU time limit in seconds, 0 means no limit.
+        :param log_dir: Test log dir, default is <out>/custom-test.
+        :return: True if all tests passed | False
+        """
+        self.logger.info(format_h1("Running custom tests", tab=2))
+
+        status = True
+        tests = []
+
+        for ctest in test_list:
+            if ("custom", ctest["name"]) in self.completed:
+                self.logger.info("Skipping custom test %s, completed in journal", ctest["name"])
+                status &= self.completed[("custom", ctest["name"])]
+                continue
+            cmd = self._custom_test_cmd(ctest["source"], ctest.get("arg-list", []), head, base,
+                                        ctest.get("enable-head-sub", True), ctest.get("enable-base-sub", True),
+                                        ctest.get("enable-src-sub", True))
+            if cmd is None:
+                self.resobj.update_custom_test_results(ctest["name"], False)
+                status = False
+                continue
+            tests.append({"name": ctest["name"], "cmd": cmd, "timeout": ctest.get("timeout", 0),
+                          "memory-limit": ctest.get("memory-limit", 0), "cpu-limit": ctest.get("cpu-limit", 0)})
+
+        log_dir = os.path.join(self.out, 'custom-test') if not log_dir else log_dir
+        runner = CustomTestRunner(log_dir, jobs, timeout, memory_limit, cpu_limit, cwd=self.src, logger=self.logger)
+
+        for result in runner.run(tests):
+            self.process_custom_result(result["name"], result)
+            status &= result["status"]
+
+        return status
 
-        return (ret[0] == 0)
+    def custom_test(self, name, script, arg_list=[], head=None, base=None,
+                    enable_head_sub=False, enable_base_sub=False, enable_src_sub=False, timeout=0):
+        return self.custom_tests([{"name": name, "source": script, "arg-list": arg_list,
+                                   "enable-head-sub": enable_head_sub, "enable-base-sub": enable_base_sub,
+                                   "enable-src-sub": enable_src_sub, "timeout": timeout}], head, base, jobs=1)
 
     def compile_list(self, arch='', config_list=[], cc='', cflags=[], name='', cfg=None):
         self.logger.info(format_h1("Running compile tests", tab=2))
@@ -897,63 +1857,216 @@ class KernelTest(object):
 
         return result
 
-    def run_checkpatch(self, head=None, base=None):
+    def _worktree_pool(self, count):
+        # Bisect and commit tests always build in worktrees, even if the pool is not enabled in config.
+        if self.worktrees is not None:
+            return self.worktrees
+
+        return WorktreePool(self.src, max_count=count, logger=self.logger)
+
+    def commit_test(self, arch='', config='', cc='', cflags=[], name='', cfg=None, base=None, head=None, jobs=2,
+                    threads=None):
+        """
+        Build every commit of base..head for given arch/config.
+        Commits are split in jobs consecutive ranges, which are built in parallel. Each range is
+        built in order in one worktree with one out dir, so every build after the first one is
+        incremental.
+        :param base: Base commit (not built), default is kernel base.
+        :param head: Head commit, default is kernel head.
+        :param jobs: Number of parallel builds.
+        :return: True if all commits build | False
+        """
+        base = self.base if base is None else base
+        head = self.head if head is None else head
+        name = config if name is None or len(name) == 0 else name
+
+        self.logger.info(format_h1("Building commits of %s..%s arch:%s config:%s" % (base, head, arch, name), tab=2))
+
+        if self.valid_git is False:
+            self.logger.error("Invalid git repo")
+            return False
+
+        ret, out, err = self.git.cmd('rev-list', '--reverse', '--topo-order', '%s..%s' % (base, head))
+        if ret != 0:
+            self.logger.error("git rev-list %s..%s failed", base, head)
+            return False
+
+        commits = out.split()
+        if len(commits) == 0:
+            return True
+
+        # Commits built before resume are already in results.
+        done = [commit for commit in commits if ("commit", arch, name, commit) in self.completed]
+        if len(done) > 0:
+            self.logger.info("Skipping %d commits of arch:%s config:%s, completed in journal", len(done), arch, name)
+        status = all([self.completed[("commit", arch, name, commit)] for commit in done])
+        commits = [commit for commit in commits if commit not in done]
+        if len(commits) == 0:
+            return status
+
+        worktrees = self._worktree_pool(jobs)
+        size = (len(commits) + jobs - 1) // jobs
+        results = {}
+
+        def build_range(commit_range):
+            wt = worktrees.acquire(commit_range[0])
+            if wt is None:
+                return
+            try:
+                for commit in commit_range:
+                    if not worktrees.move(wt, commit):
+                        results[commit] = False
+                        continue
+                    results[commit] = self._compile(arch, config, cc, cflags, name, cfg, False, threads,
+                                                    src=wt.path,
+                                                    out=os.path.join(self.out, 'commits', os.path.basename(wt.path)))
+                    if not results[commit]:
+                        continue
+                    status, warning_count, error_count = results[commit][:3]
+                    self.logger.info("Commit %s arch:%s config:%s %s, warnings:%d errors:%d", commit[:12], arch,
+                                     name, "passed" if status else "failed", warning_count, error_count)
+            finally:
+                worktrees.release(wt)
+
+        threads_list = [threading.Thread(target=build_range, args=(commits[index:index + size],))
+                        for index in range(0, len(commits), size)]
+        for thread in threads_list:
+            thread.start()
+        for thread in threads_list:
+            thread.join()
+
+        for commit in commits:
+            result = results.get(commit, False)
+            if not result:
+                result = (False, 0, 0)
+            self.resobj.update_commit_test_results(arch, name, commit, result[0], result[1], result[2])
+            status &= result[0]
+
+        return status
+
+    def bisect(self, arch='', config='', cc='', cflags=[], name='', cfg=None, base=None, head=None, jobs=2,
+               threads=None):
+        """
+        Find the first commit of base..head which breaks the build of given arch/config.
+        Each round builds jobs commits in parallel worktrees. Every worktree keeps its out dir, so
+        builds are incremental, and the build cache is used if it's enabled.
+        :param base: Good commit, default is kernel base.
+        :param head: Bad commit, default is kernel head.
+        :param jobs: Number of commits built in each round.
+        :return: First bad commit SHA, None if it's not found or it's ambiguous (possible first bad commits
+                 are stored in bisect results).
+        """
+        base = self.base if base is None else base
+        head = self.head if head is None else head
+        name = config if name is None or len(name) == 0 else name
+
+        self.logger.info(format_h1("Bisecting arch:%s config:%s %s..%s" % (arch, name, base, head), tab=2))
 
+        if ("bisect", arch, name, base, head) in self.completed:
+            self.logger.info("Skipping bisect of arch:%s config:%s, completed in journal", arch, name)
+            return self.completed[("bisect", arch, name, base, head)]
+
+        if self.valid_git is False:
+            self.logger.error("Invalid git repo")
+            return None
+
+        worktrees = self._worktree_pool(jobs)
+
+        def build_test(commit, path):
+            results = self._compile(arch, config, cc, cflags, name, cfg, False, threads, src=path,
+                                    out=os.path.join(self.out, 'bisect', os.path.basename(path)))
+            if not results:
+                return None
+            return results[0]
+
+        kbisect = KernelBisect(self.src, build_test, worktrees, jobs, logger=self.logger)
+
+        # Not a regression if base is broken too.
+        if kbisect.test_commits([base]).get(base, None) is not True:
+            self.logger.warning("Arch:%s Config:%s base %s doesn't build, skipping bisect", arch, name, base)
+            return None
+
+        first_bad = kbisect.run(base, head)
+
+        self.resobj.update_bisect_results(arch, name, first_bad, kbisect.tested, kbisect.rounds, base, head,
+                                          kbisect.candidates)
+
+        return first_bad
+
+    def run_checkpatch(self, head=None, base=None, jobs=None, batch_size=8, cache=True, cache_dir=None):
+        """
+        Run checkpatch on every commit of base..head.
+        :param jobs: Number of checkpatch processes run in parallel, default is CPU count.
+        :param batch_size: Maximum number of commits checked by one checkpatch run.
+        :param cache: Reuse the results of commits with same patch-id.
+        :param cache_dir: Top cache directory.
+        :return: True | False
+        """
         self.logger.info(format_h1("Runing checkpatch script", tab=2))
 
         self.enable_checkpatch = True
         head = self.head if head is None else head
         base = self.base if base is None else base
 
+        if self.valid_git is False:
+            self.logger.error("Invalid git repo")
+            self.resobj.update_checkpatch_results(False, 0, 0)
+            return False
+
+        checkpatch = Checkpatch(self.src, self.checkpatch_source, jobs, batch_size,
+                                CheckpatchCache(cache_dir or None, logger=self.logger) if cache else None,
+                                logger=self.logger)
+
+        results = checkpatch.run(base, head)
+        if results is None:
+            self.resobj.update_checkpatch_results(False, 0, 0)
+            return False
+
+        self.logger.info("Number of patches between %s..%s is %d", base, head, len(results))
+
         gerrorcount = 0
         gwarningcount = 0
+        commits = []
 
-        try:
-            if self.valid_git is False:
-                raise Exception("Invalid git repo")
-
-            if not os.path.exists(os.path.join(self.src, CHECK_PATCH_SCRIPT)):
-                raise Exception("Invalid checkpatch script")
-
-            ret, count, err = self.git.cmd('rev-list', '--count',  str(base) + '..'+ str(head))
-            if ret != 0:
-                raise Exception("git rev-list command failed")
-
-            self.logger.info("Number of patches between %s..%s is %d", base, head, int(count))
-
-            def parse_results(data):
-                regex = r"total: ([0-9]*) errors, ([0-9]*) warnings,"
-                match = re.search(regex, data)
-                if match:
-                    return int(match.group(1)), int(match.group(2))
-
-                return 0, 0
-
-            prev_index = 0
-
-            for index in range(1, int(count) + 1):
-                commit_range = str(head) + '~' + str(index) + '..' + str(head) + '~' + str(prev_index)
-                ret, out, err = self.sh.cmd(os.path.join(self.src, CHECK_PATCH_SCRIPT), '-g', commit_range)
-                lerrorcount, lwarningcount = parse_results(out)
-                if lerrorcount != 0 or lwarningcount != 0:
-                    self.logger.info(out)
-                    self.logger.info(err)
-                gerrorcount = gerrorcount + int(lerrorcount)
-                gwarningcount = gwarningcount + int(lwarningcount)
-                self.logger.debug("lerror:%d lwarning:%d gerror:%d gwarning:%d\n", lerrorcount, lwarningcount,
-                                  gerrorcount, gwarningcount)
-                prev_index = index
-        except Exception as e:
-            self.logger.error(e)
-            self.resobj.update_checkpatch_results(False, gwarningcount, gerrorcount)
-            return False
-        else:
-            self.resobj.update_checkpatch_results(True, gwarningcount, gerrorcount)
-            return True
+        for result in results:
+            if result["error_count"] != 0 or result["warning_count"] != 0:
+                self.logger.info(result["output"])
+            gerrorcount += result["error_count"]
+            gwarningcount += result["warning_count"]
+            self.logger.debug("%s error:%d warning:%d cached:%s", result["commit"], result["error_count"],
+                              result["warning_count"], result["cached"])
+            commits.append({"commit": result["commit"], "error_count": result["error_count"],
+                            "warning_count": result["warning_count"], "output": result["output"]})
+
+        self.resobj.update_checkpatch_results(True, gwarningcount, gerrorcount, commits)
+
+        return True
 
     def print_results(self, test_type='all'):
         self.resobj.print_test_results(test_type=test_type)
 
+    def add_report(self, format, outfile):
+        """
+        Write report of given format to outfile while tests are running, report is completed by
+        finish_reports().
+        :param format: text | junit | html.
+        :param outfile: Report file.
+        :return: None
+        """
+        fobj = open(outfile, 'w')
+        self.report_files.append(fobj)
+        self.resobj.add_report(get_report_writer(format, fobj, logger=self.logger))
+
+    def finish_reports(self):
+        self.resobj.finish_reports()
+        for fobj in self.report_files:
+            fobj.close()
+        self.report_files = []
+
+    def write_report(self, outfile, format="text"):
+        with open(outfile, 'w') as fobj:
+            self.resobj.write_report(fobj, format)
+
     def get_results(self, test_type='all'):
         return self.resobj.get_test_results(test_type=test_type)
 
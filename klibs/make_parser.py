@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+#
+# Streaming make output parser class
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Basic class support
+# @TODO    :
+#
+#
+
+import os
+import re
+import logging
+import threading
+import collections
+from klibs.diagnostics import parse_json_diagnostics, parse_text_diagnostic, format_record
+
+# Kbuild quiet command lines, e.g. "  CC [M]  drivers/usb/core/hub.o" or "  MODPOST 120 modules"
+KBUILD_STEP_REGEX = re.compile(r'^\s{2}([A-Z][A-Z0-9_]*(?: \[M\])?)\s+(\S.*?)\s*$')
+MAKE_DIR_REGEX = re.compile(r"^make(?:\[\d+\])?: (Entering|Leaving) directory [`'](.*)'")
+
+# Kbuild steps which produce an object file.
+OBJECT_STEPS = ['CC', 'CC [M]', 'AS', 'AS [M]', 'CPP', 'HOSTCC', 'HOSTCXX']
+
+class MakeOutputParser(object):
+    """
+    Parse make output line by line while the build is running.
+
+    Warnings and errors are counted incrementally, raw output is spilled to log
+    files instead of being kept in memory, and kbuild steps are reported to
+    progress callback as they happen.
+
+    In structured mode, stderr lines are parsed into diagnostic records (see
+    klibs.diagnostics). JSON/SARIF diagnostics of a translation unit and text
+    diagnostics with a location are counted by their kind, so notes and
+    messages which only mention "error:" are not counted. Other lines are
+    counted by the text rules.
+
+    Progress callback gets a dict with following keys,
+        step: Kbuild step (CC, LD, AR, etc).
+        target: Target of the step.
+        dir: Current directory (directory of the target).
+        objects: Number of objects compiled so far.
+    """
+    def __init__(self, log_dir=None, progress=None, max_lines=100000, tail_lines=50, structured=False,
+                 logger=None):
+        """
+        MakeOutputParser init()
+        :param log_dir: If given, stdout/stderr are written to build.log/build.err under it.
+        :param progress: Progress callback function.
+        :param max_lines: Maximum number of warning/error lines kept in memory, counts are not limited.
+        :param tail_lines: Number of last stderr lines kept for error reporting.
+        :param structured: Parse diagnostics into records.
+        :param logger: Logger object.
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.progress = progress
+        self.max_lines = max_lines
+        self.warning_count = 0
+        self.error_count = 0
+        self.warnings = []
+        self.errors = []
+        self.structured = structured
+        self.records = []
+        self.objects = 0
+        self.current_dir = None
+        self.tail = collections.deque(maxlen=tail_lines)
+        self.out_log = None
+        self.err_log = None
+        self._out_obj = None
+        self._err_obj = None
+        self._lock = threading.Lock()
+        self._listeners = []
+
+        if log_dir is not None:
+            if not os.path.exists(log_dir):
+                os.makedirs(log_dir)
+            self.out_log = os.path.join(log_dir, 'build.log')
+            self.err_log = os.path.join(log_dir, 'build.err')
+            self._out_obj = open(self.out_log, 'w')
+            self._err_obj = open(self.err_log, 'w')
+
+    def add_listener(self, func):
+        """
+        Add function which is called for every output line as func(line, stream).
+        :param func: Listener function.
+        :return: None
+        """
+        self._listeners.append(func)
+
+    def _parse_step(self, line):
+        match = KBUILD_STEP_REGEX.match(line)
+        if match is None:
+            match = MAKE_DIR_REGEX.match(line)
+            if match is not None and match.group(1) == 'Entering':
+                self.current_dir = match.group(2)
+            return
+
+        step, target = match.group(1), match.group(2)
+        if step in OBJECT_STEPS:
+            self.objects += 1
+
+        self.current_dir = os.path.dirname(target) or '.'
+
+        if self.progress is not None:
+            self.progress({'step': step, 'target': target, 'dir': self.current_dir, 'objects': self.objects})
+
+    def _count_text(self, line):
+        if "warning:" in line:
+            self.warning_count += 1
+            if len(self.warnings) < self.max_lines:
+                self.warnings.append(line)
+        if "error:" in line:
+            self.error_count += 1
+            if len(self.errors) < self.max_lines:
+                self.errors.append(line)
+
+    def _add_record(self, record):
+        if record["kind"] == "warning":
+            self.warning_count += 1
+            if len(self.warnings) < self.max_lines:
+                self.warnings.append(format_record(record))
+        elif record["kind"] == "error":
+            self.error_count += 1
+            if len(self.errors) < self.max_lines:
+                self.errors.append(format_record(record))
+        else:
+            return
+
+        if len(self.records) < self.max_lines:
+            self.records.append(record)
+
+    def _parse_structured(self, line):
+        records = parse_json_diagnostics(line)
+        if records is None:
+            record = parse_text_diagnostic(line)
+            if record is None:
+                return False
+            records = [record]
+
+        for record in records:
+            self._add_record(record)
+
+        return True
+
+    def feed(self, line, stream='out'):
+        """
+        Parse one line of make output.
+        :param line: Output line.
+        :param stream: 'out' for stdout, 'err' for stderr.
+        :return: None
+        """
+        line = line.rstrip('\n')
+
+        with self._lock:
+            fobj = self._err_obj if stream == 'err' else self._out_obj
+            if fobj is not None:
+                fobj.write(line + '\n')
+
+            if stream == 'err':
+                self.tail.append(line)
+                if not self.structured or not self._parse_structured(line):
+                    self._count_text(line)
+            else:
+                self._parse_step(line)
+
+            for func in self._listeners:
+                func(line, stream)
+
+    def feed_all(self, data, stream='out'):
+        """
+        Parse the output which is already collected in a string.
+        :param data: Output string.
+        :param stream: 'out' for stdout, 'err' for stderr.
+        :return: None
+        """
+        for line in data.splitlines():
+            self.feed(line, stream)
+
+    def close(self):
+        for fobj in [self._out_obj, self._err_obj]:
+            if fobj is not None:
+                fobj.close()
+
+        self._out_obj = None
+        self._err_obj = None
+
+    def summary(self):
+        return "objects:%d warnings:%d errors:%d" % (self.objects, self.warning_count, self.error_count)
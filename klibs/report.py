@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+#
+# Kernel test report writers
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Basic class support
+# @TODO    :
+#
+#
+
+import logging
+from xml.sax.saxutils import escape, quoteattr
+
+from klibs.results_store import static_tests
+
+class ReportWriter(object):
+    """
+    Base class of report writers.
+
+    Writer streams the report to a file like object: start() writes the
+    header, add_cell() writes one static test result once its arch/config
+    cell is completed (so the report can be followed while the test matrix
+    is running) and finish() writes the remaining sections and the footer.
+    """
+    def __init__(self, fobj, logger=None):
+        """
+        ReportWriter init()
+        :param fobj: File like object, only write() and flush() are used.
+        :param logger: Logger object.
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.fobj = fobj
+
+    def write(self, data):
+        self.fobj.write(data)
+
+    def start(self, results):
+        pass
+
+    def add_cell(self, arch, config, test, record):
+        pass
+
+    def finish(self, results):
+        pass
+
+    def flush(self):
+        if hasattr(self.fobj, 'flush'):
+            self.fobj.flush()
+
+class TextReport(ReportWriter):
+    """
+    Plain text report, one line per static test result.
+    """
+    def start(self, results):
+        self.write(results.kernel_info())
+        self.write('Static Test Results:\n')
+
+    def add_cell(self, arch, config, test, record):
+        self.write('\t%s/%s %s: %s (%d warnings, %d errors)\n' % (arch, config, test, record.status,
+                                                                 record.warning_count, record.error_count))
+
+    def finish(self, results):
+        self.write('\n')
+        self.write(results.static_summary_results())
+        self.write(results.checkpatch_test_results())
+        self.write(results.custom_test_results())
+        self.write(results.bisect_test_results())
+        self.write(results.commit_test_results())
+        self.flush()
+
+class JUnitReport(ReportWriter):
+    """
+    JUnit XML report, every static test, custom test and commit build is a test case.
+
+    Test suite element carries the number of tests, failures and skipped tests, so
+    static test cases are kept until finish() and each suite is written as a whole.
+    """
+    def __init__(self, fobj, logger=None):
+        ReportWriter.__init__(self, fobj, logger)
+        self.static_cases = []
+
+    def _testcase(self, classname, name, status, message='', time=None, output=None):
+        data = '    <testcase classname=%s name=%s%s>' % (quoteattr(classname), quoteattr(name),
+                                                          '' if time is None else ' time="%s"' % time)
+        if status == "Failed":
+            data += '<failure message=%s/>' % quoteattr(message)
+        elif status == "N/A":
+            data += '<skipped/>'
+        if output is not None:
+            data += '<system-out>%s</system-out>' % escape(output)
+        data += '</testcase>\n'
+
+        return status, data
+
+    def _testsuite(self, name, cases):
+        self.write('  <testsuite name=%s tests="%d" failures="%d" skipped="%d">\n' %
+                   (quoteattr(name), len(cases), len([case for case in cases if case[0] == "Failed"]),
+                    len([case for case in cases if case[0] == "N/A"])))
+        for status, data in cases:
+            self.write(data)
+        self.write('  </testsuite>\n')
+
+    def start(self, results):
+        self.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        self.write('<testsuites name=%s>\n' % quoteattr("kernel-test %s" % results.kernel_params.get("head", "")))
+
+    def add_cell(self, arch, config, test, record):
+        self.static_cases.append(self._testcase("static-test.%s.%s" % (arch, config), test, record.status,
+                                                "%d errors, %d warnings" % (record.error_count,
+                                                                            record.warning_count)))
+
+    def finish(self, results):
+        self._testsuite("static-test", self.static_cases)
+        self.static_cases = []
+
+        self._testsuite("checkpatch", [self._testcase("checkpatch", commit["commit"],
+                                                      "Failed" if commit["error_count"] > 0 else "Passed",
+                                                      "%d errors, %d warnings" % (commit["error_count"],
+                                                                                  commit["warning_count"]),
+                                                      output=commit.get("output", None))
+                                       for commit in results.checkpatch_results.get("commits", [])])
+
+        self._testsuite("custom-test", [self._testcase("custom-test", obj["name"], obj["status"],
+                                                       "exit status %s" % obj.get("exit-status", ""),
+                                                       obj.get("duration", None), obj.get("log", None))
+                                        for obj in results.custom_results])
+
+        self._testsuite("commit-test", [self._testcase("commit-test.%s.%s" % (obj["arch"], obj["config"]),
+                                                       obj["commit"], obj["status"],
+                                                       "%d errors, %d warnings" % (obj["error_count"],
+                                                                                   obj["warning_count"]))
+                                        for obj in results.commit_results])
+
+        self.write('</testsuites>\n')
+        self.flush()
+
+HTML_HEADER = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>%s</title>
+<style>
+body { font-family: sans-serif; }
+table { border-collapse: collapse; margin-bottom: 2em; }
+th, td { border: 1px solid #ccc; padding: 2px 8px; text-align: left; }
+.Passed { background: #dfd; }
+.Failed { background: #fdd; }
+</style>
+</head>
+<body>
+"""
+
+class HTMLReport(ReportWriter):
+    """
+    Static HTML summary, rows are written as results come in.
+    """
+    def _row(self, status, cells):
+        self.write('<tr class="%s">%s</tr>\n' % (escape(status), ''.join(['<td>%s</td>' % escape(str(cell))
+                                                                          for cell in cells])))
+
+    def _table(self, title, columns):
+        self.write('<h2>%s</h2>\n<table>\n<tr>%s</tr>\n' % (escape(title), ''.join(['<th>%s</th>' % escape(column)
+                                                                                   for column in columns])))
+
+    def start(self, results):
+        params = results.kernel_params
+        self.write(HTML_HEADER % escape("Kernel test results %s" % params.get("head", "")))
+        self.write('<h1>%s</h1>\n' % escape("%s %s" % (params.get("version", ""), params.get("branch", ""))))
+        self.write('<p>Head: %s<br>Base: %s</p>\n' % (escape(params.get("head", "")), escape(params.get("base", ""))))
+        self._table("Static Test Results", ["Arch", "Config", "Test", "Status", "Warnings", "Errors"])
+
+    def add_cell(self, arch, config, test, record):
+        self._row(record.status, [arch, config, test, record.status, record.warning_count, record.error_count])
+
+    def finish(self, results):
+        self.write('</table>\n')
+
+        if len(results.custom_results) > 0:
+            self._table("Custom Test Results", ["Name", "Status", "Exit status", "Duration (s)", "Peak RSS (KB)"])
+            for obj in results.custom_results:
+                self._row(obj["status"], [obj["name"], obj["status"], obj.get("exit-status", ""),
+                                          obj.get("duration", ""), obj.get("peak-rss", "")])
+            self.write('</table>\n')
+
+        if len(results.commit_results) > 0:
+            self._table("Commit Test Results", ["Commit", "Arch", "Config", "Status", "Warnings", "Errors"])
+            for obj in results.commit_results:
+                self._row(obj["status"], [obj["commit"][:12], obj["arch"], obj["config"], obj["status"],
+                                          obj["warning_count"], obj["error_count"]])
+            self.write('</table>\n')
+
+        checkpatch = results.checkpatch_results
+        self.write('<h2>Checkpatch: %s</h2>\n<p>%s warnings, %s errors</p>\n' %
+                   (escape(checkpatch["status"]), checkpatch["warning_count"], checkpatch["error_count"]))
+
+        self.write('</body>\n</html>\n')
+        self.flush()
+
+report_writers = {
+    "text": TextReport,
+    "junit": JUnitReport,
+    "html": HTMLReport,
+}
+
+def get_report_writer(format, fobj, logger=None):
+    """
+    Get report writer object.
+    :param format: text | junit | html.
+    :param fobj: File like object.
+    :return: ReportWriter object.
+    """
+    if format not in report_writers:
+        raise ValueError("Invalid report format %s" % format)
+
+    return report_writers[format](fobj, logger=logger)
+
+def write_report(results, fobj, format="text", logger=None):
+    """
+    Write full report of given results.
+    :param results: KernelResults object.
+    :param fobj: File like object.
+    :param format: text | junit | html.
+    :return: None
+    """
+    writer = get_report_writer(format, fobj, logger)
+    writer.start(results)
+    static = results.static
+    for arch in static.archs:
+        for config in static.configs:
+            for test in static_tests:
+                record = static.get(arch, config, test)
+                # Tests which are not run are left out.
+                if record.status != "N/A":
+                    writer.add_cell(arch, config, test, record)
+    writer.finish(results)
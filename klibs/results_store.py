@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+#
+# Static test results store
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Basic class support
+# @TODO    :
+#
+#
+
+from future.utils import viewitems
+
+static_tests = ["compile-test", "sparse-test", "smatch-test"]
+
+class TestRecord(object):
+    """
+    Result of one static test of one arch/config.
+    Optional fields (ccache, trace, diagnostics, diff, etc) are kept in extra dict.
+    """
+    __slots__ = ("status", "warning_count", "error_count", "extra")
+
+    def __init__(self, status="N/A", warning_count=0, error_count=0, extra=None):
+        self.status = status
+        self.warning_count = warning_count
+        self.error_count = error_count
+        self.extra = extra
+
+    def update(self, status, warning_count=0, error_count=0, **kwargs):
+        self.status = status
+        self.warning_count = warning_count
+        self.error_count = error_count
+        for key, value in viewitems(kwargs):
+            if value is not None:
+                if self.extra is None:
+                    self.extra = {}
+                self.extra[key] = value
+
+    def to_dict(self):
+        obj = {"status": self.status, "warning_count": self.warning_count, "error_count": self.error_count}
+        if self.extra is not None:
+            obj.update(self.extra)
+
+        return obj
+
+    @classmethod
+    def from_dict(cls, obj):
+        extra = dict([(key, value) for key, value in viewitems(obj) if key not in
+                      ["status", "warning_count", "error_count"]])
+
+        return cls(obj.get("status", "N/A"), obj.get("warning_count", 0), obj.get("error_count", 0),
+                   extra if len(extra) > 0 else None)
+
+# Returned for tests which are not run yet, records are only created on update.
+EMPTY_RECORD = TestRecord()
+
+class StaticResults(object):
+    """
+    Static test results table keyed by (arch, config, test).
+
+    Adding an arch or config and updating a result are constant time
+    operations. The nested JSON form of "static-test" results (list of arch
+    objects with config -> test -> status dicts) is only created by
+    to_json(), and load() reads it back one record at a time.
+
+    Usage is,
+        results = StaticResults(["x86_64"], ["defconfig"])
+        results.update("x86_64", "defconfig", "compile-test", "Passed", 2, 0)
+        results.get("x86_64", "defconfig", "compile-test").warning_count
+    """
+    def __init__(self, archs=[], configs=[]):
+        self.records = {}
+        # Lists keep the result order, arch index and config set are used for lookup.
+        self.archs = []
+        self.configs = []
+        self._archs = {}
+        self._configs = set()
+        for arch in archs:
+            self.add_arch(arch)
+        for config in configs:
+            self.add_config(config)
+
+    def add_arch(self, arch):
+        if arch not in self._archs:
+            self._archs[arch] = len(self.archs)
+            self.archs.append(arch)
+
+    def add_config(self, config):
+        if config not in self._configs:
+            self._configs.add(config)
+            self.configs.append(config)
+
+    def has_arch(self, arch):
+        return arch in self._archs
+
+    def has_config(self, config):
+        return config in self._configs
+
+    def arch_index(self, arch):
+        return self._archs.get(arch, -1)
+
+    def get(self, arch, config, test):
+        return self.records.get((arch, config, test), EMPTY_RECORD)
+
+    def update(self, arch, config, test, status, warning_count=0, error_count=0, **kwargs):
+        self.add_arch(arch)
+        self.add_config(config)
+        record = self.records.get((arch, config, test), None)
+        if record is None:
+            record = self.records[(arch, config, test)] = TestRecord()
+        record.update(status, warning_count, error_count, **kwargs)
+
+    def merge(self, other):
+        """
+        Merge other StaticResults object, results of other take precedence except the tests it didn't run.
+        :param other: StaticResults object.
+        :return: None
+        """
+        for arch in other.archs:
+            self.add_arch(arch)
+        for config in other.configs:
+            self.add_config(config)
+        for key, record in viewitems(other.records):
+            if record.status != "N/A" or key not in self.records:
+                self.records[key] = record
+
+    def load(self, data):
+        """
+        Merge "static-test" results in JSON form.
+        :param data: List of arch objects.
+        :return: None
+        """
+        for obj in data:
+            arch = obj["arch_name"]
+            self.add_arch(arch)
+            for config, tests in viewitems(obj):
+                if config == "arch_name" or not isinstance(tests, dict):
+                    continue
+                self.add_config(config)
+                for test, value in viewitems(tests):
+                    record = TestRecord.from_dict(value)
+                    # Tests which are not run need no record.
+                    if record.status == "N/A" and (record.extra is None or (arch, config, test) in self.records):
+                        continue
+                    self.records[(arch, config, test)] = record
+
+    def iter_json(self):
+        """
+        Generate "static-test" JSON objects one arch at a time.
+        """
+        for arch in self.archs:
+            yield self.arch_json(arch)
+
+    def arch_json(self, arch):
+        """
+        Get "static-test" JSON object of given arch.
+        """
+        obj = {"arch_name": arch}
+        for config in self.configs:
+            obj[config] = dict([(test, self.get(arch, config, test).to_dict()) for test in static_tests])
+
+        return obj
+
+    def to_json(self):
+        return list(self.iter_json())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+#
+# Append-only test run journal
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Basic class support
+# @TODO    :
+#
+#
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+
+def cell_key(*args):
+    """
+    Get the journal key of a test matrix cell from its config objects.
+    """
+    return hashlib.sha1(json.dumps(args, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+class RunJournal(object):
+    """
+    JSON lines journal of a test run.
+
+    First line is the run header (kind "run") with kernel params of the
+    run, every other line is one completed result. Lines are written and
+    synced as soon as a result is ready, so a crashed run can be resumed
+    from its journal. A partially written last line is ignored on read.
+
+    Usage is,
+        journal = RunJournal("out/ktest-journal.jsonl")
+        journal.start(head=head, base=base)
+        journal.append("cell", key=key, status=True)
+        for entry in journal.entries(): ...
+    """
+    def __init__(self, path, logger=None):
+        """
+        RunJournal init()
+        :param path: Journal file path.
+        :param logger: Logger object.
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.path = os.path.abspath(path)
+        self._lock = threading.Lock()
+
+    def _write(self, entry, mode='a'):
+        line = json.dumps(entry, sort_keys=True)
+        with self._lock:
+            if not os.path.exists(os.path.dirname(self.path)):
+                os.makedirs(os.path.dirname(self.path))
+            with open(self.path, mode) as fobj:
+                fobj.write(line + '\n')
+                fobj.flush()
+                os.fsync(fobj.fileno())
+
+    def start(self, **params):
+        """
+        Start a new run, existing journal is truncated.
+        :param params: Run params (head, base, branch, etc) stored in the header.
+        :return: None
+        """
+        self._write(dict(params, kind="run", time=time.time()), mode='w')
+
+    def rewrite(self, entries):
+        """
+        Replace the journal with given entries, e.g. to drop the results of interrupted tests on resume.
+        New journal is written to a temporary file and renamed, so a crash leaves either journal intact.
+        :param entries: List of entry dicts, header included.
+        :return: None
+        """
+        with self._lock:
+            with open(self.path + '.tmp', 'w') as fobj:
+                for entry in entries:
+                    fobj.write(json.dumps(entry, sort_keys=True) + '\n')
+                fobj.flush()
+                os.fsync(fobj.fileno())
+            os.rename(self.path + '.tmp', self.path)
+
+    def append(self, kind, **data):
+        self._write(dict(data, kind=kind, time=time.time()))
+
+    def entries(self):
+        """
+        Read journal entries.
+        :return: List of entry dicts, header included.
+        """
+        entries = []
+
+        if not os.path.exists(self.path):
+            return entries
+
+        with open(self.path) as fobj:
+            for index, line in enumerate(fobj):
+                if len(line.strip()) == 0:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    self.logger.warning("Journal %s: ignoring invalid line %d", self.path, index + 1)
+
+        return entries
+
+    def header(self):
+        entries = self.entries()
+
+        return entries[0] if len(entries) > 0 and entries[0].get("kind", None) == "run" else None
@@ -0,0 +1,220 @@
+#!/usr/bin/env python
+#
+# Build matrix scheduler class
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Basic class support
+# @TODO    :
+#
+#
+
+import time
+import logging
+import threading
+import traceback
+import multiprocessing
+
+from klibs.decorators import format_h1
+
+# Rough peak memory (MB) needed per make thread for each config type.
+CONFIG_MEMORY_PER_THREAD = {
+    'allyesconfig': 1024,
+    'allmodconfig': 768,
+    'randconfig': 512,
+    'defconfig': 384,
+    'allnoconfig': 256,
+}
+
+DEFAULT_MEMORY_PER_THREAD = 512
+
+def get_total_memory():
+    """
+    Get the total system memory in MB.
+    :return: Memory in MB, 0 if it can't be found.
+    """
+    try:
+        with open('/proc/meminfo') as fobj:
+            for line in fobj:
+                if line.startswith('MemTotal:'):
+                    return int(line.split()[1]) // 1024
+    except (IOError, OSError, ValueError):
+        pass
+
+    return 0
+
+def estimate_job_memory(config, threads):
+    """
+    Estimate the peak memory of a kernel build job.
+    :param config: Config name (allyesconfig, defconfig, etc).
+    :param threads: Number of make threads used by the job.
+    :return: Memory in MB.
+    """
+    return CONFIG_MEMORY_PER_THREAD.get(config, DEFAULT_MEMORY_PER_THREAD) * max(threads, 1)
+
+class BuildJob(object):
+    """
+    Single unit of work (one arch/config cell) scheduled by BuildScheduler.
+    """
+    def __init__(self, name, func, args=(), kwargs=None, cpus=1, memory=0, exclusive=False):
+        """
+        BuildJob init()
+        :param name: Name of the job, used in schedule report.
+        :param func: Function to run, its return value is stored in result.
+        :param args: Positional args of func.
+        :param kwargs: Keyword args of func.
+        :param cpus: Number of CPUs used by the job.
+        :param memory: Peak memory (MB) used by the job.
+        :param exclusive: Set True if job can't run along with other jobs (e.g. it modifies source tree).
+        """
+        self.name = name
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.cpus = cpus
+        self.memory = memory
+        self.exclusive = exclusive
+        self.status = "Pending"
+        self.result = None
+        self.start = None
+        self.end = None
+        self.error = None
+
+    def duration(self):
+        if self.start is None or self.end is None:
+            return 0
+        return self.end - self.start
+
+class BuildScheduler(object):
+    """
+    Run multiple build jobs concurrently under a global CPU and memory budget.
+
+    Jobs are started in the order they are added. If the next job does not fit in
+    the free budget, a later job which fits is started instead (backfill). A job
+    bigger than the whole budget is started only when nothing else is running.
+    """
+    def __init__(self, cpu_budget=None, memory_budget=None, max_jobs=None, logger=None):
+        """
+        BuildScheduler init()
+        :param cpu_budget: Total CPUs shared by all jobs. Defaults to cpu_count.
+        :param memory_budget: Total memory (MB) shared by all jobs. 0 or None means no limit.
+        :param max_jobs: Maximum number of concurrent jobs. Defaults to cpu_budget.
+        :param logger: Logger object.
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.cpu_budget = cpu_budget if cpu_budget else multiprocessing.cpu_count()
+        self.memory_budget = memory_budget if memory_budget else 0
+        self.max_jobs = max_jobs if max_jobs else self.cpu_budget
+        self.jobs = []
+        self.start = None
+        self.end = None
+        self._cond = threading.Condition()
+        self._running = []
+
+    def add_job(self, name, func, args=(), kwargs=None, cpus=1, memory=0, exclusive=False):
+        """
+        Add new job to the scheduler queue.
+        :return: BuildJob object.
+        """
+        job = BuildJob(name, func, args, kwargs, min(max(cpus, 1), self.cpu_budget), memory, exclusive)
+        self.jobs.append(job)
+
+        return job
+
+    def _fits(self, job):
+        if len(self._running) == 0:
+            return True
+
+        if job.exclusive or any(map(lambda x: x.exclusive, self._running)):
+            return False
+
+        if len(self._running) >= self.max_jobs:
+            return False
+
+        if sum(map(lambda x: x.cpus, self._running)) + job.cpus > self.cpu_budget:
+            return False
+
+        if self.memory_budget > 0:
+            if sum(map(lambda x: x.memory, self._running)) + job.memory > self.memory_budget:
+                return False
+
+        return True
+
+    def _run_job(self, job):
+        try:
+            job.result = job.func(*job.args, **job.kwargs)
+            job.status = "Done"
+        except Exception as e:
+            job.error = e
+            job.status = "Error"
+            self.logger.error("Job %s failed with exception %s", job.name, e)
+            self.logger.debug(traceback.format_exc())
+        finally:
+            with self._cond:
+                job.end = time.time()
+                self._running.remove(job)
+                self._cond.notify_all()
+
+    def run(self):
+        """
+        Run all queued jobs and wait for them to complete.
+        :return: List of BuildJob objects.
+        """
+        pending = [job for job in self.jobs if job.status == "Pending"]
+        self.start = time.time()
+
+        with self._cond:
+            while len(pending) > 0 or len(self._running) > 0:
+                started = False
+                for job in list(pending):
+                    if not self._fits(job):
+                        # Exclusive jobs keep their place, don't let others overtake it.
+                        if job.exclusive:
+                            break
+                        continue
+                    pending.remove(job)
+                    self._running.append(job)
+                    job.status = "Running"
+                    job.start = time.time()
+                    self.logger.debug("Starting job %s cpus:%d memory:%d", job.name, job.cpus, job.memory)
+                    thread = threading.Thread(target=self._run_job, args=(job,), name=job.name)
+                    thread.daemon = True
+                    thread.start()
+                    started = True
+                if not started:
+                    self._cond.wait()
+
+        self.end = time.time()
+
+        return self.jobs
+
+    def report(self):
+        """
+        Get the schedule report of completed jobs.
+        :return: Report string.
+        """
+        out = format_h1("Build schedule", tab=2)
+        if self.start is None:
+            return out + '\tNo jobs scheduled\n'
+
+        width = max([len(job.name) for job in self.jobs] + [4])
+        row = '\t%-' + str(width) + 's %8s %8s %6s %8s %s\n'
+        out += row % ("name", "start", "duration", "cpus", "memory", "status")
+        for job in sorted(self.jobs, key=lambda x: x.start if x.start is not None else 0):
+            out += row % (job.name,
+                          "%.1f" % ((job.start or self.start) - self.start),
+                          "%.1f" % job.duration(), job.cpus, job.memory, job.status)
+
+        total = (self.end or time.time()) - self.start
+        serial = sum(map(lambda x: x.duration(), self.jobs))
+        out += '\tWall time: %.1fs Serial time: %.1fs Speedup: %.2fx\n' % \
+               (total, serial, (serial / total) if total > 0 else 1.0)
+
+        return out
@@ -0,0 +1,247 @@
+#!/usr/bin/env python
+#
+# Test matrix sharding and shard results merge
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Basic class support
+# @TODO    :
+#
+#
+
+import json
+import hashlib
+import logging
+from future.utils import viewitems
+
+from klibs.results_store import StaticResults
+
+# Relative build cost of configs, used when there is no history of the cell.
+DEFAULT_CONFIG_COST = {
+    "allyesconfig": 8.0,
+    "allmodconfig": 8.0,
+    "randconfig": 3.0,
+    "defconfig": 1.0,
+    "allnoconfig": 0.5,
+}
+
+def parse_shard(value):
+    """
+    Parse shard string.
+    :param value: "i/N" string, i is 1 based.
+    :return: (index, count) tuple.
+    """
+    try:
+        index, count = [int(field) for field in value.split('/')]
+    except ValueError:
+        raise ValueError("Invalid shard %s, expected i/N" % value)
+
+    if count < 1 or index < 1 or index > count:
+        raise ValueError("Invalid shard %s, expected 1 <= i <= N" % value)
+
+    return index, count
+
+def default_cost(config, tests=1):
+    """
+    Estimate cell cost from config name and number of tests (compile, sparse, smatch) run in the cell.
+    """
+    return DEFAULT_CONFIG_COST.get(config, DEFAULT_CONFIG_COST["defconfig"]) * max(tests, 1)
+
+def partition(cells, count):
+    """
+    Split cells in shards with similar total cost.
+    Cells are assigned most expensive first to the least loaded shard (ties go to lower shard, then lower
+    key), so every host computes the same plan from the same cells and costs.
+    :param cells: List of (key, cost) tuples.
+    :param count: Number of shards.
+    :return: Dict of key -> shard index (1 based).
+    """
+    loads = [0.0] * count
+    plan = {}
+
+    for key, cost in sorted(cells, key=lambda cell: (-cell[1], cell[0])):
+        index = loads.index(min(loads))
+        loads[index] += cost
+        plan[key] = index + 1
+
+    return plan
+
+def plan_digest(plan):
+    return hashlib.sha1(json.dumps(sorted(plan.items())).encode('utf-8')).hexdigest()[:16]
+
+class ShardMerge(object):
+    """
+    Merge results (results schema dicts) of the shards of one test run.
+
+    Shards must have same head/base and shard plan. A test which has results
+    in more than one shard is a conflict if the results differ. Branch and
+    version can differ in format between hosts, first non empty value is used.
+
+    Usage is,
+        merge = ShardMerge()
+        for data in shard_results:
+            merge.add(data)
+        merged = merge.results()
+        print(merge.conflicts)
+    """
+    def __init__(self, logger=None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.static = StaticResults()
+        self.params = {}
+        self.shard = None
+        self.shards = []
+        self.checkpatch = None
+        self.custom = []
+        self.commits = []
+        self.bisect_runs = []
+        self.summary = {}
+        self.conflicts = []
+
+    def _conflict(self, message, *args):
+        self.conflicts.append(message % args)
+        self.logger.error("Shard merge: " + message, *args)
+
+    def _add_params(self, params):
+        for field in ["head", "base"]:
+            value = params.get(field, "")
+            if len(self.params.get(field, "")) > 0 and len(value) > 0 and self.params[field] != value:
+                self._conflict("%s mismatch %s != %s", field, self.params[field], value)
+            elif len(value) > 0:
+                self.params[field] = value
+        for field in ["branch", "version"]:
+            if len(self.params.get(field, "")) == 0 or self.params[field] == "Linux":
+                self.params[field] = params.get(field, "")
+
+    def _add_shard(self, shard):
+        if shard is None:
+            return
+        if self.shard is None:
+            self.shard = {"count": shard["count"], "plan": shard["plan"]}
+        elif (self.shard["count"], self.shard["plan"]) != (shard["count"], shard["plan"]):
+            self._conflict("shard %d/%d plan %s doesn't match %d/%s", shard["index"], shard["count"], shard["plan"],
+                           self.shard["count"], self.shard["plan"])
+        if shard["index"] in self.shards:
+            self._conflict("shard %d/%d is added twice", shard["index"], shard["count"])
+        else:
+            self.shards.append(shard["index"])
+
+    def _add_static(self, data):
+        static = StaticResults()
+        static.load(data)
+        for arch in static.archs:
+            self.static.add_arch(arch)
+        for config in static.configs:
+            self.static.add_config(config)
+        for key, record in viewitems(static.records):
+            old = self.static.records.get(key, None)
+            if old is not None and old.status != "N/A" and record.status != "N/A" and \
+                    (old.status, old.warning_count, old.error_count) != \
+                    (record.status, record.warning_count, record.error_count):
+                self._conflict("%s/%s %s results differ: %s (%d, %d) != %s (%d, %d)", key[0], key[1], key[2],
+                               old.status, old.warning_count, old.error_count, record.status,
+                               record.warning_count, record.error_count)
+                continue
+            if old is None or old.status == "N/A":
+                self.static.records[key] = record
+
+    def _add_summary(self, summary):
+        for test, value in viewitems(summary):
+            entries = self.summary.setdefault(test, {})
+            for entry in value.get("diagnostics", []):
+                if entry["fingerprint"] not in entries:
+                    entries[entry["fingerprint"]] = dict(entry, archs=list(entry["archs"]),
+                                                         configs=list(entry["configs"]))
+                    continue
+                merged = entries[entry["fingerprint"]]
+                merged["count"] += entry["count"]
+                merged["archs"] += [arch for arch in entry["archs"] if arch not in merged["archs"]]
+                merged["configs"] += [config for config in entry["configs"] if config not in merged["configs"]]
+
+    def add(self, data):
+        """
+        Add results of one shard.
+        :param data: Results dict.
+        :return: None
+        """
+        self._add_params(data.get("kernel-params", {}))
+        self._add_shard(data.get("shard", None))
+        self._add_static(data.get("static-test", []))
+        self._add_summary(data.get("static-summary", {}))
+
+        checkpatch = data.get("checkpatch", {})
+        if checkpatch.get("status", "N/A") != "N/A":
+            if self.checkpatch is not None and self.checkpatch != checkpatch:
+                self._conflict("checkpatch results differ")
+            else:
+                self.checkpatch = checkpatch
+
+        names = dict([(obj["name"], obj) for obj in self.custom])
+        for obj in data.get("custom-test", []):
+            if obj["name"] in names:
+                if names[obj["name"]]["status"] != obj["status"]:
+                    self._conflict("custom test %s results differ", obj["name"])
+                continue
+            self.custom.append(obj)
+
+        self.commits += [obj for obj in data.get("commit-test", []) if obj not in self.commits]
+        self.bisect_runs += data.get("bisect", {}).get("runs", [])
+
+    def missing(self):
+        """
+        Get the shards which are not added.
+        :return: List of shard indexes.
+        """
+        if self.shard is None:
+            return []
+
+        return [index for index in range(1, self.shard["count"] + 1) if index not in self.shards]
+
+    def results(self):
+        """
+        Get the merged results.
+        :return: Results dict.
+        """
+        summary = {}
+        for test, entries in viewitems(self.summary):
+            diagnostics = sorted(entries.values(), key=lambda entry: entry["count"], reverse=True)
+            summary[test] = {
+                "warning_count": sum([entry["count"] for entry in diagnostics if entry["kind"] == "warning"]),
+                "unique_warning_count": len([entry for entry in diagnostics if entry["kind"] == "warning"]),
+                "error_count": sum([entry["count"] for entry in diagnostics if entry["kind"] == "error"]),
+                "unique_error_count": len([entry for entry in diagnostics if entry["kind"] == "error"]),
+                "diagnostics": diagnostics,
+            }
+
+        patch_list = []
+        for run in self.bisect_runs:
+            if len(run["first-bad-commit"]) > 0 and run["first-bad-commit"] not in patch_list:
+                patch_list.append(run["first-bad-commit"])
+
+        ambiguous = [run for run in self.bisect_runs if len(run.get("candidates", [])) > 0]
+
+        results = {
+            "kernel-params": self.params,
+            "static-test": self.static.to_json(),
+            "static-summary": summary,
+            "custom-test": self.custom,
+            "commit-test": self.commits,
+            "bisect": {"status": "N/A" if len(self.bisect_runs) == 0 else
+                       ("Failed" if len(patch_list) > 0 or len(ambiguous) > 0 else "Passed"),
+                       "patch-list": patch_list, "runs": self.bisect_runs},
+        }
+
+        if self.checkpatch is not None:
+            results["checkpatch"] = self.checkpatch
+
+        if self.shard is not None:
+            results["shard"] = {"index": 0, "count": self.shard["count"], "plan": self.shard["plan"],
+                                "merged": sorted(self.shards)}
+
+        return results
@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+#
+# Git worktree pool class
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Basic class support
+# @TODO    :
+#
+#
+
+import os
+import time
+import shutil
+import logging
+import threading
+from contextlib import contextmanager
+
+from pyshell import GitShell, PyShell
+
+class Worktree(object):
+    """
+    Single git worktree managed by WorktreePool.
+    """
+    def __init__(self, path, logger=None):
+        self.path = path
+        self.git = GitShell(wd=path, logger=logger)
+        self.commit = None
+        self.busy = False
+        self.last_used = 0
+
+    def head_sha(self):
+        ret, out, err = self.git.cmd('rev-parse', 'HEAD')
+        return out.strip() if ret == 0 else None
+
+class WorktreePool(object):
+    """
+    Pool of git worktrees of the kernel source, keyed by commit.
+
+    Builds of other commits (e.g. base commit of sparse/smatch tests) use a
+    worktree from the pool instead of checking out the primary source tree, so
+    they can run in parallel with the head build. Worktrees are kept under
+    pool_dir and reused across runs. A free worktree which is already at the
+    requested commit is preferred, otherwise the least recently used one is
+    moved to the new commit, which only rewrites the files that differ.
+
+    If reflink is set, new worktrees are populated with a reflink (copy on
+    write) copy of the primary checkout before git updates them to the commit.
+
+    Usage is,
+        pool = WorktreePool(src)
+        with pool.checkout("v4.18") as path:
+            build(path)
+    """
+    def __init__(self, src, pool_dir=None, max_count=4, reflink=False, logger=None):
+        """
+        WorktreePool init()
+        :param src: Primary kernel git source path.
+        :param pool_dir: Directory of worktrees, default is <git dir>/klibs-worktrees.
+        :param max_count: Maximum number of worktrees.
+        :param reflink: Populate new worktrees with reflink copy of the primary checkout.
+        :param logger: Logger object.
+        """
+        self.logger = logger or logging.getLogger(__name__)
+        self.src = os.path.abspath(src)
+        self.git = GitShell(wd=self.src, logger=self.logger)
+        self.sh = PyShell(wd=self.src, logger=self.logger)
+        self.max_count = max(max_count, 1)
+        self.reflink = reflink
+        self.worktrees = []
+        self._reserved = []
+        self._cond = threading.Condition()
+
+        if pool_dir is None:
+            git_dir = self.git.cmd('rev-parse', '--git-common-dir')[1].strip()
+            pool_dir = os.path.join(self.src, git_dir, 'klibs-worktrees')
+
+        self.dir = os.path.abspath(pool_dir)
+
+        if not os.path.exists(self.dir):
+            os.makedirs(self.dir)
+
+        self._adopt()
+
+    def _adopt(self):
+        """
+        Reuse the worktrees created by previous runs.
+        """
+        ret, out, err = self.git.cmd('worktree', 'list', '--porcelain')
+        if ret != 0:
+            return
+
+        for line in out.splitlines():
+            if not line.startswith('worktree '):
+                continue
+            path = line[len('worktree '):].strip()
+            if os.path.dirname(os.path.abspath(path)) != self.dir or not os.path.exists(path):
+                continue
+            wt = Worktree(path, self.logger)
+            wt.commit = wt.head_sha()
+            self.worktrees.append(wt)
+            self.logger.debug("WorktreePool: reusing %s at %s", path, wt.commit)
+
+        # Remove stale admin entries of deleted worktrees.
+        self.git.cmd('worktree', 'prune')
+
+    def _resolve(self, commit):
+        ret, out, err = self.git.cmd('rev-parse', '--verify', '%s^{commit}' % commit)
+        return out.strip() if ret == 0 else None
+
+    def _new_path(self):
+        # Called with the lock held, so parallel creates get different paths.
+        used = [wt.path for wt in self.worktrees] + self._reserved
+        index = 0
+        while True:
+            path = os.path.join(self.dir, 'wt%d' % index)
+            if path not in used and not os.path.exists(path):
+                self._reserved.append(path)
+                return path
+            index += 1
+
+    def _create(self, path, sha):
+        if not (self.reflink and self._create_reflink(path, sha)):
+            ret, out, err = self.git.cmd('worktree', 'add', '--detach', path, sha)
+            if ret != 0:
+                self.logger.error("WorktreePool: worktree add %s failed: %s", path, err)
+                return None
+
+        wt = Worktree(path, self.logger)
+        wt.commit = sha
+
+        return wt
+
+    def _tracked_entries(self):
+        """
+        Get the top level entries of primary checkout which are tracked by git. Untracked ones,
+        e.g. the out dir of matrix builds, are not copied to new worktrees.
+        :return: List of paths.
+        """
+        ret, out, err = self.git.cmd('ls-tree', '--name-only', 'HEAD')
+        if ret != 0:
+            return []
+
+        return [os.path.join(self.src, x) for x in out.splitlines()
+                if len(x) > 0 and os.path.lexists(os.path.join(self.src, x))]
+
+    def _create_reflink(self, path, sha):
+        ret, out, err = self.git.cmd('worktree', 'add', '--no-checkout', '--detach', path, sha)
+        if ret != 0:
+            return False
+
+        # Copy the primary checkout with copy on write, then let git fix up the differences.
+        entries = self._tracked_entries()
+        ret = self.sh.cmd('cp', '-a', '--reflink=always', *(entries + [path]))[0] if len(entries) > 0 else 0
+        if ret == 0:
+            wt = GitShell(wd=path, logger=self.logger)
+            if wt.cmd('reset', '-q', sha)[0] == 0 and wt.cmd('checkout', '-f', sha)[0] == 0 and \
+                    wt.cmd('clean', '-fdxq')[0] == 0:
+                return True
+
+        self.logger.warning("WorktreePool: reflink copy failed, using normal checkout")
+        self.git.cmd('worktree', 'remove', '--force', path)
+        shutil.rmtree(path, ignore_errors=True)
+        self.git.cmd('worktree', 'prune')
+
+        return False
+
+    def _update(self, wt, sha):
+        if wt.git.cmd('checkout', '-f', '--detach', sha)[0] != 0:
+            return False
+        wt.git.cmd('clean', '-fdxq')
+        wt.commit = sha
+
+        return True
+
+    def acquire(self, commit):
+        """
+        Get a worktree at the given commit, waits if all worktrees are in use.
+        :param commit: Commit SHA, tag or branch.
+        :return: Worktree object, None on error.
+        """
+        sha = self._resolve(commit)
+        if sha is None:
+            self.logger.error("WorktreePool: Invalid commit %s", commit)
+            return None
+
+        path = None
+        with self._cond:
+            while True:
+                free = [wt for wt in self.worktrees if not wt.busy]
+                match = [wt for wt in free if wt.commit == sha]
+                if len(match) > 0:
+                    wt = match[0]
+                    break
+                if len(self.worktrees) + len(self._reserved) < self.max_count:
+                    wt = None
+                    path = self._new_path()
+                    break
+                if len(free) > 0:
+                    wt = sorted(free, key=lambda x: x.last_used)[0]
+                    break
+                self._cond.wait()
+
+            # Reserve it before doing the slow git operations.
+            if wt is not None:
+                wt.busy = True
+
+        if wt is None:
+            wt = self._create(path, sha)
+            with self._cond:
+                self._reserved.remove(path)
+                if wt is not None:
+                    wt.busy = True
+                    self.worktrees.append(wt)
+                self._cond.notify_all()
+        elif wt.commit != sha:
+            self.logger.debug("WorktreePool: moving %s from %s to %s", wt.path, wt.commit, sha)
+            if not self._update(wt, sha):
+                self.logger.error("WorktreePool: checkout of %s in %s failed", sha, wt.path)
+                self.release(wt)
+                return None
+
+        return wt
+
+    def move(self, wt, commit):
+        """
+        Move an acquired worktree to another commit. Only the files which differ are
+        rewritten, so builds in the worktree stay incremental.
+        :param wt: Worktree object returned by acquire().
+        :param commit: Commit SHA, tag or branch.
+        :return: True | False
+        """
+        sha = self._resolve(commit)
+        if sha is None:
+            self.logger.error("WorktreePool: Invalid commit %s", commit)
+            return False
+
+        if wt.commit == sha:
+            return True
+
+        if not self._update(wt, sha):
+            self.logger.error("WorktreePool: checkout of %s in %s failed", sha, wt.path)
+            return False
+
+        return True
+
+    def release(self, wt):
+        """
+        Return the worktree to the pool.
+        :param wt: Worktree object returned by acquire().
+        :return: None
+        """
+        with self._cond:
+            wt.busy = False
+            wt.last_used = time.time()
+            self._cond.notify_all()
+
+    @contextmanager
+    def checkout(self, commit):
+        """
+        Context manager which gives the path of a worktree at the given commit.
+        Path is None if the checkout failed.
+        """
+        wt = self.acquire(commit)
+        try:
+            yield wt.path if wt is not None else None
+        finally:
+            if wt is not None:
+                self.release(wt)
+
+    def remove_all(self):
+        """
+        Remove all the worktrees of the pool.
+        :return: None
+        """
+        with self._cond:
+            for wt in self.worktrees:
+                self.git.cmd('worktree', 'remove', '--force', wt.path)
+                shutil.rmtree(wt.path, ignore_errors=True)
+            self.worktrees = []
+            self.git.cmd('worktree', 'prune')
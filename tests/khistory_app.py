@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Kernel test results history application
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Initial update
+# @TODO    :
+#
+#
+
+import os
+import json
+import time
+import argparse
+import logging
+from klibs.history import ResultsHistory, HISTORY_DEFAULT_PATH
+
+def format_time(value):
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(value))
+
+def format_run(run):
+    return '%s %s %s (%s)' % (format_time(run["time"]), run["head"][:12], run["branch"], run["version"])
+
+def add_cli_options(parser):
+
+    subparsers = parser.add_subparsers(help='commands')
+
+    ingest_parser = subparsers.add_parser('ingest', help='Add results JSON files to history')
+    ingest_parser.set_defaults(which='use_ingest')
+    ingest_parser.add_argument('results', nargs='+', help='Results JSON files, file mtime is used as run time')
+
+    runs_parser = subparsers.add_parser('runs', help='List stored runs')
+    runs_parser.set_defaults(which='use_runs')
+    runs_parser.add_argument('--head', default=None, dest='head', help='Head commit ID')
+    runs_parser.add_argument('--limit', default=20, type=int, dest='limit', help='Maximum number of runs')
+
+    trend_parser = subparsers.add_parser('trend', help='Show results of arch/config over time')
+    trend_parser.set_defaults(which='use_trend')
+    trend_parser.add_argument('arch', help='Arch name')
+    trend_parser.add_argument('config', help='Config name')
+    trend_parser.add_argument('--test', default='compile-test', dest='test',
+                              choices=['compile-test', 'sparse-test', 'smatch-test'], help='Test name')
+    trend_parser.add_argument('--limit', default=50, type=int, dest='limit', help='Maximum number of runs')
+
+    first_parser = subparsers.add_parser('first-seen', help='Find first run of a diagnostic')
+    first_parser.set_defaults(which='use_first_seen')
+    first_parser.add_argument('fingerprint', help='Diagnostic fingerprint or its prefix')
+
+    search_parser = subparsers.add_parser('search', help='Find diagnostics by message text')
+    search_parser.set_defaults(which='use_search')
+    search_parser.add_argument('text', help='Message text')
+
+    for name, help in [('new', 'List diagnostics which first appeared in last days'),
+                       ('regressions', 'List arch/config/tests which got worse in last days')]:
+        sub_parser = subparsers.add_parser(name, help=help)
+        sub_parser.set_defaults(which='use_' + name)
+        sub_parser.add_argument('--days', default=7, type=float, dest='days', help='Number of days')
+
+    parser.add_argument('--db', action='store', dest='db', default=HISTORY_DEFAULT_PATH, help='History database file')
+    parser.add_argument('-d', '--debug', action='store_true', dest='debug', help='Enable debug option')
+
+if __name__ == "__main__":
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    logger = logging.getLogger(__name__)
+
+    parser = argparse.ArgumentParser(description='Script used for querying kernel test results history')
+
+    add_cli_options(parser)
+
+    args = parser.parse_args()
+
+    if args.debug:
+        logger.setLevel(logging.DEBUG)
+
+    history = ResultsHistory(args.db, logger=logger)
+
+    if args.which == 'use_ingest':
+        for path in args.results:
+            with open(path) as fobj:
+                run_id = history.add_run(json.load(fobj), os.path.getmtime(path))
+            print('%s: run %d' % (path, run_id))
+
+    elif args.which == 'use_runs':
+        for run in history.runs(args.head, args.limit):
+            print('%4d %s' % (run["id"], format_run(run)))
+
+    elif args.which == 'use_trend':
+        for result in history.trend(args.arch, args.config, args.test, args.limit):
+            print('%s %-6s %5d warnings %5d errors' % (format_run(result["run"]), result["status"],
+                                                      result["warning_count"], result["error_count"]))
+
+    elif args.which == 'use_first_seen':
+        result = history.first_seen(args.fingerprint)
+        if result is None:
+            print('%s not found' % args.fingerprint)
+        else:
+            print('%s %s: %s' % (result["fingerprint"], result["test"], result["message"]))
+            print('first seen in %s' % format_run(result["run"]))
+
+    elif args.which == 'use_search':
+        for result in history.search(args.text):
+            print('%s %s - %s %s' % (result["fingerprint"], format_time(result["first_seen"]),
+                                     format_time(result["last_seen"]), result["message"]))
+
+    elif args.which == 'use_new':
+        for result in history.new_diagnostics(time.time() - args.days * 24 * 3600):
+            print('%s %s %s' % (result["fingerprint"], format_time(result["first_seen"]), result["message"]))
+
+    elif args.which == 'use_regressions':
+        for result in history.regressions(time.time() - args.days * 24 * 3600):
+            before, after = result["before"], result["after"]
+            print('%s/%s %s: %s -> %s, warnings %d -> %d, errors %d -> %d (%s -> %s)' %
+                  (result["arch"], result["config"], result["test"], before["status"], after["status"],
+                   before["warning_count"], after["warning_count"], before["error_count"],
+                   after["error_count"], before["head"][:12], after["head"][:12]))
+
+    history.close()
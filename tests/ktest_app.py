@@ -18,9 +18,12 @@
 #
 
 import os
+import sys
+import json
 import argparse
 import logging
-from klibs import KernelTest, supported_configs, supported_archs, supported_oldconfigs
+from klibs import KernelTest, KernelResults, supported_configs, supported_archs, supported_oldconfigs
+from klibs.shard import ShardMerge
 
 def is_valid_dir(parser, arg):
     if not os.path.isdir(arg):
@@ -70,6 +73,12 @@ def add_cli_options(parser):
     json_parser = subparsers.add_parser('use_json', help='Use given JSON file for test')
     json_parser.set_defaults(which='use_json')
     json_parser.add_argument('config_data', help='Json config file')
+    json_parser.add_argument('--shard', default=None, dest='shard',
+                             help='Run only shard i/N of the test matrix, e.g. 1/4')
+
+    merge_parser = subparsers.add_parser('merge', help='Merge results JSON files of test matrix shards')
+    merge_parser.set_defaults(which='use_merge')
+    merge_parser.add_argument('results', nargs='+', help='Shard results JSON files')
 
     parser.add_argument('-i', '--kernel-dir', action='store', dest='source_dir',
                         type=lambda x: is_valid_dir(parser, x),
@@ -83,6 +92,13 @@ def add_cli_options(parser):
     parser.add_argument('--rurl', default=None, dest='rurl', help='Kernel remote name')
     parser.add_argument('--head', default=None, dest='head', help='Head commit ID')
     parser.add_argument('--base', default=None, dest='base', help='Base commit ID')
+    parser.add_argument('--journal', default=None, dest='journal',
+                        help='Run journal file, default is <out>/ktest-journal.jsonl')
+    parser.add_argument('--resume', action='store_true', dest='resume',
+                        help='Resume the run from journal, skip completed tests')
+    parser.add_argument('--report', action='store', dest='report', default=None, help='Test report file')
+    parser.add_argument('--report-format', action='store', dest='report_format', default='text',
+                        choices=['text', 'junit', 'html'], help='Test report format')
     parser.add_argument('-l', '--log', action='store', dest='log_file',
                         nargs='?',
                         const=os.path.join(os.getcwd(), 'ktest.log'),
@@ -117,13 +133,33 @@ if __name__ == "__main__":
 
     obj= None
 
+    if args.which == 'use_merge':
+        merge = ShardMerge(logger=logger)
+        for path in args.results:
+            with open(path) as fobj:
+                merge.add(json.load(fobj))
+        if len(merge.missing()) > 0:
+            logger.error("Missing shards %s", ', '.join([str(index) for index in merge.missing()]))
+        results = KernelResults(old_cfg=merge.results(), logger=logger)
+        if args.out_json is not None:
+            results.dump_results(args.out_json)
+        if args.report is not None:
+            with open(args.report, 'w') as fobj:
+                results.write_report(fobj, args.report_format)
+        logger.info(results.get_test_results('all'))
+        sys.exit(1 if len(merge.conflicts) > 0 or len(merge.missing()) > 0 else 0)
+
     if args.which == 'use_json':
         obj = KernelTest(args.source_dir, args.config_data, args.out, args.rname, args.rurl, args.branch,
-                         args.head, args.base, args.out_json, logger=logger)
+                         args.head, args.base, args.out_json, logger=logger, journal=args.journal,
+                         resume=args.resume, shard=args.shard)
+        if args.report is not None:
+            obj.add_report(args.report_format, args.report)
         obj.auto_test()
     else:
         obj = KernelTest(args.source_dir, None, args.out, args.rname, args.rurl, args.branch,
-                         args.head, args.base, args.out_json, logger=logger)
+                         args.head, args.base, args.out_json, logger=logger, journal=args.journal,
+                         resume=args.resume)
 
     if obj:
         if args.which == 'use_compile':
@@ -138,6 +174,10 @@ if __name__ == "__main__":
         if args.out_json is not None:
             obj.dump_results(args.out_json)
 
+        # auto_test writes the report while tests are running.
+        if args.report is not None and args.which != 'use_json':
+            obj.write_report(args.report, args.report_format)
+
         obj.print_results()
 
     else:
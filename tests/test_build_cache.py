@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+#
+# Build cache classes test script
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Initial update
+# @TODO    :
+#
+#
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+import logging
+from pyshell import GitShell
+from klibs.build_cache import BaselineCache
+import klibs.check_wrapper as check_wrapper
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s')
+logger.setLevel(logging.INFO)
+
+class BaselineCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp("_dir", "cache_")
+        self.src = os.path.join(self.dir, 'src')
+        os.makedirs(self.src)
+        self.git = GitShell(wd=self.src, logger=logger)
+        self.git.cmd('init', '-q')
+        self.git.cmd('config', 'user.email', 'test@example.com')
+        self.git.cmd('config', 'user.name', 'test')
+        with open(os.path.join(self.src, 'Makefile'), 'w') as fobj:
+            fobj.write("VERSION = 4\n")
+        self.git.cmd('add', 'Makefile')
+        self.git.cmd('commit', '-q', '-m', 'base')
+        self.git.cmd('tag', 'v4.0')
+        self.cache = BaselineCache(os.path.join(self.dir, 'cache'), logger=logger)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def key(self, base='v4.0', cflags=["C=2"], config='defconfig'):
+        return self.cache.baseline_key(self.git, base, 'x86_64', config, None, '', cflags)
+
+    def test_key(self):
+        sha = self.git.cmd('rev-parse', 'HEAD')[1].strip()
+        # Tag and SHA of same commit share the entry.
+        self.assertEqual(self.key(), self.key(sha))
+        self.assertNotEqual(self.key(), self.key(cflags=["C=1"]))
+        self.assertIsNone(self.key('no-such-tag'))
+        self.assertIsNone(self.key(config='randconfig'))
+
+    def test_checker_version(self):
+        checker = os.path.join(self.dir, 'sparse')
+
+        def key(version):
+            with open(checker, 'w') as fobj:
+                fobj.write('#!/bin/sh\necho "%s"\n' % version)
+            os.chmod(checker, 0o755)
+            check_wrapper._checker_versions.clear()
+            return self.key(cflags=["C=2", "CHECK=" + checker])
+
+        # Checker run by CHECK= flag is upgraded.
+        self.assertNotEqual(key("v0.6.3"), key("v0.6.4"))
+
+    def test_put_get(self):
+        self.assertIsNone(self.cache.get(self.key()))
+        self.cache.put(self.key(), {"results": [True, 1, 0, ["w"], []], "checks": None})
+        self.assertEqual(self.cache.get(self.key())["results"], [True, 1, 0, ["w"], []])
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+#
+# BuildKernel class test script
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Initial update
+# @TODO    :
+#
+#
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+import logging
+import klibs as klibs
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s')
+logger.setLevel(logging.INFO)
+
+MAKEFILE = """# SPDX-License-Identifier: GPL-2.0
+VERSION = 4
+PATCHLEVEL = 19
+SUBLEVEL = 0
+EXTRAVERSION = -rc1
+NAME = Merciless Moray
+
+kernelversion:
+\t@echo $(VERSION).$(PATCHLEVEL).$(SUBLEVEL)$(EXTRAVERSION)
+
+kcflags:
+\t@printf '%s\\n' "$$KCFLAGS"
+
+latin1:
+\t@printf 'a.c:1:1: warning: caf\\351\\n' >&2
+"""
+
+class LineParser(object):
+    def __init__(self):
+        self.lines = []
+
+    def feed(self, line, stream):
+        self.lines.append((stream, line))
+
+class BuildKernelTest(unittest.TestCase):
+    def setUp(self):
+        self.src = tempfile.mkdtemp("_dir", "kernel_")
+        with open(os.path.join(self.src, 'Makefile'), 'w') as fobj:
+            fobj.write(MAKEFILE)
+
+    def tearDown(self):
+        shutil.rmtree(self.src, ignore_errors=True)
+
+    def test_kernel_version(self):
+        self.assertTrue(klibs.is_valid_kernel(self.src, logger))
+        self.assertEqual(klibs.get_kernel_version(self.src, logger), "4.19.0-rc1")
+
+    def test_kernel_version_update(self):
+        klibs.get_kernel_version(self.src, logger)
+        with open(os.path.join(self.src, 'Makefile'), 'w') as fobj:
+            fobj.write(MAKEFILE.replace("-rc1", ""))
+        self.assertEqual(klibs.get_kernel_version(self.src, logger), "4.19.0")
+
+    def test_make_targets(self):
+        kobj = klibs.BuildKernel(self.src, jobserver=False, logger=logger)
+        self.assertEqual(str(kobj), "4.19.0-rc1")
+        for target in kobj.config_targets + kobj.clean_targets + kobj.build_targets:
+            self.assertTrue(hasattr(klibs.BuildKernel, 'make_' + target))
+
+    def test_make_args(self):
+        self.assertEqual(klibs.build_kernel.split_args('KCFLAGS="-Wall -Werror" C=1'),
+                         ['KCFLAGS=-Wall -Werror', 'C=1'])
+        # List args are passed to make as is.
+        kobj = klibs.BuildKernel(self.src, jobserver=False, logger=logger)
+        ret, out, err = kobj._make_target("kcflags", flags=['KCFLAGS=-DFOO=\'"x"\''])
+        self.assertEqual(ret, 0)
+        self.assertIn('-DFOO=\'"x"\'', out.splitlines())
+        ret, out, err = kobj._make_target("kcflags", flags='KCFLAGS="-DFOO -DBAR"')
+        self.assertIn('-DFOO -DBAR', out.splitlines())
+
+    def test_invalid_output(self):
+        # Non UTF-8 output doesn't stop reading make output.
+        parser = LineParser()
+        ret, out, err = klibs.build_kernel.exec_make(['make', '-s', 'latin1'], wd=self.src, parser=parser,
+                                                     logger=logger)
+        self.assertEqual(ret, 0)
+        self.assertEqual(len(parser.lines), 1)
+        self.assertTrue(parser.lines[0][1].startswith("a.c:1:1: warning: caf"))
+        ret, out, err = klibs.build_kernel.exec_make(['make', '-s', 'latin1'], wd=self.src, logger=logger)
+        self.assertEqual(ret, 0)
+        self.assertTrue(err.startswith("a.c:1:1: warning: caf"))
+
+    def test_invalid_kernel(self):
+        os.remove(os.path.join(self.src, 'Makefile'))
+        self.assertFalse(klibs.is_valid_kernel(self.src, logger))
+        self.assertRaises(IOError, klibs.BuildKernel, self.src)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+#
+# BuildTrace class test script
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Initial update
+# @TODO    :
+#
+#
+
+from __future__ import absolute_import
+
+import os
+import time
+import shutil
+import tempfile
+import unittest
+import logging
+from klibs.build_trace import BuildTrace
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s')
+logger.setLevel(logging.INFO)
+
+class BuildTraceTest(unittest.TestCase):
+    def setUp(self):
+        self.out = tempfile.mkdtemp("_dir", "trace_")
+        os.makedirs(os.path.join(self.out, 'kernel'))
+        os.makedirs(os.path.join(self.out, 'mm'))
+
+    def tearDown(self):
+        shutil.rmtree(self.out, ignore_errors=True)
+
+    def touch(self, target, mtime=None):
+        with open(os.path.join(self.out, target), 'w'):
+            pass
+        if mtime is not None:
+            os.utime(os.path.join(self.out, target), (mtime, mtime))
+
+    def test_durations(self):
+        trace = BuildTrace("x86_64/defconfig", logger=logger)
+        for target in ['kernel/fork.o', 'mm/slab.o', 'kernel/bounds.s', 'kernel/exit.o']:
+            trace.record({'step': 'CC', 'target': target, 'dir': os.path.dirname(target)})
+        # Up to date target, not written by this build.
+        self.touch('kernel/bounds.s', trace.start - 100)
+        time.sleep(0.2)
+        self.touch('kernel/fork.o')
+        self.touch('mm/slab.o')
+        trace.stop(self.out)
+
+        durations = dict([(step[2], step[4]) for step in trace.steps])
+        self.assertGreater(durations['kernel/fork.o'], 0.1)
+        self.assertGreater(durations['mm/slab.o'], 0.1)
+        self.assertIsNone(durations['kernel/bounds.s'])
+        self.assertIsNone(durations['kernel/exit.o'])
+
+    def test_summary(self):
+        trace = BuildTrace("x86_64/defconfig", logger=logger)
+        trace.steps = [[0.0, 'CC', 'kernel/fork.o', 'kernel', 0.1], [0.0, 'CC', 'mm/slab.o', 'mm', 2.0],
+                       [0.1, 'CC', 'mm/page_alloc.o', 'mm', 3.0], [5.0, 'CC', 'kernel/exit.o', 'kernel', 0.1],
+                       [5.0, 'CHK', 'kernel/bounds.s', 'kernel', None]]
+        trace.dirs = {'kernel': (0.0, 5.0, 3), 'mm': (0.0, 0.1, 2)}
+        summary = trace.summary()
+        self.assertEqual([entry['dir'] for entry in summary], ['mm', 'kernel'])
+        self.assertEqual(summary[0]['duration'], 5.0)
+        self.assertEqual((summary[1]['duration'], summary[1]['timed'], summary[1]['steps']), (0.2, 2, 3))
+
+        # Overlapping mm steps are on separate rows.
+        events = [event for event in trace.trace_events() if event.get('cat') == 'CC']
+        self.assertEqual(len(set([event['tid'] for event in events])), 2)
+
+if __name__ == '__main__':
+    unittest.main()
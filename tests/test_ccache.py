@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+#
+# CCache class test script
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Initial update
+# @TODO    :
+#
+#
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+import logging
+from klibs.ccache import CCache
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s')
+logger.setLevel(logging.INFO)
+
+class CCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp("_dir", "ccache_")
+        # Fake ccache 4, only --print-stats is used.
+        self.bin = os.path.join(self.dir, 'ccache')
+        with open(self.bin, 'w') as fobj:
+            fobj.write("#!/bin/sh\nprintf 'cache_miss\\t100\\ncache_size_kibibyte\\t2048\\n'\n")
+        os.chmod(self.bin, 0o755)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_build_stats(self):
+        ccache = CCache("x86_64", cache_dir=self.dir, ccache_bin=self.bin, logger=logger)
+        stats_log = os.path.join(self.dir, 'stats.log')
+        self.assertEqual(ccache.env(stats_log=stats_log)["CCACHE_STATSLOG"], stats_log)
+
+        # No compilation in the build.
+        self.assertEqual(ccache.build_stats(stats_log), {'hits': 0, 'misses': 0, 'hit_rate': 0.0, 'size': 2048})
+
+        with open(stats_log, 'w') as fobj:
+            fobj.write("# init/main.c\ndirect_cache_hit\n# kernel/fork.c\ncache_miss\n"
+                       "# kernel/exit.c\npreprocessed_cache_hit\n# kernel/pid.c\ndirect_cache_hit\n")
+        # Global counters are not used.
+        self.assertEqual(ccache.build_stats(stats_log), {'hits': 3, 'misses': 1, 'hit_rate': 75.0, 'size': 2048})
+
+    def test_no_stats_log(self):
+        # ccache 3 has no --print-stats and no stats log.
+        ccache = CCache("x86_64", cache_dir=self.dir, ccache_bin='false', logger=logger)
+        self.assertIsNone(ccache.build_stats(os.path.join(self.dir, 'stats.log')))
+
+if __name__ == '__main__':
+    unittest.main()
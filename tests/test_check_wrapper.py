@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+#
+# CheckWrapper class test script
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Initial update
+# @TODO    :
+#
+#
+
+from __future__ import absolute_import
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import logging
+from klibs.check_wrapper import write_check_config, tool_log, main, read_check_stats, check_cache_size, \
+    preprocess_args, CheckWrapper
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s')
+logger.setLevel(logging.INFO)
+
+# Fake checkers, sparse like one writes on stderr and smatch like one on stdout.
+SPARSE_CMD = [sys.executable, '-c', "import sys; sys.stderr.write(sys.argv[-1] + ':1:1: warning: sparse\\n')"]
+SMATCH_CMD = [sys.executable, '-c', "import sys; print(sys.argv[-1] + ':2 f() error: smatch')"]
+FAIL_CMD = [sys.executable, '-c', "import sys; sys.exit(3)"]
+CPP_CMD = [sys.executable, '-c', "import sys; sys.stdout.write(open(sys.argv[-1]).read())"]
+# CHECKFLAGS and c_flags of x86_64 kernel build.
+CHECKFLAGS = ['-D__linux__', '-Dlinux', '-D__STDC__', '-Dunix', '-D__unix__', '-Wbitwise', '-Wno-return-void',
+              '-Wno-unknown-attribute', '-D__x86_64__', '--arch=x86', '-mlittle-endian', '-m64']
+C_FLAGS = ['-Wp,-MMD,kernel/.fork.o.d', '-nostdinc', '-I./include', '-include', './include/linux/kconfig.h',
+           '-D__KERNEL__', '-fno-strict-aliasing', '-std=gnu11', '-m64', '-mno-red-zone', '-O2',
+           '-DKBUILD_BASENAME=\'"fork"\'']
+# Fake checker which counts its runs in a file given as first arg.
+COUNT_SCRIPT = "import sys; open(sys.argv[1], 'a').write('x'); sys.stderr.write(sys.argv[-1] + ':1: warning: w\\n')"
+
+class CheckWrapperTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp("_dir", "check_")
+        self.log_dir = os.path.join(self.dir, 'checks')
+        self.config = os.path.join(self.dir, 'check.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def read_log(self, name):
+        with open(tool_log(self.log_dir, name)) as fobj:
+            return fobj.read().splitlines()
+
+    def test_demux(self):
+        write_check_config(self.config, [{"name": "sparse", "cmd": SPARSE_CMD},
+                                         {"name": "smatch", "cmd": SMATCH_CMD}], self.log_dir)
+        for source in ['a.c', 'b.c']:
+            self.assertEqual(main([self.config, '-D__KERNEL__', source]), 0)
+        self.assertEqual(self.read_log('sparse'), ['a.c:1:1: warning: sparse', 'b.c:1:1: warning: sparse'])
+        self.assertEqual(self.read_log('smatch'), ['a.c:2 f() error: smatch', 'b.c:2 f() error: smatch'])
+
+    def test_checker_failure(self):
+        write_check_config(self.config, [{"name": "sparse", "cmd": FAIL_CMD}], self.log_dir)
+        self.assertEqual(main([self.config, 'a.c']), 0)
+        self.assertEqual(self.read_log('sparse'), ['a.c: error: sparse exited with status 3'])
+
+    def test_cache(self):
+        counter = os.path.join(self.dir, 'count')
+        source = os.path.join(self.dir, 'a.c')
+        cache = {"dir": os.path.join(self.dir, 'cache'), "cpp": CPP_CMD, "roots": [self.dir]}
+        tools = [{"name": "sparse", "cmd": [sys.executable, '-c', COUNT_SCRIPT, counter], "version": "1"}]
+
+        def check(data):
+            with open(source, 'w') as fobj:
+                fobj.write(data)
+            write_check_config(self.config, tools, self.log_dir, cache)
+            main([self.config, '-DX', source])
+            with open(counter) as fobj:
+                return len(fobj.read()), read_check_stats(self.log_dir, 'sparse'), self.read_log('sparse')
+
+        self.assertEqual(check('int a;\n'), (1, (0, 1), [source + ':1: warning: w']))
+        # Same source is replayed from cache.
+        self.assertEqual(check('int a;\n'), (1, (1, 0), [source + ':1: warning: w']))
+        self.assertEqual(check('int b;\n'), (2, (0, 1), [source + ':1: warning: w']))
+        self.assertEqual(check_cache_size(cache["dir"], 0), 0)
+
+    def test_preprocess_args(self):
+        self.assertEqual(preprocess_args(CHECKFLAGS + C_FLAGS + ['kernel/fork.c']),
+                         ['-nostdinc', '-I./include', '-include', './include/linux/kconfig.h', '-D__KERNEL__',
+                          '-fno-strict-aliasing', '-std=gnu11', '-m64', '-mno-red-zone',
+                          '-DKBUILD_BASENAME=\'"fork"\''])
+        # Without kbuild c_flags, sparse only flags are still left out.
+        self.assertEqual(preprocess_args(['-mbig-endian', '-DX', 'a.c']), ['-DX'])
+
+    @unittest.skipUnless(os.path.exists('/usr/bin/gcc'), "gcc is not installed")
+    def test_preprocess_checkflags(self):
+        source = os.path.join(self.dir, 'a.c')
+        with open(source, 'w') as fobj:
+            fobj.write('int a;\n')
+        wrapper = CheckWrapper([], self.log_dir, {"dir": os.path.join(self.dir, 'cache'), "cpp": ['gcc', '-E']})
+        args = CHECKFLAGS + ['-Wp,-MMD,' + os.path.join(self.dir, '.a.o.d'), '-D__KERNEL__', '-m64'] + [source]
+        self.assertIsNotNone(wrapper.preprocess(args))
+        # Depfile option is not passed to preprocessor.
+        self.assertFalse(os.path.exists(os.path.join(self.dir, '.a.o.d')))
+
+if __name__ == '__main__':
+    unittest.main()
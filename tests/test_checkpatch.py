@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+#
+# Checkpatch class test script
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Initial update
+# @TODO    :
+#
+#
+
+from __future__ import absolute_import
+
+import os
+import sys
+import stat
+import shutil
+import tempfile
+import unittest
+import logging
+from pyshell import GitShell
+from klibs.build_cache import CheckpatchCache
+from klibs.checkpatch import Checkpatch, parse_checkpatch_output
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s')
+logger.setLevel(logging.INFO)
+
+# Fake checkpatch.pl -g, warns once for every "FIXME" line added by the commit and logs its runs.
+CHECKPATCH_SCRIPT = """#!%s
+import sys, subprocess
+open('runs.log', 'a').write(' '.join(sys.argv[2:]) + '\\n')
+for sha in sys.argv[2:]:
+    patch = subprocess.check_output(['git', 'show', sha], universal_newlines=True)
+    subject = subprocess.check_output(['git', 'log', '-1', '--format=%%s', sha], universal_newlines=True).strip()
+    warnings = len([line for line in patch.splitlines() if line.startswith('+FIXME')])
+    for index in range(warnings):
+        print('WARNING: FIXME found')
+    print('total: 0 errors, %%d warnings, 10 lines checked' %% warnings)
+    print('')
+    print('Commit %%s ("%%s") has %%s' %% (sha[:12], subject,
+          'style problems, please review.' if warnings else 'no obvious style problems and is ready for submission.'))
+"""
+
+CHECKPATCH_OUT = """WARNING: Missing a blank line after declarations
+total: 1 errors, 2 warnings, 30 lines checked
+
+NOTE: For some of the reported defects, checkpatch may be able to
+      mechanically convert to the typical style using --fix or --fix-inplace.
+
+Commit 0123456789ab ("usb: fix (hub) probe") has style problems, please review.
+total: 0 errors, 0 warnings, 5 lines checked
+
+Commit ba9876543210 ("usb: cleanup") has no obvious style problems and is ready for submission.
+"""
+
+class CheckpatchTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp("_dir", "checkpatch_")
+        self.src = os.path.join(self.dir, 'src')
+        os.makedirs(os.path.join(self.src, 'scripts'))
+        self.git = GitShell(wd=self.src, logger=logger)
+        self.git.cmd('init', '-q')
+        self.git.cmd('config', 'user.email', 'test@example.com')
+        self.git.cmd('config', 'user.name', 'test')
+        self.script = os.path.join(self.src, 'scripts', 'checkpatch.pl')
+        with open(self.script, 'w') as fobj:
+            fobj.write(CHECKPATCH_SCRIPT % sys.executable)
+        os.chmod(self.script, os.stat(self.script).st_mode | stat.S_IEXEC)
+        with open(os.path.join(self.src, '.gitignore'), 'w') as fobj:
+            fobj.write("runs.log\n")
+        self.commit('base', '.gitignore', "")
+        self.git.cmd('tag', 'base')
+        for index in range(5):
+            self.commit('commit %d' % index, 'file%d.c' % index, "FIXME\n" * (index % 3))
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def commit(self, subject, name, data):
+        with open(os.path.join(self.src, name), 'w') as fobj:
+            fobj.write(data + "int x%d;\n" % len(name))
+        self.git.cmd('add', name)
+        self.git.cmd('commit', '-q', '-m', subject)
+
+    def runs(self):
+        with open(os.path.join(self.src, 'runs.log')) as fobj:
+            return fobj.read().splitlines()
+
+    def test_parse(self):
+        results = parse_checkpatch_output(CHECKPATCH_OUT)
+        self.assertEqual(sorted(results.keys()), ['0123456789ab', 'ba9876543210'])
+        self.assertEqual(results['0123456789ab'][:2], (1, 2))
+        self.assertEqual(results['ba9876543210'][:2], (0, 0))
+
+    def test_run(self):
+        cache = CheckpatchCache(os.path.join(self.dir, 'cache'), logger=logger)
+        results = Checkpatch(self.src, 'scripts/checkpatch.pl', jobs=2, batch_size=2, cache=cache,
+                             logger=logger).run('base', 'HEAD')
+        self.assertEqual([result["warning_count"] for result in results], [0, 1, 2, 0, 1])
+        self.assertEqual(len(self.runs()), 3)
+
+        # Rebase on a new base, patch-ids don't change so everything comes from cache.
+        head = self.git.cmd('rev-parse', 'HEAD')[1].strip()
+        self.git.cmd('checkout', '-q', '-b', 'new', 'base')
+        self.commit('new base', 'other.c', "")
+        self.git.cmd('tag', 'new-base')
+        self.git.cmd('cherry-pick', 'base..' + head)
+        results = Checkpatch(self.src, 'scripts/checkpatch.pl', cache=cache, logger=logger).run('new-base', 'HEAD')
+        self.assertEqual([result["warning_count"] for result in results], [0, 1, 2, 0, 1])
+        self.assertTrue(all([result["cached"] for result in results]))
+        self.assertEqual(len(self.runs()), 3)
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+#
+# CustomTestRunner class test script
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Initial update
+# @TODO    :
+#
+#
+
+from __future__ import absolute_import
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+import logging
+from klibs.custom_runner import CustomTestRunner
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s')
+logger.setLevel(logging.INFO)
+
+class CustomTestRunnerTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp("_dir", "custom_")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_run(self):
+        runner = CustomTestRunner(self.dir, jobs=3, logger=logger)
+        start = time.time()
+        results = runner.run([{"name": "pass", "cmd": "sleep 1; echo passed"},
+                              {"name": "fail", "cmd": "sleep 1; echo failed >&2; exit 3"},
+                              {"name": "alloc", "cmd": "%s -c \"x = 'x' * (64 << 20); import time; time.sleep(1)\"" %
+                                                       sys.executable}])
+        # Tests run in parallel.
+        self.assertLess(time.time() - start, 2.5)
+        self.assertEqual([result["status"] for result in results], [True, False, True])
+        self.assertEqual(results[1]["exit-status"], 3)
+        with open(results[1]["log"]) as fobj:
+            self.assertEqual(fobj.read(), "failed\n")
+        self.assertGreaterEqual(results[0]["duration"], 1)
+        self.assertGreater(results[2]["peak-rss"], 64 * 1024)
+
+    def test_timeout(self):
+        runner = CustomTestRunner(self.dir, timeout=1, logger=logger)
+        result = runner.run_test({"name": "hang test", "cmd": "sleep 30 & wait"})
+        self.assertTrue(result["timed-out"])
+        self.assertFalse(result["status"])
+        self.assertLess(result["duration"], 10)
+        self.assertEqual(os.path.basename(result["log"]), "hang_test.log")
+
+    def test_memory_limit(self):
+        runner = CustomTestRunner(self.dir, memory_limit=256, logger=logger)
+        result = runner.run_test({"name": "alloc", "cmd": "%s -c \"x = 'x' * (512 << 20)\"" % sys.executable})
+        self.assertFalse(result["status"])
+
+    def test_cpu_limit(self):
+        runner = CustomTestRunner(self.dir, cpu_limit=1, timeout=20, logger=logger)
+        result = runner.run_test({"name": "busy", "cmd": "while :; do :; done"})
+        self.assertFalse(result["status"])
+        self.assertFalse(result["timed-out"])
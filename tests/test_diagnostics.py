@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+#
+# Diagnostics helper classes test script
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Initial update
+# @TODO    :
+#
+#
+
+from __future__ import absolute_import
+
+import unittest
+import logging
+from klibs.diagnostics import normalize, fingerprint, DiagnosticDiff, DiagnosticIndex, make_record, parse_text_diagnostic, \
+    parse_json_diagnostics
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s')
+logger.setLevel(logging.INFO)
+
+class DiagnosticsTest(unittest.TestCase):
+    def test_normalize(self):
+        self.assertEqual(normalize("/src/drivers/usb/hub.c:120:5: warning: unused variable 'x'", ['/src']),
+                         "drivers/usb/hub.c: warning: unused variable 'x'")
+        self.assertEqual(normalize("drivers/usb/hub.c:88 hub_probe() warn: variable dereferenced before check"),
+                         "drivers/usb/hub.c hub_probe() warn: variable dereferenced before check")
+        self.assertEqual(normalize("/out/include/generated/a.h:3:1: error: conflicting types for 'f' "
+                                   "(declared at /src/include/linux/f.h:10)", ['/src', '/out']),
+                         "include/generated/a.h: error: conflicting types for 'f' (declared at include/linux/f.h)")
+
+    def test_fingerprint(self):
+        self.assertEqual(fingerprint("/base/kernel/fork.c:10:2: warning: w", ['/base']),
+                         fingerprint("/head/kernel/fork.c:12:2: warning: w", ['/head']))
+        self.assertNotEqual(fingerprint("kernel/fork.c:10:2: warning: w"),
+                            fingerprint("kernel/exit.c:10:2: warning: w"))
+
+    def test_parse(self):
+        self.assertEqual(parse_text_diagnostic("a.c:3:1: error: expected ';' [-Werror]"),
+                         make_record("a.c", 3, 1, "error", "expected ';'", "-Werror"))
+        self.assertIsNone(parse_text_diagnostic("make[1]: *** [a.o] Error 1"))
+        self.assertIsNone(parse_json_diagnostics("In file included from a.c:1:"))
+        sarif = ('{"runs": [{"results": [{"level": "warning", "ruleId": "-Wunused-variable", '
+                 '"message": {"text": "unused variable \'x\'"}, "locations": [{"physicalLocation": '
+                 '{"artifactLocation": {"uri": "file:///src/a.c"}, "region": {"startLine": 2, "startColumn": 7}}}]}]}]}')
+        self.assertEqual(parse_json_diagnostics(sarif),
+                         [make_record("/src/a.c", 2, 7, "warning", "unused variable 'x'", "-Wunused-variable")])
+
+    def test_diff(self):
+        base = ["/b/a.c:1:1: warning: x", "/b/a.c:5:1: warning: y", "/b/h.h:2:1: warning: z"]
+        head = ["/h/a.c:3:1: warning: x", "/h/h.h:2:1: warning: z", "/h/h.h:2:1: warning: z",
+                "/h/a.c:9:1: warning: new"]
+        diff = DiagnosticDiff(base, head, ['/b', '/h'], logger=logger)
+        self.assertEqual(diff.new, ["/h/h.h:2:1: warning: z", "/h/a.c:9:1: warning: new"])
+        self.assertEqual(diff.fixed, ["/b/a.c:5:1: warning: y"])
+        self.assertEqual(diff.counts(), {"new": 2, "fixed": 1, "unchanged": 2})
+
+    def test_index(self):
+        index = DiagnosticIndex()
+        index.add("warning", ["/a/include/linux/usb.h:3:1: warning: w"], "x86_64", "defconfig", ['/a'])
+        index.add("warning", ["/b/include/linux/usb.h:4:1: warning: w", "/b/kernel/fork.c:1:1: warning: v"],
+                  "i386", "allyesconfig", ['/b'])
+        index.add("error", ["/b/kernel/fork.c:2:1: error: e"], "i386", "allyesconfig", ['/b'])
+        summary = index.summary()
+        self.assertEqual((summary["warning_count"], summary["unique_warning_count"]), (3, 2))
+        self.assertEqual((summary["error_count"], summary["unique_error_count"]), (1, 1))
+        entry = summary["diagnostics"][0]
+        self.assertEqual(entry["message"], "include/linux/usb.h: warning: w")
+        self.assertEqual((entry["count"], entry["archs"], entry["configs"]),
+                         (2, ["x86_64", "i386"], ["defconfig", "allyesconfig"]))
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+#
+# ResultsHistory class test script
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Initial update
+# @TODO    :
+#
+#
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+import logging
+from klibs.history import ResultsHistory
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s')
+logger.setLevel(logging.INFO)
+
+def results(head, status, warnings, diagnostics):
+    return {
+        "kernel-params": {"head": head, "base": "base", "branch": "master", "version": "Linux 4.19"},
+        "static-test": [{"arch_name": "x86_64",
+                         "defconfig": {"compile-test": {"status": status, "warning_count": warnings, "error_count": 0},
+                                       "sparse-test": {"status": "N/A", "warning_count": 0, "error_count": 0}}}],
+        "static-summary": {"compile-test": {"diagnostics": [
+            {"fingerprint": fp, "kind": "warning", "message": message, "count": 1, "archs": ["x86_64"],
+             "configs": ["defconfig"]} for fp, message in diagnostics]}},
+    }
+
+class ResultsHistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp("_dir", "history_")
+        self.history = ResultsHistory(os.path.join(self.dir, 'history.db'), logger=logger)
+        self.history.add_run(results("head1", "Passed", 1, [("aaaa1111", "a.c: warning: x")]), 100)
+        self.history.add_run(results("head2", "Passed", 2, [("aaaa1111", "a.c: warning: x"),
+                                                            ("bbbb2222", "b.c: warning: y")]), 200)
+        self.history.add_run(results("head3", "Failed", 2, [("bbbb2222", "b.c: warning: y")]), 300)
+
+    def tearDown(self):
+        self.history.close()
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_runs(self):
+        self.assertEqual([run["head"] for run in self.history.runs()], ["head3", "head2", "head1"])
+        # Same results are stored once.
+        self.assertEqual(self.history.add_run(results("head1", "Passed", 1, [("aaaa1111", "a.c: warning: x")])), 1)
+        self.assertEqual(len(self.history.runs(head="head1")), 1)
+
+    def test_trend(self):
+        trend = self.history.trend("x86_64", "defconfig")
+        self.assertEqual([(result["run"]["head"], result["status"]) for result in trend],
+                         [("head1", "Passed"), ("head2", "Passed"), ("head3", "Failed")])
+        self.assertEqual(self.history.trend("x86_64", "defconfig", "sparse-test"), [])
+
+    def test_diagnostics(self):
+        self.assertEqual(self.history.first_seen("bbbb")["run"]["head"], "head2")
+        self.assertIsNone(self.history.first_seen("cccc"))
+        self.assertEqual([result["fingerprint"] for result in self.history.new_diagnostics(150)], ["bbbb2222"])
+        self.assertEqual(self.history.search("b.c")[0]["last_seen"], 300)
+
+    def test_regressions(self):
+        regressions = self.history.regressions(250)
+        self.assertEqual([(result["before"]["head"], result["after"]["head"]) for result in regressions],
+                         [("head2", "head3")])
+        self.assertEqual(self.history.regressions(150, until=250)[0]["after"]["warning_count"], 2)
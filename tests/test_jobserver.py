@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+#
+# JobServer class test script
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Initial update
+# @TODO    :
+#
+#
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+import logging
+from klibs.jobserver import JobServer
+from klibs.build_kernel import exec_make
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s')
+logger.setLevel(logging.INFO)
+
+class JobServerTest(unittest.TestCase):
+    def setUp(self):
+        self.jobserver = JobServer(4, logger=logger)
+
+    def tearDown(self):
+        self.jobserver.close()
+
+    def test_tokens(self):
+        tokens = [self.jobserver.acquire() for i in range(4)]
+        for token in tokens:
+            self.jobserver.release(token)
+        self.jobserver.resize(2)
+        self.assertEqual(self.jobserver.slots, 2)
+        self.assertIn("--jobserver-auth=%d,%d" % self.jobserver.pass_fds(), self.jobserver.env()["MAKEFLAGS"])
+
+    def test_make(self):
+        tmpdir = tempfile.mkdtemp("_dir", "jobserver_")
+        try:
+            with open(os.path.join(tmpdir, 'Makefile'), 'w') as fobj:
+                fobj.write("all:\n\t@echo $(MAKEFLAGS)\n")
+            ret, out, err = exec_make(['make', '-C', tmpdir], jobserver=self.jobserver, logger=logger)
+            self.assertEqual(ret, 0)
+            self.assertIn("jobserver", out)
+            self.assertNotIn("jobserver unavailable", err)
+        finally:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+# DependencyGraph class test script
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Initial update
+# @TODO    :
+#
+#
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+import logging
+from klibs.kbuild_deps import DependencyGraph, object_source
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s')
+logger.setLevel(logging.INFO)
+
+CMD_FILE = """cmd_%(obj)s := gcc -c -o %(obj)s %(src)s/%(source)s
+
+source_%(obj)s := %(src)s/%(source)s
+
+deps_%(obj)s := \\
+  %(src)s/include/linux/%(header)s \\
+  $(wildcard include/config/usb.h) \\
+  /usr/include/stdc-predef.h \\
+  include/generated/autoconf.h \\
+
+%(obj)s: $(deps_%(obj)s)
+
+$(deps_%(obj)s):
+"""
+
+class DependencyGraphTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp("_dir", "deps_")
+        self.src = os.path.join(self.dir, 'src')
+        self.out = os.path.join(self.dir, 'out')
+        for obj, source, header in [('kernel/fork.o', 'kernel/fork.c', 'sched.h'),
+                                    ('drivers/usb/hub.o', 'drivers/usb/hub.c', 'usb.h'),
+                                    ('arch/x86/entry.o', 'arch/x86/entry.S', 'usb.h')]:
+            path = os.path.join(self.out, os.path.dirname(obj), '.' + os.path.basename(obj) + '.cmd')
+            if not os.path.exists(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            with open(path, 'w') as fobj:
+                fobj.write(CMD_FILE % {"obj": obj, "src": self.src, "source": source, "header": header})
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_affected_objects(self):
+        graph = DependencyGraph(self.out, self.src, logger=logger)
+        self.assertEqual(graph.affected_objects(['kernel/fork.c']), ['kernel/fork.o'])
+        # Assembly objects are rebuilt too.
+        self.assertEqual(graph.affected_objects(['include/linux/usb.h']), ['arch/x86/entry.o', 'drivers/usb/hub.o'])
+        self.assertEqual(graph.affected_objects(['arch/x86/entry.S', 'kernel/fork.c']),
+                         ['arch/x86/entry.o', 'kernel/fork.o'])
+        # Generated and system headers are not source files.
+        self.assertEqual(graph.affected_objects(['include/generated/autoconf.h', 'Documentation/usb.txt']), [])
+
+    def test_object_source(self):
+        for source in ['kernel/fork.c', 'arch/x86/entry.S']:
+            path = os.path.join(self.src, source)
+            if not os.path.exists(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            open(path, 'w').close()
+        self.assertEqual(object_source(self.src, 'kernel/fork.o'), 'kernel/fork.c')
+        self.assertEqual(object_source(self.src, 'arch/x86/entry.o'), 'arch/x86/entry.S')
+        self.assertIsNone(object_source(self.src, 'drivers/usb/hub.o'))
+
+    def test_full_check(self):
+        graph = DependencyGraph(self.out, self.src, logger=logger)
+        self.assertIsNone(graph.affected_objects(['drivers/usb/Kconfig', 'kernel/fork.c']))
+        self.assertIsNone(graph.affected_objects(['scripts/checkpatch.pl']))
+        # No earlier build.
+        graph = DependencyGraph(os.path.join(self.dir, 'none'), self.src, logger=logger)
+        self.assertIsNone(graph.affected_objects(['kernel/fork.c']))
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+#
+# KernelConfig class test script
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Initial update
+# @TODO    :
+#
+#
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+import logging
+import klibs as klibs
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s')
+logger.setLevel(logging.INFO)
+
+SAMPLE_CONFIG = [
+    "#\n",
+    "# Automatically generated file; DO NOT EDIT.\n",
+    "#\n",
+    "CONFIG_USB=y\n",
+    "CONFIG_USB_XHCI_HCD=m\n",
+    "# CONFIG_EFI is not set\n",
+    'CONFIG_LOCALVERSION=""\n',
+    "CONFIG_PHYSICAL_START=0x1000000\n",
+]
+
+class KernelConfigTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp("_dir", "kconfig_")
+        self.cfg = os.path.join(self.tmpdir, '.config')
+        with open(self.cfg, 'w') as fobj:
+            fobj.writelines(SAMPLE_CONFIG)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def read_cfg(self, path=None):
+        with open(path or self.cfg) as fobj:
+            return fobj.read().splitlines()
+
+    def test_exact_symbol_match(self):
+        kobj = klibs.KernelConfig(self.cfg, logger=logger)
+        kobj.disable_config("CONFIG_USB")
+        data = self.read_cfg()
+        self.assertIn("# CONFIG_USB is not set", data)
+        self.assertIn("CONFIG_USB_XHCI_HCD=m", data)
+
+    def test_merge_config(self):
+        kobj = klibs.KernelConfig(self.cfg, logger=logger)
+        self.assertTrue(kobj.merge_config(["CONFIG_EFI=y", "# CONFIG_USB_XHCI_HCD is not set",
+                                           'CONFIG_LOCALVERSION="-test"', "CONFIG_NEW_OPTION=m"]))
+        data = self.read_cfg()
+        self.assertIn("CONFIG_EFI=y", data)
+        self.assertIn("# CONFIG_USB_XHCI_HCD is not set", data)
+        self.assertIn('CONFIG_LOCALVERSION="-test"', data)
+        self.assertEqual(data[-1], "CONFIG_NEW_OPTION=m")
+        self.assertEqual(len(data), len(SAMPLE_CONFIG) + 1)
+        self.assertEqual(kobj.get_config("CONFIG_PHYSICAL_START"), "0x1000000")
+
+    def test_merge_invalid_line(self):
+        kobj = klibs.KernelConfig(self.cfg, logger=logger)
+        self.assertFalse(kobj.merge_config(["CONFIG_EFI=y", "USB=y"]))
+        self.assertEqual(self.read_cfg(), [x.rstrip('\n') for x in SAMPLE_CONFIG])
+
+    def test_transaction_rollback(self):
+        kobj = klibs.KernelConfig(self.cfg, logger=logger)
+        try:
+            with kobj.transaction():
+                kobj.enable_config("CONFIG_EFI")
+                raise ValueError("abort")
+        except ValueError:
+            pass
+        self.assertEqual(kobj.get_config("CONFIG_EFI"), "n")
+        self.assertIn("# CONFIG_EFI is not set", self.read_cfg())
+
+    def test_nested_rollback(self):
+        kobj = klibs.KernelConfig(self.cfg, logger=logger)
+        with kobj.transaction():
+            kobj.enable_config("CONFIG_EFI")
+            try:
+                with kobj.transaction():
+                    kobj.module_config("CONFIG_USB")
+                    raise ValueError("abort")
+            except ValueError:
+                pass
+            # Inner rollback keeps the batch open, nothing is written yet.
+            kobj.disable_config("CONFIG_USB_XHCI_HCD")
+            self.assertIn("CONFIG_USB_XHCI_HCD=m", self.read_cfg())
+        data = self.read_cfg()
+        self.assertIn("CONFIG_EFI=y", data)
+        self.assertIn("# CONFIG_USB_XHCI_HCD is not set", data)
+        # Edit of failed inner transaction is dropped.
+        self.assertIn("CONFIG_USB=y", data)
+        self.assertEqual(kobj.get_config("CONFIG_USB"), "y")
+        self.assertFalse(kobj.rollback())
+
+    def test_string_quotes(self):
+        kobj = klibs.KernelConfig(self.cfg, logger=logger)
+        self.assertTrue(kobj.merge_config(['CONFIG_LOCALVERSION="1"', 'CONFIG_DEFAULT_HOSTNAME="0x10"',
+                                           "CONFIG_LOG_BUF_SHIFT=17"]))
+        data = self.read_cfg()
+        self.assertIn('CONFIG_LOCALVERSION="1"', data)
+        self.assertIn('CONFIG_DEFAULT_HOSTNAME="0x10"', data)
+        self.assertIn("CONFIG_LOG_BUF_SHIFT=17", data)
+        self.assertEqual(kobj.get_config("CONFIG_LOCALVERSION"), '"1"')
+
+    def test_out_and_backup(self):
+        out = os.path.join(self.tmpdir, 'out', '.config')
+        kobj = klibs.KernelConfig(self.cfg, out=out, logger=logger)
+        kobj.enable_config("CONFIG_EFI")
+        self.assertIn("CONFIG_EFI=y", self.read_cfg(out))
+        self.assertIn("# CONFIG_EFI is not set", self.read_cfg())
+        self.assertTrue(os.path.exists(self.cfg + '.bkup'))
+
+if __name__ == '__main__':
+    unittest.main()
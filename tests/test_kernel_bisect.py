@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+#
+# KernelBisect class test script
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Initial update
+# @TODO    :
+#
+#
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+import logging
+from pyshell import GitShell
+from klibs.worktree import WorktreePool
+from klibs.kernel_bisect import KernelBisect
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s')
+logger.setLevel(logging.INFO)
+
+class KernelBisectTest(unittest.TestCase):
+    def setUp(self):
+        self.src = tempfile.mkdtemp("_dir", "kernel_")
+        self.git = GitShell(wd=self.src, logger=logger)
+        self.git.cmd('init', '-q')
+        self.git.cmd('config', 'user.email', 'test@example.com')
+        self.git.cmd('config', 'user.name', 'test')
+        self.commits = []
+        # Commit 13 breaks the "build".
+        for index in range(20):
+            with open(os.path.join(self.src, 'Makefile'), 'w') as fobj:
+                fobj.write("SUBLEVEL = %d\nBROKEN = %d\n" % (index, 1 if index >= 13 else 0))
+            self.git.cmd('add', 'Makefile')
+            self.git.cmd('commit', '-q', '-m', 'commit %d' % index)
+            self.commits.append(self.git.cmd('rev-parse', 'HEAD')[1].strip())
+        self.pool = WorktreePool(self.src, max_count=3, logger=logger)
+
+    def tearDown(self):
+        self.pool.remove_all()
+        shutil.rmtree(self.src, ignore_errors=True)
+
+    def build(self, commit, path):
+        with open(os.path.join(path, 'Makefile')) as fobj:
+            return "BROKEN = 1" not in fobj.read()
+
+    def test_bisect(self):
+        bisect = KernelBisect(self.src, self.build, self.pool, jobs=3, logger=logger)
+        self.assertEqual(bisect.run(self.commits[0], self.commits[-1]), self.commits[13])
+        # 19 candidates need 5 rounds with serial bisect.
+        self.assertLessEqual(bisect.rounds, 3)
+        self.assertNotIn(self.commits[-1], [commit for commit, status in bisect.tested])
+
+    def test_skip(self):
+        def build(commit, path):
+            return None if commit in self.commits[9:11] else self.build(commit, path)
+
+        bisect = KernelBisect(self.src, build, self.pool, jobs=2, logger=logger)
+        self.assertEqual(bisect.run(self.commits[0], self.commits[-1]), self.commits[13])
+        self.assertEqual(bisect.candidates, [self.commits[13]])
+
+    def test_skip_ambiguous(self):
+        # Commit right before the first bad commit can't be tested, so either of them can be the culprit.
+        def build(commit, path):
+            return None if commit == self.commits[12] else self.build(commit, path)
+
+        bisect = KernelBisect(self.src, build, self.pool, jobs=2, logger=logger)
+        self.assertIsNone(bisect.run(self.commits[0], self.commits[-1]))
+        self.assertEqual(bisect.candidates, self.commits[12:14])
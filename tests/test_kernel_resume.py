@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+#
+# KernelTest resume test script
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Initial update
+# @TODO    :
+#
+#
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+import logging
+from pyshell import GitShell
+from klibs.kernel_test import KernelTest
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s')
+logger.setLevel(logging.INFO)
+
+SHA = {"auto": False, "auto-mode": "last-upstream", "url": "", "value": ""}
+
+class FakeKernelTest(KernelTest):
+    """
+    KernelTest with simulated builds, a commit fails to build if its Makefile has BROKEN = 1.
+    """
+    def __init__(self, *args, **kwargs):
+        self.builds = []
+        self.bisects = []
+        KernelTest.__init__(self, *args, **kwargs)
+
+    def _compile(self, arch='', config='', cc='', cflags=[], name='', cfg=None, clean_build=False, threads=None,
+                 build_info=None, src=None, out=None, checks=None, targets=None):
+        self.builds.append(src)
+        with open(os.path.join(src or self.src, 'Makefile')) as fobj:
+            status = "BROKEN = 1" not in fobj.read()
+        return status, 0, 0 if status else 1, [], []
+
+    def compile(self, arch='', config='', cc='', cflags=[], name='', cfg=None, threads=None):
+        self.builds.append((arch, config))
+        status = arch != "i386"
+        self.resobj.update_compile_test_results(arch, config, status, 0, 0 if status else 1)
+        self.resobj.add_static_diagnostics("compile-test", arch, config, ["a.c:1:1: warning: unused"], [])
+        return status
+
+    def bisect(self, arch='', config='', cc='', cflags=[], name='', cfg=None, base=None, head=None, jobs=2,
+               threads=None):
+        self.bisects.append((arch, config))
+        return None
+
+class KernelResumeTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp("_dir", "resume_")
+        self.src = os.path.join(self.dir, 'src')
+        self.out = os.path.join(self.dir, 'out')
+        os.makedirs(self.src)
+        self.git = GitShell(wd=self.src, logger=logger)
+        self.git.cmd('init', '-q')
+        self.git.cmd('config', 'user.email', 'test@example.com')
+        self.git.cmd('config', 'user.name', 'test')
+        self.commits = []
+        # Commit 5 breaks the "build".
+        for index in range(8):
+            with open(os.path.join(self.src, 'Makefile'), 'w') as fobj:
+                fobj.write("VERSION = 4\nPATCHLEVEL = 19\nSUBLEVEL = %d\nEXTRAVERSION =\nNAME = Test\n"
+                           "BROKEN = %d\n" % (index, 1 if index >= 5 else 0))
+            self.git.cmd('add', 'Makefile')
+            self.git.cmd('commit', '-q', '-m', 'commit %d' % index)
+            self.commits.append(self.git.cmd('rev-parse', 'HEAD')[1].strip())
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def kernel_test(self, cfg=None, resume=False):
+        return FakeKernelTest(self.src, cfg, self.out, head=self.commits[-1], base=self.commits[0], logger=logger,
+                              resume=resume)
+
+    def test_incomplete_cell(self):
+        ktest = self.kernel_test()
+        # Cell is interrupted after its results are journaled, but before it's completed.
+        ktest.compile("x86_64", "defconfig")
+        ktest = self.kernel_test(resume=True)
+        self.assertEqual(ktest.resobj.static.get("x86_64", "defconfig", "compile-test").status, "N/A")
+        self.assertNotIn("compile-test", ktest.resobj.results["static-summary"])
+
+        # Completed cell is replayed, so its diagnostics are counted once.
+        ktest.compile("x86_64", "defconfig")
+        ktest.journal.append("cell", key="x86_64-defconfig", arch="x86_64", config="defconfig", status=True)
+        ktest = self.kernel_test(resume=True)
+        self.assertEqual(ktest.resobj.static.get("x86_64", "defconfig", "compile-test").status, "Passed")
+        self.assertEqual(ktest.resobj.results["static-summary"]["compile-test"]["warning_count"], 1)
+
+    def test_commit_bisect(self):
+        ktest = self.kernel_test()
+        self.assertFalse(ktest.commit_test("x86_64", "defconfig", jobs=2))
+        first_bad = KernelTest.bisect(ktest, "x86_64", "defconfig", jobs=2)
+        self.assertEqual(first_bad, self.commits[5])
+
+        ktest = self.kernel_test(resume=True)
+        self.assertFalse(ktest.commit_test("x86_64", "defconfig", jobs=2))
+        self.assertEqual(KernelTest.bisect(ktest, "x86_64", "defconfig", jobs=2), first_bad)
+        self.assertEqual(ktest.builds, [])
+        self.assertEqual(len(ktest.resobj.results["commit-test"]), len(self.commits) - 1)
+        self.assertEqual(len(ktest.resobj.results["bisect"]["runs"]), 1)
+
+    def test_failed_cell_bisect(self):
+        test = {"compile-test": True, "sparse-test": False, "smatch-test": False}
+        cfg = {
+            "static-config": {"enable": True,
+                              "matrix-params": {"max-jobs": 2, "cpu-budget": 2, "memory-budget": -1,
+                                                "job-threads": 0},
+                              "test-list": [{"arch_name": arch, "compiler_options": {"CC": "", "cflags": []},
+                                             "defconfig": test, "customconfigs": []}
+                                            for arch in ["x86_64", "i386"]]},
+            "bisect-config": {"enable": True, "head": SHA, "base": SHA, "jobs": 2},
+            "checkpatch-config": {"enable": False},
+            "output-config": {"enable": False},
+        }
+        ktest = self.kernel_test(cfg)
+        self.assertFalse(ktest.auto_test())
+        self.assertEqual(ktest.bisects, [("i386", "defconfig")])
+
+        # Failed cell is not built again, but it's still bisected.
+        ktest = self.kernel_test(cfg, resume=True)
+        self.assertFalse(ktest.auto_test())
+        self.assertEqual(ktest.builds, [])
+        self.assertEqual(ktest.bisects, [("i386", "defconfig")])
+
+if __name__ == '__main__':
+    unittest.main()
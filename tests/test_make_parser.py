@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+# MakeOutputParser class test script
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Initial update
+# @TODO    :
+#
+#
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+import logging
+from klibs.make_parser import MakeOutputParser
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s')
+logger.setLevel(logging.INFO)
+
+MAKE_OUT = """make[1]: Entering directory '/tmp/out'
+  CC      init/main.o
+  CC [M]  drivers/usb/core/hub.o
+  AR      drivers/usb/built-in.a
+  LD      vmlinux
+"""
+
+MAKE_ERR = """drivers/usb/core/hub.c: In function 'hub_probe':
+drivers/usb/core/hub.c:10:5: warning: unused variable 'x' [-Wunused-variable]
+drivers/usb/core/hub.c:12:1: error: expected ';' before '}' token
+"""
+
+class MakeOutputParserTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp("_dir", "parser_")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def test_parse(self):
+        events = []
+        parser = MakeOutputParser(log_dir=self.tmpdir, progress=events.append, logger=logger)
+        parser.feed_all(MAKE_OUT, 'out')
+        parser.feed_all(MAKE_ERR, 'err')
+        parser.close()
+
+        self.assertEqual(parser.objects, 2)
+        self.assertEqual(parser.warning_count, 1)
+        self.assertEqual(parser.error_count, 1)
+        self.assertEqual(len(events), 4)
+        self.assertEqual(events[1]['dir'], 'drivers/usb/core')
+        self.assertEqual(events[-1]['step'], 'LD')
+
+        with open(os.path.join(self.tmpdir, 'build.err')) as fobj:
+            self.assertEqual(fobj.read(), MAKE_ERR)
+
+    def test_max_lines(self):
+        parser = MakeOutputParser(max_lines=2, logger=logger)
+        for index in range(5):
+            parser.feed("a.c:%d:1: warning: test" % index, 'err')
+        self.assertEqual(parser.warning_count, 5)
+        self.assertEqual(len(parser.warnings), 2)
+
+    def test_structured(self):
+        parser = MakeOutputParser(structured=True, logger=logger)
+        parser.feed('[{"kind": "warning", "message": "unused variable \'x\'", "option": "-Wunused-variable", '
+                    '"locations": [{"caret": {"file": "a.c", "line": 10, "column": 5}}], "children": []}, '
+                    '{"kind": "note", "message": "error: in macro", "locations": []}]', 'err')
+        parser.feed("b.c:3:1: note: error: in expansion of macro", 'err')
+        parser.feed("b.c:4:9: warning: symbol 'f' was not declared. Should it be static?", 'err')
+        parser.feed("ld: error: undefined symbol: f", 'err')
+        self.assertEqual((parser.warning_count, parser.error_count), (2, 1))
+        self.assertEqual(parser.warnings[0], "a.c:10:5: warning: unused variable 'x' [-Wunused-variable]")
+        self.assertEqual(parser.records[1], {"file": "b.c", "line": 4, "column": 9, "kind": "warning",
+                                             "option": None,
+                                             "message": "symbol 'f' was not declared. Should it be static?"})
+
+if __name__ == '__main__':
+    unittest.main()
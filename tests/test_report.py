@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+#
+# Report writer classes test script
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Initial update
+# @TODO    :
+#
+#
+
+from __future__ import absolute_import
+
+import unittest
+import logging
+import xml.etree.ElementTree as ET
+from klibs.kernel_test import KernelResults
+from klibs.report import get_report_writer
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s')
+logger.setLevel(logging.INFO)
+
+class Buffer(object):
+    # Writers write native strings, which io.StringIO doesn't take on Python 2.
+    def __init__(self):
+        self.data = []
+
+    def write(self, data):
+        self.data.append(data)
+
+    def getvalue(self):
+        return ''.join(self.data)
+
+class ReportTest(unittest.TestCase):
+    def setUp(self):
+        self.results = KernelResults(logger=logger)
+        self.results.update_kernel_params(head="1234abcd", branch="master")
+
+    def update(self):
+        self.results.update_compile_test_results("x86_64", "defconfig", True, 2, 0)
+        self.results.update_compile_test_results("i386", "allnoconfig", False, 0, 1)
+        self.results.update_checkpatch_results(True, 1, 0, [{"commit": "1234abcd", "error_count": 0,
+                                                             "warning_count": 1, "output": "WARNING: <foo>"}])
+        self.results.update_custom_test_results("boot <test>", False, **{"exit-status": 1, "duration": 1.5,
+                                                                          "log": "boot & test.log"})
+
+    def test_live(self):
+        fobj = Buffer()
+        self.results.add_report(get_report_writer("text", fobj, logger))
+        self.results.update_compile_test_results("x86_64", "defconfig", False, 2, 1)
+        self.results.update_compile_test_results("x86_64", "defconfig", True, 2, 0)
+        self.assertNotIn("x86_64/defconfig", fobj.getvalue())
+        # Results are written as soon as the cell is completed, only with final status.
+        self.results.complete_cell("x86_64", "defconfig")
+        self.assertIn("x86_64/defconfig compile-test: Passed (2 warnings, 0 errors)", fobj.getvalue())
+        self.results.finish_reports()
+        self.assertEqual(fobj.getvalue().count("x86_64/defconfig"), 1)
+        self.assertIn("Checkpatch Test Results", fobj.getvalue())
+
+    def test_order(self):
+        for arch, config in [("i386", "defconfig"), ("x86_64", "defconfig"), ("x86_64", "allnoconfig")]:
+            self.results.update_compile_test_results(arch, config, True)
+            self.results.complete_cell(arch, config)
+        fobj = Buffer()
+        # Completed cells are written in arch, config and test order.
+        self.results.add_report(get_report_writer("text", fobj, logger))
+        lines = [line.split()[0] for line in fobj.getvalue().splitlines() if "compile-test:" in line]
+        self.assertEqual(lines, ["x86_64/allnoconfig", "x86_64/defconfig", "i386/defconfig"])
+
+    def test_junit(self):
+        fobj = Buffer()
+        self.results.add_report(get_report_writer("junit", fobj, logger))
+        self.update()
+        self.results.finish_reports()
+        root = ET.fromstring(fobj.getvalue())
+        suites = dict([(suite.get("name"), suite) for suite in root.findall("testsuite")])
+        self.assertEqual([suites["static-test"].get(attr) for attr in ["tests", "failures", "skipped"]],
+                         ["2", "1", "0"])
+        self.assertEqual(suites["commit-test"].get("tests"), "0")
+        self.assertEqual(suites["checkpatch"].find("testcase/system-out").text, "WARNING: <foo>")
+        cases = root.findall("testsuite/testcase")
+        self.assertEqual([case.get("classname") for case in cases],
+                         ["static-test.x86_64.defconfig", "static-test.i386.allnoconfig", "checkpatch",
+                          "custom-test"])
+        self.assertIsNotNone(cases[1].find("failure"))
+        self.assertEqual((cases[3].get("name"), cases[3].get("time")), ("boot <test>", "1.5"))
+
+    def test_html(self):
+        fobj = Buffer()
+        self.update()
+        self.results.write_report(fobj, "html")
+        html = fobj.getvalue()
+        self.assertEqual(html.count('<tr class="Failed">'), 2)
+        self.assertIn("boot &lt;test&gt;", html)
+        self.assertTrue(html.endswith("</html>\n"))
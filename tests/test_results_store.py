@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+#
+# StaticResults class test script
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Initial update
+# @TODO    :
+#
+#
+
+from __future__ import absolute_import
+
+import unittest
+import logging
+from klibs.results_store import StaticResults, TestRecord
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s')
+logger.setLevel(logging.INFO)
+
+class StaticResultsTest(unittest.TestCase):
+    def test_update(self):
+        results = StaticResults(["x86_64", "i386"], ["defconfig"])
+        results.update("x86_64", "defconfig", "compile-test", "Passed", 2, 0, ccache=None, trace={"jobs": 4})
+        record = results.get("x86_64", "defconfig", "compile-test")
+        self.assertEqual((record.status, record.warning_count, record.extra), ("Passed", 2, {"trace": {"jobs": 4}}))
+        self.assertEqual(results.get("i386", "defconfig", "compile-test").status, "N/A")
+        self.assertRaises(AttributeError, setattr, record, "unknown", 1)
+
+    def test_json(self):
+        results = StaticResults(["x86_64", "i386"], ["defconfig"])
+        results.update("i386", "rand-1", "sparse-test", "Failed", 1, 3)
+        data = results.to_json()
+        self.assertEqual([obj["arch_name"] for obj in data], ["x86_64", "i386"])
+        self.assertEqual(data[1]["rand-1"]["sparse-test"], {"status": "Failed", "warning_count": 1, "error_count": 3})
+        self.assertEqual(data[0]["rand-1"]["compile-test"]["status"], "N/A")
+        self.assertEqual((results.arch_index("i386"), results.arch_index("arm64")), (1, -1))
+        self.assertEqual(results.arch_json("i386"), data[1])
+
+        loaded = StaticResults()
+        loaded.load(data)
+        self.assertEqual(loaded.to_json(), data)
+        self.assertEqual(len(loaded.records), 1)
+
+    def test_merge(self):
+        results = StaticResults(["x86_64"], ["defconfig"])
+        results.update("x86_64", "defconfig", "compile-test", "Passed")
+        other = StaticResults(["x86_64", "arm64"], ["defconfig", "allnoconfig"])
+        other.records[("x86_64", "defconfig", "compile-test")] = TestRecord()
+        other.update("arm64", "allnoconfig", "compile-test", "Failed", 0, 1)
+        results.merge(other)
+        self.assertEqual(results.archs, ["x86_64", "arm64"])
+        self.assertEqual(results.configs, ["defconfig", "allnoconfig"])
+        # Tests which are not run in other results are not overwritten.
+        self.assertEqual(results.get("x86_64", "defconfig", "compile-test").status, "Passed")
+        self.assertEqual(results.get("arm64", "allnoconfig", "compile-test").error_count, 1)
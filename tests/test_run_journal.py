@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+#
+# RunJournal class test script
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Initial update
+# @TODO    :
+#
+#
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+import logging
+from klibs.run_journal import RunJournal, cell_key
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s')
+logger.setLevel(logging.INFO)
+
+class RunJournalTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp("_dir", "journal_")
+        self.path = os.path.join(self.dir, 'out', 'journal.jsonl')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def test_journal(self):
+        journal = RunJournal(self.path, logger=logger)
+        self.assertIsNone(journal.header())
+        journal.start(head="1234", base="abcd")
+        journal.append("cell", key=cell_key("x86_64", {"CC": ""}, "defconfig"), status=True)
+        journal.append("custom", args={"name": "boot", "status": False})
+        # Crash in the middle of a write.
+        with open(self.path, 'a') as fobj:
+            fobj.write('{"kind": "cell", "ke')
+
+        entries = RunJournal(self.path, logger=logger).entries()
+        self.assertEqual([entry["kind"] for entry in entries], ["run", "cell", "custom"])
+        self.assertEqual(journal.header()["head"], "1234")
+        self.assertEqual(entries[1]["key"], cell_key("x86_64", {"CC": ""}, "defconfig"))
+
+        journal.start(head="5678")
+        self.assertEqual(len(journal.entries()), 1)
+
+    def test_cell_key(self):
+        self.assertEqual(cell_key({"a": 1, "b": [1, 2]}, "defconfig"), cell_key({"b": [1, 2], "a": 1}, "defconfig"))
+        self.assertNotEqual(cell_key({"CC": ""}, "defconfig"), cell_key({"CC": ""}, "allnoconfig"))
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+#
+# BuildScheduler class test script
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Initial update
+# @TODO    :
+#
+#
+
+from __future__ import absolute_import
+
+import time
+import threading
+import unittest
+import logging
+from klibs.scheduler import BuildScheduler
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s')
+logger.setLevel(logging.INFO)
+
+class BuildSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.lock = threading.Lock()
+        self.running = []
+        self.peak_cpus = 0
+        self.exclusive_overlap = False
+
+    def job(self, name, cpus, exclusive=False):
+        with self.lock:
+            self.running.append((name, cpus, exclusive))
+            self.peak_cpus = max(self.peak_cpus, sum([x[1] for x in self.running]))
+            if len(self.running) > 1 and any([x[2] for x in self.running]):
+                self.exclusive_overlap = True
+        time.sleep(0.05)
+        with self.lock:
+            self.running.remove((name, cpus, exclusive))
+        return True
+
+    def test_cpu_budget(self):
+        sched = BuildScheduler(cpu_budget=4, max_jobs=4, logger=logger)
+        for index in range(6):
+            sched.add_job("job%d" % index, self.job, ("job%d" % index, 2), cpus=2)
+        jobs = sched.run()
+        self.assertTrue(all([job.result is True for job in jobs]))
+        self.assertEqual(self.peak_cpus, 4)
+        self.assertIn("Speedup", sched.report())
+
+    def test_exclusive_job(self):
+        sched = BuildScheduler(cpu_budget=8, max_jobs=8, logger=logger)
+        sched.add_job("job0", self.job, ("job0", 1), cpus=1)
+        sched.add_job("job1", self.job, ("job1", 1, True), cpus=1, exclusive=True)
+        sched.add_job("job2", self.job, ("job2", 1), cpus=1)
+        sched.run()
+        self.assertFalse(self.exclusive_overlap)
+
+    def test_job_exception(self):
+        def fail():
+            raise ValueError("failed")
+        sched = BuildScheduler(cpu_budget=2, logger=logger)
+        job = sched.add_job("fail", fail)
+        sched.run()
+        self.assertEqual(job.status, "Error")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+# Test matrix shard test script
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Initial update
+# @TODO    :
+#
+#
+
+from __future__ import absolute_import
+
+import unittest
+import logging
+from klibs.shard import parse_shard, partition, plan_digest, ShardMerge
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s')
+logger.setLevel(logging.INFO)
+
+def shard_results(index, count, plan, arch, config, status="Passed", warning_count=0, fingerprint=None):
+    results = {
+        "kernel-params": {"head": "abc", "base": "def", "branch": "master", "version": "Linux"},
+        "shard": {"index": index, "count": count, "plan": plan},
+        "static-test": [{"arch_name": arch, config: {"compile-test": {"status": status,
+                                                                      "warning_count": warning_count,
+                                                                      "error_count": 0}}}],
+        "static-summary": {},
+    }
+    if fingerprint is not None:
+        results["static-summary"]["compile-test"] = {"diagnostics": [
+            {"fingerprint": fingerprint, "kind": "warning", "message": "unused variable", "count": 1,
+             "archs": [arch], "configs": [config]}]}
+
+    return results
+
+class ShardTest(unittest.TestCase):
+
+    def test_parse_shard(self):
+        self.assertEqual(parse_shard("2/4"), (2, 4))
+        for value in ["0/4", "5/4", "1", "a/b", "1/0"]:
+            self.assertRaises(ValueError, parse_shard, value)
+
+    def test_partition(self):
+        cells = [("cell%d" % index, float(index % 5 + 1)) for index in range(20)]
+        plan = partition(cells, 3)
+        self.assertEqual(sorted(plan.keys()), sorted([cell[0] for cell in cells]))
+        # Same cells in any order give same plan.
+        self.assertEqual(plan_digest(partition(list(reversed(cells)), 3)), plan_digest(plan))
+
+        costs = dict(cells)
+        loads = [sum([costs[key] for key in plan if plan[key] == index]) for index in range(1, 4)]
+        self.assertLessEqual(max(loads) - min(loads), max(costs.values()))
+
+    def test_merge(self):
+        merge = ShardMerge(logger=logger)
+        merge.add(shard_results(1, 2, "p1", "x86_64", "defconfig", warning_count=1, fingerprint="f1"))
+        self.assertEqual(merge.missing(), [2])
+        merge.add(shard_results(2, 2, "p1", "x86_64", "allnoconfig", warning_count=1, fingerprint="f1"))
+        self.assertEqual(merge.missing(), [])
+        self.assertEqual(merge.conflicts, [])
+
+        results = merge.results()
+        self.assertEqual(results["shard"]["merged"], [1, 2])
+        archs = dict([(obj["arch_name"], obj) for obj in results["static-test"]])
+        self.assertEqual(archs["x86_64"]["defconfig"]["compile-test"]["status"], "Passed")
+        self.assertEqual(archs["x86_64"]["allnoconfig"]["compile-test"]["status"], "Passed")
+        summary = results["static-summary"]["compile-test"]
+        self.assertEqual(summary["warning_count"], 2)
+        self.assertEqual(summary["unique_warning_count"], 1)
+        self.assertEqual(summary["diagnostics"][0]["configs"], ["defconfig", "allnoconfig"])
+
+    def test_merge_conflicts(self):
+        merge = ShardMerge(logger=logger)
+        merge.add(shard_results(1, 2, "p1", "x86_64", "defconfig"))
+        merge.add(shard_results(2, 2, "p1", "x86_64", "defconfig", status="Failed"))
+        self.assertEqual(len(merge.conflicts), 1)
+
+        merge = ShardMerge(logger=logger)
+        merge.add(shard_results(1, 2, "p1", "x86_64", "defconfig"))
+        merge.add(shard_results(1, 2, "p2", "x86_64", "allnoconfig"))
+        # Different plan and same shard twice.
+        self.assertEqual(len(merge.conflicts), 2)
+        self.assertEqual(merge.missing(), [2])
+
+if __name__ == '__main__':
+    unittest.main()
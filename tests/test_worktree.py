@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+#
+# WorktreePool class test script
+#
+# Copyright (C) 2018 Sathya Kuppuswamy
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# @Author  : Sathya Kupppuswamy(sathyaosid@gmail.com)
+# @History :
+#            @v0.0 - Initial update
+# @TODO    :
+#
+#
+
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+import logging
+from pyshell import GitShell
+from klibs.worktree import WorktreePool
+
+logger = logging.getLogger(__name__)
+logging.basicConfig(format='%(message)s')
+logger.setLevel(logging.INFO)
+
+class WorktreePoolTest(unittest.TestCase):
+    def setUp(self):
+        self.src = tempfile.mkdtemp("_dir", "kernel_")
+        self.git = GitShell(wd=self.src, logger=logger)
+        self.git.cmd('init', '-q')
+        self.git.cmd('config', 'user.email', 'test@example.com')
+        self.git.cmd('config', 'user.name', 'test')
+        self.commits = []
+        for index in range(2):
+            with open(os.path.join(self.src, 'Makefile'), 'w') as fobj:
+                fobj.write("SUBLEVEL = %d\n" % index)
+            self.git.cmd('add', 'Makefile')
+            self.git.cmd('commit', '-q', '-m', 'commit %d' % index)
+            self.commits.append(self.git.cmd('rev-parse', 'HEAD')[1].strip())
+
+    def tearDown(self):
+        shutil.rmtree(self.src, ignore_errors=True)
+
+    def read_makefile(self, path):
+        with open(os.path.join(path, 'Makefile')) as fobj:
+            return fobj.read()
+
+    def test_tracked_entries(self):
+        os.makedirs(os.path.join(self.src, 'out', 'x86_64'))
+        pool = WorktreePool(self.src, max_count=1, logger=logger)
+        # Build output is not copied to new worktrees.
+        self.assertEqual(pool._tracked_entries(), [os.path.join(os.path.abspath(self.src), 'Makefile')])
+
+    def test_checkout(self):
+        pool = WorktreePool(self.src, max_count=1, logger=logger)
+        with pool.checkout(self.commits[0]) as path:
+            self.assertEqual(self.read_makefile(path), "SUBLEVEL = 0\n")
+            first = path
+        # Only one worktree is allowed, so it's moved to the new commit.
+        with pool.checkout(self.commits[1]) as path:
+            self.assertEqual(path, first)
+            self.assertEqual(self.read_makefile(path), "SUBLEVEL = 1\n")
+        # Primary checkout is not touched.
+        self.assertEqual(self.git.cmd('rev-parse', 'HEAD')[1].strip(), self.commits[1])
+
+    def test_reuse(self):
+        pool = WorktreePool(self.src, max_count=2, logger=logger)
+        with pool.checkout(self.commits[0]) as path0:
+            with pool.checkout(self.commits[0]) as path1:
+                self.assertNotEqual(path0, path1)
+        # Worktrees are found again by a new pool.
+        pool = WorktreePool(self.src, max_count=2, logger=logger)
+        self.assertEqual(len(pool.worktrees), 2)
+        with pool.checkout(self.commits[0]) as path:
+            self.assertIn(path, [path0, path1])
+        pool.remove_all()
+        self.assertFalse(os.path.exists(path0))
+
+    def test_invalid_commit(self):
+        pool = WorktreePool(self.src, logger=logger)
+        with pool.checkout('no-such-commit') as path:
+            self.assertIsNone(path)
+
+    def test_move(self):
+        pool = WorktreePool(self.src, max_count=1, logger=logger)
+        wt = pool.acquire(self.commits[0])
+        path = wt.path
+        self.assertTrue(pool.move(wt, self.commits[1]))
+        self.assertEqual(wt.path, path)
+        self.assertEqual(self.read_makefile(path), "SUBLEVEL = 1\n")
+        self.assertFalse(pool.move(wt, 'no-such-commit'))
+        pool.release(wt)
+        pool.remove_all()